@@ -1,47 +1,64 @@
-from fastapi import Request
-from app.services.advanced_rate_limit_service import SlidingWindowRateLimiter
+from fastapi import Request, Response, HTTPException
+from app.core.config import (
+    RATE_LIMIT_WINDOW_SECONDS,
+    RATE_LIMIT_DROPS_PER_IP,
+    RATE_LIMIT_DROPS_PER_SESSION,
+    RATE_LIMIT_TEXT_DROPS_PER_SESSION,
+    RATE_LIMIT_FILE_DROPS_PER_SESSION,
+)
+from app.services.advanced_rate_limit_service import SlidingWindowRateLimiter, RatePolicy
 
 
-# Per session limiter (more strict)
-session_limiter = SlidingWindowRateLimiter(
-    limit=10,
-    window_seconds=60,
-)
+drop_limiter = SlidingWindowRateLimiter()
+
+# Per client IP, across all sessions
+ip_policy = RatePolicy("ip", RATE_LIMIT_DROPS_PER_IP, RATE_LIMIT_WINDOW_SECONDS)
+
+# Per session, across drop types
+session_policy = RatePolicy("session", RATE_LIMIT_DROPS_PER_SESSION, RATE_LIMIT_WINDOW_SECONDS)
 
 # Per drop type limiter
-text_drop_limiter = SlidingWindowRateLimiter(
-    limit=20,
-    window_seconds=60,
-)
+drop_type_policies = {
+    "text": RatePolicy("text", RATE_LIMIT_TEXT_DROPS_PER_SESSION, RATE_LIMIT_WINDOW_SECONDS),
+    "file": RatePolicy("file", RATE_LIMIT_FILE_DROPS_PER_SESSION, RATE_LIMIT_WINDOW_SECONDS),
+}
 
-file_drop_limiter = SlidingWindowRateLimiter(
-    limit=5,
-    window_seconds=60,
-)
 
+def _client_ip(request: Request) -> str:
+    ip = request.client.host if request.client else None
+
+    if ip in ("127.0.0.1", None):
+        ip = "testclient"
+
+    return ip
+
+
+def limit_drops(drop_type: str):
+    """Dependency that checks the IP, session and drop type policies in one call."""
+
+    type_policy = drop_type_policies[drop_type]
 
-async def limit_per_session(request: Request):
-    session_code = request.path_params.get("code")
-    if not session_code:
-        return
+    async def dependency(request: Request, response: Response):
+        checks = [(f"rate:ip:{_client_ip(request)}", ip_policy)]
 
-    key = f"rate:session:{session_code}"
-    await session_limiter.check(key)
+        session_code = request.path_params.get("code")
+        if session_code:
+            checks.append((f"rate:session:{session_code}", session_policy))
+            checks.append((f"rate:{drop_type}:{session_code}", type_policy))
 
+        result = await drop_limiter.check_many(checks)
 
-async def limit_text_drops(request: Request):
-    session_code = request.path_params.get("code")
-    if not session_code:
-        return
+        if not result.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers=result.headers(),
+            )
 
-    key = f"rate:text:{session_code}"
-    await text_drop_limiter.check(key)
+        response.headers.update(result.headers())
 
+    return dependency
 
-async def limit_file_drops(request: Request):
-    session_code = request.path_params.get("code")
-    if not session_code:
-        return
 
-    key = f"rate:file:{session_code}"
-    await file_drop_limiter.check(key)
+limit_text_drops = limit_drops("text")
+limit_file_drops = limit_drops("file")
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,5 +9,136 @@ FRONTEND_URL = os.getenv("FRONTEND_URL", "https://dropify-frontend-2ngdo9rx9-top
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 3600))
 
+# Full expiry pass that also catches deadlines created on other workers
+EXPIRY_FALLBACK_SWEEP_SECONDS = float(os.getenv("EXPIRY_FALLBACK_SWEEP_SECONDS", 300))
+
+# How long deleted and expired drops are kept as tombstones for cursor
+# syncs; older cursors get 410 and must reload the full list
+TOMBSTONE_RETENTION_SECONDS = int(os.getenv("TOMBSTONE_RETENTION_SECONDS", 86400))
+
+# Rows expired per statement/transaction, and time spent per tick before a
+# drop backlog is left for the next one
+EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", 500))
+EXPIRY_TIME_BUDGET_SECONDS = float(os.getenv("EXPIRY_TIME_BUDGET_SECONDS", 2))
+
+# Reload the free session code pool to pick up codes freed by other workers
+CODE_POOL_RESYNC_SECONDS = float(os.getenv("CODE_POOL_RESYNC_SECONDS", 600))
+
+# Session code -> expires_at lookups; "redis" also invalidates other workers
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", 10000))
+SESSION_CACHE_INVALIDATION = os.getenv("SESSION_CACHE_INVALIDATION", "none")
+
+# Pre-serialized drop lists; max age bounds staleness without redis invalidation
+DROP_LIST_CACHE_SIZE = int(os.getenv("DROP_LIST_CACHE_SIZE", 1000))
+DROP_LIST_CACHE_MAX_AGE_SECONDS = float(os.getenv("DROP_LIST_CACHE_MAX_AGE_SECONDS", 60))
+
+# Session creation rate limit, per client IP per minute
+RATE_LIMIT_SESSIONS_PER_IP = int(os.getenv("RATE_LIMIT_SESSIONS_PER_IP", 5))
+
+# Drop creation rate limits, per sliding window. Every drop counts against
+# the session limit and its type's limit, so the session limit must be at
+# least the highest type limit or that type's limit is never reached
+RATE_LIMIT_WINDOW_SECONDS = float(os.getenv("RATE_LIMIT_WINDOW_SECONDS", 60))
+RATE_LIMIT_DROPS_PER_IP = int(os.getenv("RATE_LIMIT_DROPS_PER_IP", 60))
+RATE_LIMIT_DROPS_PER_SESSION = int(os.getenv("RATE_LIMIT_DROPS_PER_SESSION", 24))
+RATE_LIMIT_TEXT_DROPS_PER_SESSION = int(os.getenv("RATE_LIMIT_TEXT_DROPS_PER_SESSION", 20))
+RATE_LIMIT_FILE_DROPS_PER_SESSION = int(os.getenv("RATE_LIMIT_FILE_DROPS_PER_SESSION", 5))
+
+# Token buckets shared by the workers on a host, used while Redis is down
+LOCAL_RATE_LIMIT_PATH = os.getenv(
+    "LOCAL_RATE_LIMIT_PATH",
+    "/dev/shm/dropify-rate-limit" if os.path.isdir("/dev/shm")
+    else os.path.join(tempfile.gettempdir(), "dropify-rate-limit"),
+)
+LOCAL_RATE_LIMIT_SLOTS = int(os.getenv("LOCAL_RATE_LIMIT_SLOTS", 65536))
+
+# Rendered QR codes kept per worker (keyed by session code and format)
+QRCODE_CACHE_SIZE = int(os.getenv("QRCODE_CACHE_SIZE", 1024))
+
+# "memory" for a single process, "redis" to fan out across workers/nodes
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND", "memory")
+
+# Per-socket outbound queue; "drop_oldest" or "disconnect" when it is full
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 64))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", 10))
+
+# Heartbeats and connection caps (caps are per worker)
+WS_PING_INTERVAL_SECONDS = float(os.getenv("WS_PING_INTERVAL_SECONDS", 25))
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", 75))
+WS_MAX_CONNECTIONS_PER_SESSION = int(os.getenv("WS_MAX_CONNECTIONS_PER_SESSION", 50))
+WS_MAX_CONNECTIONS = int(os.getenv("WS_MAX_CONNECTIONS", 10000))
+
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL not set")
+
+# Database connection pool (applies to the sync and the async engine each)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true") == "true"
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", DB_POOL_SIZE))
+
+# Uploads
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 64 * 1024))
+UPLOAD_MEMORY_BUDGET_BYTES = int(os.getenv("UPLOAD_MEMORY_BUDGET_BYTES", 16 * 1024 * 1024))
+UPLOAD_BUDGET_TIMEOUT_SECONDS = float(os.getenv("UPLOAD_BUDGET_TIMEOUT_SECONDS", 10))
+
+# Resumable uploads
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 1024 * 1024 * 1024))
+MAX_UPLOAD_CHUNK_SIZE = int(os.getenv("MAX_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+RESUMABLE_UPLOAD_TTL_SECONDS = int(os.getenv("RESUMABLE_UPLOAD_TTL_SECONDS", 24 * 3600))
+
+# Where blob bytes live: "local" (UPLOAD_DIR) or "s3" (any S3-compatible
+# store). Presigned URLs are valid for STORAGE_URL_TTL_SECONDS. The local
+# backend signs its upload URLs with STORAGE_SIGNING_SECRET; unset, the
+# workers on a host share one generated at STORAGE_SIGNING_SECRET_PATH
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+STORAGE_URL_TTL_SECONDS = int(os.getenv("STORAGE_URL_TTL_SECONDS", 3600))
+STORAGE_SIGNING_SECRET = os.getenv("STORAGE_SIGNING_SECRET", "")
+STORAGE_SIGNING_SECRET_PATH = os.getenv(
+    "STORAGE_SIGNING_SECRET_PATH",
+    f"{LOCAL_RATE_LIMIT_PATH}-signing-secret",
+)
+# Blob keys are an HMAC of the content hash under BLOB_KEY_SECRET, so
+# knowing a file's SHA-256 does not give its URL; unset, the workers on a
+# host share one generated at BLOB_KEY_SECRET_PATH. Set it when several
+# hosts share storage
+BLOB_KEY_SECRET = os.getenv("BLOB_KEY_SECRET", "")
+BLOB_KEY_SECRET_PATH = os.getenv("BLOB_KEY_SECRET_PATH", f"{LOCAL_RATE_LIMIT_PATH}-blob-key")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "https://s3.amazonaws.com")
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID", "")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY", "")
+S3_VIRTUAL_HOSTED = os.getenv("S3_VIRTUAL_HOSTED", "false") == "true"
+
+# Text drops at least this large are stored compressed
+TEXT_COMPRESSION_MIN_BYTES = int(os.getenv("TEXT_COMPRESSION_MIN_BYTES", 1024))
+
+# Drop lists and .txt files at least this large are sent compressed when
+# the client accepts it (zstd and br need the zstandard / brotli packages)
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", 1024))
+
+# Image thumbnails, rendered in this many worker processes (0 disables)
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", 2))
+THUMBNAIL_MAX_SIZE = int(os.getenv("THUMBNAIL_MAX_SIZE", 320))
+THUMBNAIL_FORMAT = os.getenv("THUMBNAIL_FORMAT", "webp")
+
+# Storage GC: files of dead drops and unreferenced blobs every interval,
+# plus a full pass over UPLOAD_DIR for orphans; younger files are left alone
+STORAGE_GC_INTERVAL_SECONDS = float(os.getenv("STORAGE_GC_INTERVAL_SECONDS", 60))
+STORAGE_GC_RECONCILE_SECONDS = float(os.getenv("STORAGE_GC_RECONCILE_SECONDS", 3600))
+STORAGE_GC_BATCH_SIZE = int(os.getenv("STORAGE_GC_BATCH_SIZE", 500))
+STORAGE_GC_GRACE_SECONDS = float(os.getenv("STORAGE_GC_GRACE_SECONDS", 3600))
+# An upload of bytes the GC is deleting waits this long for it to finish
+STORAGE_GC_WAIT_SECONDS = float(os.getenv("STORAGE_GC_WAIT_SECONDS", 10))
+
+# One-time downloads
+DOWNLOAD_RESUME_WINDOW_SECONDS = int(os.getenv("DOWNLOAD_RESUME_WINDOW_SECONDS", 3600))
+
+# Metrics: with several workers, point this at an empty directory (cleared
+# before each start) so /metrics reports all of them, not just the one
+# answering the scrape
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
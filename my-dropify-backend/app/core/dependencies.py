@@ -1,7 +1,8 @@
 from fastapi import Request
+from app.core.config import RATE_LIMIT_SESSIONS_PER_IP
 from app.services.rate_limit_service import RateLimiter
 
-limiter = RateLimiter(limit=5, window=60)
+limiter = RateLimiter(limit=RATE_LIMIT_SESSIONS_PER_IP, window=60)
 
 async def rate_limit_dependency(request: Request):
     ip = request.client.host if request.client else "testclient"
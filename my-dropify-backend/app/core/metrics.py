@@ -0,0 +1,108 @@
+import os
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from app.core.config import PROMETHEUS_MULTIPROC_DIR
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Seconds; request handlers
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds; single DB queries, Redis commands and socket fan-out
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# Seconds the current request has spent in DB statements; set by
+# MetricsMiddleware, added to by the query instrumentation
+request_db_time: ContextVar[list[float] | None] = ContextVar("request_db_time", default=None)
+
+
+def render() -> bytes:
+    """Every worker's metrics in multiprocess mode, else this process's."""
+
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def mark_worker_stopped():
+    """Drops this worker's live gauges from the shared multiprocess files."""
+
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+# =========================
+# APP METRICS
+# =========================
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "dropify_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "dropify_http_request_db_duration_seconds",
+    "Time a request spent in database statements, by route template.",
+    ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "dropify_db_query_duration_seconds",
+    "Database statement execution time.",
+    ("engine", "operation"),
+    buckets=FAST_BUCKETS,
+)
+
+REDIS_COMMAND_SECONDS = Histogram(
+    "dropify_redis_command_duration_seconds",
+    "Redis command round-trip time.",
+    ("command",),
+    buckets=FAST_BUCKETS,
+)
+
+REDIS_ERRORS = Counter(
+    "dropify_redis_errors_total",
+    "Redis commands that raised.",
+    ("command",),
+)
+
+WEBSOCKET_CONNECTIONS = Gauge(
+    "dropify_websocket_connections",
+    "Open WebSocket connections.",
+    multiprocess_mode="livesum",
+)
+
+BROADCAST_FANOUT_SECONDS = Histogram(
+    "dropify_broadcast_fanout_duration_seconds",
+    "Time to encode a broadcast and queue it on every local socket of the session.",
+    buckets=FAST_BUCKETS,
+)
+
+EXPIRY_SWEEP_SECONDS = Histogram(
+    "dropify_expiry_sweep_duration_seconds",
+    "Duration of an expiry cleanup run.",
+    buckets=LATENCY_BUCKETS,
+)
+
+EXPIRY_ROWS = Counter(
+    "dropify_expiry_rows_total",
+    "Rows removed by expiry cleanups.",
+    ("kind",),
+)
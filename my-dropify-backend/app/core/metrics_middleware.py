@@ -0,0 +1,50 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUEST_DB_SECONDS, request_db_time
+
+# Requests that matched no route share one label, so probes for random
+# paths can't grow the series without bound
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request from arrival to the end of the response body,
+    and the part of it spent in DB statements, labelled with the route
+    template (/sessions/{code}/drops), not the path.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        db_time = [0.0]
+        token = request_db_time.set(db_time)
+
+        async def timed_send(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            request_db_time.reset(token)
+
+            # The router stores the matched route on the shared scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"],
+                route=route,
+                status=str(status),
+            ).observe(time.perf_counter() - start)
+            HTTP_REQUEST_DB_SECONDS.labels(method=scope["method"], route=route).observe(db_time[0])
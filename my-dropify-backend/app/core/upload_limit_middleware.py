@@ -0,0 +1,85 @@
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.services.file_service import MAX_FILE_SIZE
+
+# Room for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+UPLOAD_PATH_SUFFIXES = ("/drops/file",)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized upload bodies before they are spooled by the form
+    parser: up front from Content-Length, and mid-stream for chunked bodies.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int | None = None):
+        self.app = app
+        self.max_body_size = max_body_size or MAX_FILE_SIZE + MULTIPART_OVERHEAD_BYTES
+
+    def _too_large(self) -> JSONResponse:
+        return JSONResponse(
+            {"detail": "File too large (max 5MB)"},
+            status_code=413,
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].endswith(UPLOAD_PATH_SUFFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > self.max_body_size:
+                    await self._too_large()(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+
+            if exceeded:
+                return {"type": "http.disconnect"}
+
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    exceeded = True
+                    # Stop the parser; the app's error response is replaced below
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+
+            if exceeded:
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await self._too_large()(scope, receive, send)
+                return
+
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+            if not response_started:
+                await self._too_large()(scope, receive, send)
@@ -1,15 +1,54 @@
-from sqlalchemy import create_engine
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+import time
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
-from app.core.config import DATABASE_URL
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+)
+from app.db.pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool
+from app.core.metrics import DB_QUERY_SECONDS, request_db_time
 from app.models.base import Base
 from app.models.session import Session  # register model
 from sqlalchemy.orm import Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from app.models.drop import Drop
+from app.models.upload import Upload
+from app.models.blob import Blob
+
+
+
+def _pool_options(url, poolclass) -> dict:
+    url = make_url(url)
 
+    # In-memory SQLite needs its single shared connection, not a pool
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
 
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
 
-engine = create_engine(DATABASE_URL, future=True)
+
+engine = create_engine(
+    DATABASE_URL,
+    future=True,
+    **_pool_options(DATABASE_URL, InstrumentedQueuePool),
+)
 
 SessionLocal = sessionmaker(
     bind=engine,
@@ -18,8 +57,116 @@ SessionLocal = sessionmaker(
 )
 
 
+def _async_database_url(url: str):
+    """Maps the sync DATABASE_URL onto its async driver (asyncpg / aiosqlite)."""
+
+    url = make_url(url)
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+
+    if backend == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+
+        # asyncpg spells libpq's sslmode as ssl
+        sslmode = url.query.get("sslmode")
+        if sslmode:
+            url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+
+        return url
+
+    return url
+
+
+_async_url = _async_database_url(DATABASE_URL)
+
+async_engine = create_async_engine(
+    _async_url,
+    # SQLite connections are cheap, and not pooling them keeps them from
+    # outliving the event loop that opened them (e.g. across test clients)
+    **(
+        {"poolclass": NullPool}
+        if _async_url.get_backend_name() == "sqlite"
+        else _pool_options(_async_url, InstrumentedAsyncQueuePool)
+    ),
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+# Statement kinds reported as-is; anything else (PRAGMA, SAVEPOINT, ...) is "other"
+QUERY_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+def _instrument_queries(sync_engine, name: str):
+    """
+    Times every statement the engine executes, by its leading keyword, and
+    adds it to the DB time of the request it runs for, if any.
+    """
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        DB_QUERY_SECONDS.labels(
+            engine=name,
+            operation=operation if operation in QUERY_OPERATIONS else "other",
+        ).observe(elapsed)
+
+        spent = request_db_time.get()
+        if spent is not None:
+            spent[0] += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _failed(context):
+        # No after_cursor_execute follows a failed statement
+        starts = context.connection.info.get("query_start") if context.connection else None
+        if starts:
+            starts.pop()
+
+
+_instrument_queries(engine, "sync")
+_instrument_queries(async_engine.sync_engine, "async")
+
+
+ALEMBIC_CONFIG = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+# Arbitrary key shared by every worker running migrations on startup
+MIGRATION_LOCK_ID = 0x64726f70
+
+
+def run_migrations(connection, revision: str = "head"):
+    config = Config(str(ALEMBIC_CONFIG))
+    config.attributes["connection"] = connection
+    command.upgrade(config, revision)
+
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    """Upgrades the schema to the latest migration (see migrations/)."""
+
+    with engine.connect() as connection:
+        postgres = connection.dialect.name == "postgresql"
+
+        # Serialize workers that start at the same time
+        if postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            connection.commit()
+
+        try:
+            run_migrations(connection)
+        finally:
+            if postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                connection.commit()
 
 
 # Ensure tables are created on import (helps tests and simple setups)
@@ -32,5 +179,48 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
-from sqlalchemy import text
 
+def warm_up_pool(count: int):
+    """Opens `count` pooled connections at once so first requests don't pay for them."""
+
+    pool = engine.pool
+    if not hasattr(pool, "size"):
+        return
+
+    connections = []
+    try:
+        for _ in range(min(count, pool.size())):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+async def warm_up_async_pool(count: int):
+    pool = async_engine.pool
+    if not hasattr(pool, "size"):
+        return
+
+    connections = []
+    try:
+        for _ in range(min(count, pool.size())):
+            connections.append(await async_engine.connect())
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def run_db(db: Session | AsyncSession, fn, *args, **kwargs):
+    """
+    Runs sync ORM code against either kind of session. With an AsyncSession
+    the statements go through the async driver instead of blocking the loop.
+    """
+
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return fn(db, *args, **kwargs)
@@ -1,7 +1,26 @@
+import time
 import redis.asyncio as redis
 from app.core.config import REDIS_URL
+from app.core.metrics import REDIS_COMMAND_SECONDS, REDIS_ERRORS
 
-redis_client = redis.from_url(
+
+class InstrumentedRedis(redis.Redis):
+    """Times every command, including rate limiter scripts (EVALSHA)."""
+
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper() if args else "UNKNOWN"
+        start = time.perf_counter()
+
+        try:
+            return await super().execute_command(*args, **options)
+        except Exception:
+            REDIS_ERRORS.labels(command=command).inc()
+            raise
+        finally:
+            REDIS_COMMAND_SECONDS.labels(command=command).observe(time.perf_counter() - start)
+
+
+redis_client = InstrumentedRedis.from_url(
     REDIS_URL,
     decode_responses=True
 )
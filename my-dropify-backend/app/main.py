@@ -1,55 +1,213 @@
 import os
+import time
 import asyncio
+import logging
+from datetime import datetime
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
-from app.db.database import init_db, SessionLocal
-from app.routers import health, sessions
-from app.websocket.manager import manager
+from starlette.concurrency import run_in_threadpool
+from app.db.database import (
+    init_db,
+    SessionLocal,
+    AsyncSessionLocal,
+    warm_up_pool,
+    warm_up_async_pool,
+)
+from app.core.config import (
+    DB_POOL_WARMUP,
+    EXPIRY_FALLBACK_SWEEP_SECONDS,
+    CODE_POOL_RESYNC_SECONDS,
+    STORAGE_GC_INTERVAL_SECONDS,
+    STORAGE_GC_RECONCILE_SECONDS,
+)
+from app.services.session_code_pool import code_pool
+from app.routers import health, sessions, files
+from app.websocket.manager import (
+    manager,
+    SESSION_NOT_FOUND_CLOSE_CODE,
+    TRY_AGAIN_LATER_CLOSE_CODE,
+)
+from app.websocket.lifecycle import run_connection
+from app.services.session_service import get_session_expiry_async, load_code_pool
+from app.services.session_cache import session_invalidation, invalidate_drop_list
+from app.core.upload_limit_middleware import UploadSizeLimitMiddleware
+from app.core.metrics_middleware import MetricsMiddleware
+from app.core.metrics import EXPIRY_SWEEP_SECONDS, EXPIRY_ROWS, mark_worker_stopped
 from app.services.expiry_service import cleanup_expired_sessions
 from app.services.drop_cleanup_service import cleanup_expired_drops
+from app.services.resumable_upload_service import cleanup_expired_uploads
+from app.services.expiry_scheduler import expiry_scheduler, SESSION, DROP, UPLOAD
+from app.services.storage_gc_service import collect_garbage, reconcile_upload_dir
+from app.services.storage_backends import storage
+from app.services.thumbnail_service import thumbnails, thumbnail_path
+
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_code_pool():
+    db = SessionLocal()
+    try:
+        load_code_pool(db)
+    finally:
+        db.close()
+
+
+def _rebuild_expiry_schedule():
+    db = SessionLocal()
+    try:
+        expiry_scheduler.rebuild(db)
+    finally:
+        db.close()
+
+
+def _run_expiry_cleanups(due: set[str]) -> tuple[list[dict], set[str]]:
+    """Returns the expired drops and the kinds left for another tick."""
+
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        expired_drops = []
+        deferred = set()
+
+        # Drops first so the DELETE_DROP list covers drops of expiring sessions
+        if DROP in due or SESSION in due:
+            expired = cleanup_expired_drops(db)
+            expired_drops = expired.drops
+            EXPIRY_ROWS.labels(kind="drops").inc(len(expired_drops))
+
+            # A backlog is left past the time budget; sessions wait for it
+            # so their drops are not removed without a DELETE_DROP
+            if expired.has_more:
+                deferred = {DROP} | (due & {SESSION})
+
+        if SESSION in due and SESSION not in deferred:
+            cleaned = cleanup_expired_sessions(db)
+            EXPIRY_ROWS.labels(kind="sessions").inc(cleaned.sessions)
+            EXPIRY_ROWS.labels(kind="drops_purged").inc(cleaned.drops_purged)
+            if cleaned.sessions:
+                print(f"Cleaned {cleaned.sessions} expired sessions")
+
+            if code_pool.needs_resync(CODE_POOL_RESYNC_SECONDS):
+                load_code_pool(db)
+
+        # Drop abandoned resumable uploads and their part files
+        if UPLOAD in due or SESSION in due:
+            EXPIRY_ROWS.labels(kind="uploads").inc(cleanup_expired_uploads(db))
+
+        return expired_drops, deferred
+    finally:
+        db.close()
+        EXPIRY_SWEEP_SECONDS.observe(time.perf_counter() - start)
+
+
+async def expire_due(due: set[str]):
+    expired_drops, deferred = await run_in_threadpool(_run_expiry_cleanups, due)
+
+    for session_code in {drop["session_code"] for drop in expired_drops}:
+        await invalidate_drop_list(session_code)
+
+    # 🔥 Broadcast drop deletions
+    for drop in expired_drops:
+        await manager.broadcast(
+            drop["session_code"],
+            {
+                "event": "DELETE_DROP",
+                "id": drop["id"],
+            },
+        )
+
+    # Pick the backlog up again on the runner's next pass
+    for kind in deferred:
+        expiry_scheduler.schedule(kind, None, datetime.utcnow())
+
+
+def _run_storage_gc(reconcile: bool):
+    db = SessionLocal()
+    try:
+        reclaimed = collect_garbage(db)
+        if reconcile:
+            orphans = reconcile_upload_dir(db)
+            reclaimed["files_removed"] += orphans["files_removed"]
+            reclaimed["bytes_reclaimed"] += orphans["bytes_reclaimed"]
+
+        if reclaimed["files_removed"]:
+            logger.info(
+                "Storage GC removed %d files, %d bytes",
+                reclaimed["files_removed"],
+                reclaimed["bytes_reclaimed"],
+            )
+    finally:
+        db.close()
+
+
+async def storage_gc_loop():
+    loop = asyncio.get_running_loop()
+    next_reconcile = loop.time() + STORAGE_GC_RECONCILE_SECONDS
+
+    while True:
+        await asyncio.sleep(STORAGE_GC_INTERVAL_SECONDS)
+
+        reconcile = loop.time() >= next_reconcile
+        if reconcile:
+            next_reconcile = loop.time() + STORAGE_GC_RECONCILE_SECONDS
+
+        try:
+            await run_in_threadpool(_run_storage_gc, reconcile)
+        except Exception:
+            logger.exception("Storage GC run failed")
+
+
+async def thumbnail_ready(session_code: str, drop_id: int, path: str):
+    await invalidate_drop_list(session_code)
+    await manager.broadcast(
+        session_code,
+        {
+            "event": "THUMBNAIL_READY",
+            "id": drop_id,
+            "thumbnail": {
+                "status": "ready",
+                "url": storage.url_for(str(thumbnail_path(path))),
+            },
+        },
+    )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
 
-    task = None
-
-    # 🔥 DO NOT RUN EXPIRY LOOP DURING TESTS
-    if os.getenv("TESTING") != "1" and os.getenv("RUN_EXPIRY_LOOP", "true") == "true":
+    # Open pooled connections before the app starts taking traffic
+    await run_in_threadpool(warm_up_pool, DB_POOL_WARMUP)
+    await warm_up_async_pool(DB_POOL_WARMUP)
 
-        async def expiry_loop():
-            while True:
-                db = SessionLocal()
-                try:
-                    # Clean sessions
-                    deleted_sessions = cleanup_expired_sessions(db)
+    # Build the free session code pool off the event loop
+    await run_in_threadpool(_warm_code_pool)
 
-                    # Clean drops (returns list of expired drop IDs)
-                    expired_drop_ids = cleanup_expired_drops(db)
+    # Rendered image thumbnails are announced on the session's sockets
+    thumbnails.start(thumbnail_ready)
 
-                    if deleted_sessions:
-                        print(f"Cleaned {deleted_sessions} expired sessions")
+    task = None
+    gc_task = None
 
-                    # 🔥 Broadcast drop deletions
-                    for drop in expired_drop_ids:
-                        await manager.broadcast(
-                            drop["session_code"],
-                            {
-                                "event": "DELETE_DROP",
-                                "id": drop["id"],
-                            },
-                        )
+    # 🔥 DO NOT RUN EXPIRY LOOP DURING TESTS
+    if os.getenv("TESTING") != "1" and os.getenv("RUN_EXPIRY_LOOP", "true") == "true":
+        expiry_scheduler.start()
+        await run_in_threadpool(_rebuild_expiry_schedule)
 
-                finally:
-                    db.close()
+        task = asyncio.create_task(
+            expiry_scheduler.run(expire_due, EXPIRY_FALLBACK_SWEEP_SECONDS)
+        )
 
-                await asyncio.sleep(5)  # every 5 seconds
+        # Deletes the files behind dead drops, off the event loop
+        gc_task = asyncio.create_task(storage_gc_loop())
 
-        task = asyncio.create_task(expiry_loop())
+    # Other workers' early expiries evict this worker's cached sessions
+    invalidation_task = None
+    if session_invalidation is not None:
+        invalidation_task = asyncio.create_task(session_invalidation.listen())
 
     yield
 
@@ -59,10 +217,34 @@ async def lifespan(app: FastAPI):
             await task
         except asyncio.CancelledError:
             pass
+        expiry_scheduler.stop()
+
+    if gc_task:
+        gc_task.cancel()
+        try:
+            await gc_task
+        except asyncio.CancelledError:
+            pass
+
+    if invalidation_task:
+        invalidation_task.cancel()
+        try:
+            await invalidation_task
+        except asyncio.CancelledError:
+            pass
+
+    thumbnails.shutdown()
+
+    await manager.shutdown()
+
+    mark_worker_stopped()
 
 
 app = FastAPI(lifespan=lifespan)
 
+# Added first so CORS wraps it and 413s still carry CORS headers
+app.add_middleware(UploadSizeLimitMiddleware)
+
 from app.core.config import FRONTEND_URL
 
 app.add_middleware(
@@ -79,9 +261,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-
+# Outermost, so the timing covers the other middleware and their 413s
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 def root():
@@ -90,13 +271,32 @@ def root():
 
 app.include_router(health.router)
 app.include_router(sessions.router)
+app.include_router(files.router)
+
+
+async def _live_session_expiry(code: str):
+    async with AsyncSessionLocal() as db:
+        return await get_session_expiry_async(db, code)
 
 
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
+    expires_at = await _live_session_expiry(session_id)
+
+    if not expires_at:
+        await websocket.accept()
+        await websocket.close(code=SESSION_NOT_FOUND_CLOSE_CODE)
+        return
+
+    if not manager.can_accept(session_id):
+        await websocket.accept()
+        await websocket.close(code=TRY_AGAIN_LATER_CLOSE_CODE)
+        return
+
     await manager.connect(session_id, websocket)
     try:
-        while True:
-            await asyncio.sleep(3600)
+        await run_connection(manager, session_id, websocket, expires_at)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(session_id, websocket)
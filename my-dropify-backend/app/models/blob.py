@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger
+from datetime import datetime
+from app.models.base import Base
+
+
+# ref_count of a blob whose file is being deleted; it can't be reused or
+# replaced until the GC removes the row
+COLLECTING = -1
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    # Hex SHA-256 of the file content
+    sha256 = Column(String(64), primary_key=True)
+
+    path = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+
+    # Number of drops pointing at this blob; COLLECTING while the storage
+    # GC deletes its file
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
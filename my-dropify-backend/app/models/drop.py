@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index, text
 from datetime import datetime
+from app.core.config import TEXT_COMPRESSION_MIN_BYTES
 from app.models.base import Base
+from app.models.types import CompressedText
 
 
 class Drop(Base):
@@ -9,8 +11,10 @@ class Drop(Base):
     id = Column(Integer, primary_key=True, index=True)
     session_code = Column(String, index=True)
 
-    content = Column(String, nullable=True)
+    # Large text/code drops are stored compressed (drop types never start with "~")
+    content = Column(CompressedText(TEXT_COMPRESSION_MIN_BYTES), nullable=True)
     file_path = Column(String, nullable=True)
+    blob_sha256 = Column(String(64), nullable=True, index=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -18,7 +22,33 @@ class Drop(Base):
 
     burn_after_read = Column(Boolean, default=False)
     is_deleted = Column(Boolean, default=False)
+    # Lets incremental sync report drops deleted since a client's cursor
+    deleted_at = Column(DateTime, nullable=True)
 
     # Needed for one-time downloads
     download_token = Column(String, unique=True, nullable=True)
     is_downloaded = Column(Boolean, default=False)
+
+    # Lets the client that claimed a one-time download resume it
+    downloaded_at = Column(DateTime, nullable=True)
+    download_resume_key = Column(String, nullable=True)
+
+    # Mirrors migrations/versions/0003_hot_query_indexes.py
+    __table_args__ = (
+        # Live drops of a session, listed by id
+        Index(
+            "ix_drops_session_live",
+            "session_code",
+            "id",
+            sqlite_where=text("is_deleted = 0"),
+            postgresql_where=text("is_deleted = false"),
+        ),
+        # Undeleted drops by expiry, for the drop sweep
+        Index(
+            "ix_drops_pending_expiry",
+            "expires_at",
+            sqlite_where=text("is_deleted = 0 AND expires_at IS NOT NULL"),
+            postgresql_where=text("is_deleted = false AND expires_at IS NOT NULL"),
+        ),
+        Index("ix_drops_expires_at", "expires_at"),
+    )
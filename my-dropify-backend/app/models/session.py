@@ -14,5 +14,6 @@ class Session(Base):
     expires_at = Column(
         DateTime,
         nullable=False,
+        index=True,
         default=lambda: datetime.utcnow() + timedelta(hours=1)
     )
@@ -0,0 +1,40 @@
+import base64
+import zlib
+from sqlalchemy import String
+from sqlalchemy.types import TypeDecorator
+
+
+class CompressedText(TypeDecorator):
+    """
+    String column that stores values of `min_bytes` or more zlib-compressed
+    and base85-encoded, behind a marker no plain value starts with. Reads
+    are transparent, and rows written uncompressed read back unchanged.
+    """
+
+    impl = String
+    cache_ok = True
+
+    MARKER = "~z:"
+
+    def __init__(self, min_bytes: int, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_bytes = min_bytes
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+
+        raw = value.encode("utf-8")
+        if len(raw) < self.min_bytes:
+            return value
+
+        packed = self.MARKER + base64.b85encode(zlib.compress(raw, 6)).decode("ascii")
+
+        # Already dense content (e.g. random tokens) is kept as it is
+        return packed if len(packed) < len(raw) else value
+
+    def process_result_value(self, value, dialect):
+        if value is None or not value.startswith(self.MARKER):
+            return value
+
+        return zlib.decompress(base64.b85decode(value[len(self.MARKER):])).decode("utf-8")
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, DateTime, Boolean, BigInteger
+from datetime import datetime
+from app.models.base import Base
+
+
+class Upload(Base):
+    __tablename__ = "uploads"
+
+    id = Column(String, primary_key=True)
+    session_code = Column(String, index=True, nullable=False)
+
+    filename = Column(String, nullable=False)
+    extension = Column(String, nullable=False)
+
+    total_size = Column(BigInteger, nullable=False)
+    received_bytes = Column(BigInteger, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    is_complete = Column(Boolean, default=False)
+
+    # Set for direct uploads, which the client PUTs straight to storage
+    sha256 = Column(String(64), nullable=True)
+    content_type = Column(String, nullable=True)
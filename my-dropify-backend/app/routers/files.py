@@ -0,0 +1,49 @@
+from pathlib import Path
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.services import file_service
+from app.services.file_service import receive_signed_put, UploadCapacityError
+from app.services.file_delivery_service import serve_file
+from app.services.storage_backends import storage, LocalStorageBackend
+
+router = APIRouter()
+
+
+@router.api_route("/uploads/{file_path:path}", methods=["GET", "HEAD"])
+def get_uploaded_file(file_path: str, request: Request):
+    root = file_service.UPLOAD_DIR.resolve()
+    target = (root / file_path).resolve()
+
+    # Temp and in-progress files are dot-prefixed and never served
+    hidden = any(part.startswith(".") for part in Path(file_path).parts)
+
+    if hidden or root not in target.parents or not target.is_file():
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    return serve_file(request, target, compressible=target.suffix == ".txt")
+
+
+@router.put("/storage/{key:path}")
+async def put_signed_object(
+    key: str,
+    request: Request,
+    expires: int,
+    sha256: str,
+    size: int,
+    signature: str,
+):
+    """Target of the local backend's presigned upload URLs."""
+
+    if not isinstance(storage, LocalStorageBackend) or not storage.verify_put(
+        key, expires, sha256, size, signature
+    ):
+        raise HTTPException(status_code=403, detail="Invalid or expired upload URL")
+
+    try:
+        await receive_signed_put(key, sha256, size, request.stream())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadCapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return Response(status_code=200)
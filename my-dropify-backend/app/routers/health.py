@@ -1,4 +1,13 @@
 from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.db.database import engine, async_engine
+from app.core.metrics import render, CONTENT_TYPE
+from app.db.pool import pool_snapshot
+from app.services.session_cache import session_cache
+from app.services.drop_list_cache import drop_list_cache
+from app.services.storage_gc_service import storage_gc_stats
+from app.websocket.manager import manager
 
 router = APIRouter()
 
@@ -6,3 +15,38 @@ router = APIRouter()
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@router.get("/health/db")
+def db_pool_health():
+    return {
+        "sync_pool": pool_snapshot(engine.pool),
+        "async_pool": pool_snapshot(async_engine.pool),
+        "session_cache": session_cache.snapshot(),
+        "drop_list_cache": drop_list_cache.snapshot(),
+    }
+
+
+@router.get("/health/storage")
+def storage_health():
+    return {"gc": storage_gc_stats.snapshot()}
+
+
+@router.get("/health/websockets")
+def websocket_health():
+    stats = manager.stats
+    return {
+        "sessions": len(manager.active_connections),
+        "queue_depth": manager.queue_depths(),
+        "broadcasts": stats.broadcasts,
+        "messages_enqueued": stats.messages_enqueued,
+        "messages_dropped": stats.messages_dropped,
+        "slow_consumer_disconnects": stats.slow_consumer_disconnects,
+        "send_failures": stats.send_failures,
+    }
+
+
+@router.get("/metrics")
+def metrics():
+    """Metrics in Prometheus text format, of all workers in multiprocess mode."""
+    return Response(render(), media_type=CONTENT_TYPE)
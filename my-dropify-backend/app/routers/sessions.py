@@ -1,28 +1,74 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Request, Header, Response
+from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update, select
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import os
-
-from app.db.database import get_db
-from app.services.session_service import create_session, get_session_by_code
+import json
+import secrets
+
+from app.db.database import get_db, get_async_db
+from app.services.session_service import (
+    create_session_async,
+    get_session_expiry,
+    get_session_expiry_async,
+)
+from app.services.session_cache import invalidate_session, invalidate_drop_list
+from app.services.drop_list_cache import drop_list_cache
 from app.services.drop_service import (
-    create_text_drop,
+    create_text_drop_async,
     get_drops_by_session,
-    atomic_consume_drop,
+    get_drops_page,
+    decode_cursor,
+    ResyncRequiredError,
+    DEFAULT_PAGE_SIZE,
+    get_drop_async,
+    atomic_consume_drop_async,
+)
+from app.services.file_service import (
+    save_file,
+    get_blob,
+    create_drop_from_blob,
+    UploadCapacityError,
+)
+from app.services.resumable_upload_service import (
+    create_upload,
+    get_upload,
+    get_upload_async,
+    append_chunk,
+    finalize_upload,
+    presign_direct_upload,
+    UploadConflictError,
+)
+from app.services.storage_backends import storage
+from app.services.thumbnail_service import thumbnails, thumbnail_path, is_image
+from app.services.file_delivery_service import (
+    serve_file,
+    IMMUTABLE_CACHE_CONTROL,
+    PRIVATE_CACHE_CONTROL,
+    etag_matches,
 )
-from app.services.file_service import save_file
 from app.services.qrcode_service import generate_session_qrcode
+from app.services.compression_service import negotiate, compress
 from app.websocket.manager import manager
+from app.services.expiry_scheduler import expiry_scheduler, SESSION as SESSION_EXPIRY
 from app.core.dependencies import rate_limit_dependency
+from app.core.advanced_rate_limit_dependency import limit_text_drops, limit_file_drops
+from app.core.config import (
+    MAX_UPLOAD_CHUNK_SIZE,
+    DOWNLOAD_RESUME_WINDOW_SECONDS,
+    RESPONSE_COMPRESSION_MIN_BYTES,
+)
 from app.models.session import Session as SessionModel
 from app.models.drop import Drop
 
 
 router = APIRouter()
 
+DOWNLOAD_RESUME_COOKIE = "dropify_resume"
+
 
 # =========================
 # REQUEST MODELS
@@ -38,15 +84,169 @@ class TextDropRequest(BaseModel):
     burn_after_read: bool = False
 
 
+class BlobDropRequest(BaseModel):
+    sha256: str
+    filename: str
+
+
+class CreateUploadRequest(BaseModel):
+    filename: str
+    size: int
+    content_type: str | None = None
+
+
+class DirectUploadRequest(BaseModel):
+    filename: str
+    size: int
+    sha256: str
+    content_type: str
+
+
 # =========================
 # HELPERS
 # =========================
 
-def _require_session(db: Session, code: str):
-    session = get_session_by_code(db, code)
-    if not session:
+def _require_session(db: Session, code: str) -> datetime:
+    """Returns the live session's expires_at, or 404s."""
+
+    expires_at = get_session_expiry(db, code)
+    if not expires_at:
         raise HTTPException(status_code=404, detail="Session not found")
-    return session
+    return expires_at
+
+
+async def _require_session_async(db: AsyncSession, code: str) -> datetime:
+    expires_at = await get_session_expiry_async(db, code)
+    if not expires_at:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return expires_at
+
+
+def _require_upload(db: Session, code: str, upload_id: str):
+    upload = get_upload(db, code, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+async def _require_upload_async(db: AsyncSession, code: str, upload_id: str):
+    upload = await get_upload_async(db, code, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+def _thumbnail(drop: Drop) -> dict | None:
+    """
+    Thumbnail of a locally stored image drop, queued on first sight.
+    While it is pending clients show the original; THUMBNAIL_READY
+    follows on the socket.
+    """
+
+    if not is_image(drop.file_path) or storage.local_path(drop.file_path) is None:
+        return None
+
+    status = thumbnails.request(drop.file_path, drop.session_code, drop.id)
+    if status is None:
+        return None
+
+    return {
+        "status": status,
+        "url": storage.url_for(str(thumbnail_path(drop.file_path))) if status == "ready" else None,
+    }
+
+
+def _file_drop_event(drop: Drop) -> dict:
+    return {
+        "event": "NEW_DROP",
+        "id": drop.id,
+        "type": "file",
+        "path": drop.file_path,
+        "url": storage.url_for(drop.file_path),
+        "thumbnail": _thumbnail(drop),
+        "created_at": drop.created_at.isoformat(),
+        "expires_at": drop.expires_at.isoformat()
+        if drop.expires_at else None,
+    }
+
+
+def _drop_payload(drop: Drop) -> dict:
+    if drop.file_path:
+        return {
+            "id": drop.id,
+            "type": "file",
+            "path": drop.file_path,
+            "url": storage.url_for(drop.file_path),
+            "thumbnail": _thumbnail(drop),
+            "created_at": drop.created_at.isoformat(),
+            "expires_at": drop.expires_at.isoformat()
+            if drop.expires_at else None,
+            "burn_after_read": drop.burn_after_read,
+        }
+
+    if "|" in drop.content:
+        drop_type, actual_content = drop.content.split("|", 1)
+    else:
+        drop_type = "text"
+        actual_content = drop.content
+
+    return {
+        "id": drop.id,
+        "type": drop_type,
+        "content": actual_content,
+        "created_at": drop.created_at.isoformat(),
+        "expires_at": drop.expires_at.isoformat()
+        if drop.expires_at else None,
+        "burn_after_read": drop.burn_after_read,
+    }
+
+
+def _serialize_drops(drops) -> bytes:
+    # Same encoding as JSONResponse
+    return json.dumps(
+        [_drop_payload(drop) for drop in drops],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _drops_page(
+    db: Session,
+    code: str,
+    since_id: int | None,
+    cursor: str | None,
+    limit: int | None,
+) -> dict:
+    since = None
+
+    try:
+        if cursor is not None:
+            since_id, since = decode_cursor(cursor)
+
+        page = get_drops_page(
+            db,
+            code,
+            since_id=since_id or 0,
+            since=since,
+            limit=DEFAULT_PAGE_SIZE if limit is None else limit,
+        )
+    except ResyncRequiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "drops": [_drop_payload(drop) for drop in page.drops],
+        "deleted": page.deleted,
+        "has_more": page.has_more,
+        "cursor": page.cursor,
+    }
+
+
+async def _broadcast_drop_event(code: str, event: dict):
+    # Every NEW_DROP / DELETE_DROP also makes the cached drop list stale
+    await invalidate_drop_list(code)
+    await manager.broadcast(code, event)
 
 
 # =========================
@@ -54,28 +254,26 @@ def _require_session(db: Session, code: str):
 # =========================
 
 @router.post("/sessions", dependencies=[Depends(rate_limit_dependency)])
-async def create(db: Session = Depends(get_db)):
-    session = create_session(db)
+async def create(db: AsyncSession = Depends(get_async_db)):
+    session = await create_session_async(db)
     return {"code": session.code}
 
 
 @router.get("/sessions/{code}")
 def get_session(code: str, db: Session = Depends(get_db)):
-    session = _require_session(db, code)
+    expires_at = _require_session(db, code)
     return {
-        "code": session.code,
-        "expires_at": session.expires_at.isoformat()
-        if session.expires_at else None,
+        "code": code,
+        "expires_at": expires_at.isoformat(),
     }
 
 
 @router.post("/sessions/join")
 def join(data: JoinRequest, db: Session = Depends(get_db)):
-    session = _require_session(db, data.code)
+    expires_at = _require_session(db, data.code)
     return {
-        "code": session.code,
-        "expires_at": session.expires_at.isoformat()
-        if session.expires_at else None,
+        "code": data.code,
+        "expires_at": expires_at.isoformat(),
     }
 
 
@@ -84,54 +282,72 @@ def join(data: JoinRequest, db: Session = Depends(get_db)):
 # =========================
 
 @router.get("/sessions/{code}/drops")
-def get_drops(code: str, db: Session = Depends(get_db)):
+def get_drops(
+    code: str,
+    request: Request,
+    since_id: int | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+    db: Session = Depends(get_db),
+):
     _require_session(db, code)
 
-    drops = get_drops_by_session(db, code)
-    result = []
-
-    for drop in drops:
-
-        if drop.file_path:
-            result.append({
-                "id": drop.id,
-                "type": "file",
-                "path": drop.file_path,
-                "created_at": drop.created_at.isoformat(),
-                "expires_at": drop.expires_at.isoformat()
-                if drop.expires_at else None,
-                "burn_after_read": drop.burn_after_read,
-            })
-        else:
-            if "|" in drop.content:
-                drop_type, actual_content = drop.content.split("|", 1)
-            else:
-                drop_type = "text"
-                actual_content = drop.content
-
-            result.append({
-                "id": drop.id,
-                "type": drop_type,
-                "content": actual_content,
-                "created_at": drop.created_at.isoformat(),
-                "expires_at": drop.expires_at.isoformat()
-                if drop.expires_at else None,
-                "burn_after_read": drop.burn_after_read,
-            })
-
-    return result
-
-
-@router.post("/sessions/{code}/drops/text")
+    # Incremental sync / paging; a plain request keeps returning the full list
+    if since_id is not None or cursor is not None or limit is not None:
+        return _drops_page(db, code, since_id, cursor, limit)
+
+    entry = drop_list_cache.get(code)
+
+    if entry is None:
+        version = drop_list_cache.version(code)
+        drops = get_drops_by_session(db, code)
+
+        expiries = [drop.expires_at for drop in drops if drop.expires_at]
+        entry = drop_list_cache.put(
+            code,
+            version,
+            _serialize_drops(drops),
+            min(expiries) if expiries else None,
+        )
+
+    body, etag = entry.body, entry.etag
+    headers = {"cache-control": "no-cache", "vary": "Accept-Encoding"}
+
+    encoding = None
+    if len(body) >= RESPONSE_COMPRESSION_MIN_BYTES:
+        encoding = negotiate(request.headers.get("accept-encoding"))
+
+    if encoding:
+        if encoding not in entry.encoded:
+            entry.encoded[encoding] = compress(entry.body, encoding)
+        body, etag = entry.encoded[encoding], f'{entry.etag[:-1]}-{encoding}"'
+        headers["content-encoding"] = encoding
+
+    headers["etag"] = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        etag_matches(if_none_match, etag) or etag_matches(if_none_match, entry.etag)
+    ):
+        headers.pop("content-encoding", None)
+        return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.post(
+    "/sessions/{code}/drops/text",
+    dependencies=[Depends(limit_text_drops)],
+)
 async def create_drop(
     code: str,
     data: TextDropRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    _require_session(db, code)
+    await _require_session_async(db, code)
 
     try:
-        drop = create_text_drop(
+        drop = await create_text_drop_async(
             db,
             code,
             data.content,
@@ -143,7 +359,7 @@ async def create_drop(
 
     drop_type, actual_content = drop.content.split("|", 1)
 
-    await manager.broadcast(
+    await _broadcast_drop_event(
         code,
         {
             "event": "NEW_DROP",
@@ -166,36 +382,223 @@ async def create_drop(
 
 @router.post(
     "/sessions/{code}/drops/file",
-    dependencies=[Depends(rate_limit_dependency)],
+    dependencies=[Depends(limit_file_drops)],
 )
 async def create_file_drop(
     code: str,
     file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+):
+    await _require_session_async(db, code)
+
+    try:
+        drop = await save_file(db, code, file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadCapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    await _broadcast_drop_event(code, _file_drop_event(drop))
+
+    return {
+        "id": drop.id,
+        "path": drop.file_path,
+        "url": storage.url_for(drop.file_path),
+    }
+
+
+# =========================
+# DEDUPLICATED BLOBS
+# =========================
+
+@router.get("/sessions/{code}/blobs/{sha256}")
+def check_blob(code: str, sha256: str, db: Session = Depends(get_db)):
+    _require_session(db, code)
+
+    blob = get_blob(db, sha256)
+    if not blob:
+        raise HTTPException(status_code=404, detail="Blob not found")
+
+    return {
+        "sha256": blob.sha256,
+        "size": blob.size,
+    }
+
+
+@router.post(
+    "/sessions/{code}/drops/blob",
+    dependencies=[Depends(limit_file_drops)],
+)
+async def create_blob_drop(
+    code: str,
+    data: BlobDropRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    await _require_session_async(db, code)
+
+    try:
+        drop = await create_drop_from_blob(db, code, data.sha256, data.filename)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await _broadcast_drop_event(code, _file_drop_event(drop))
+
+    return {
+        "id": drop.id,
+        "path": drop.file_path,
+        "url": storage.url_for(drop.file_path),
+    }
+
+
+# =========================
+# RESUMABLE UPLOADS
+# =========================
+
+@router.post(
+    "/sessions/{code}/uploads",
+    status_code=201,
+    dependencies=[Depends(limit_file_drops)],
+)
+def start_upload(
+    code: str,
+    data: CreateUploadRequest,
     db: Session = Depends(get_db),
 ):
     _require_session(db, code)
 
     try:
-        drop = await save_file(db, code, file)
+        upload = create_upload(
+            db,
+            code,
+            data.filename,
+            data.size,
+            content_type=data.content_type,
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    await manager.broadcast(
-        code,
-        {
-            "event": "NEW_DROP",
-            "id": drop.id,
-            "type": "file",
-            "path": drop.file_path,
-            "created_at": drop.created_at.isoformat(),
-            "expires_at": drop.expires_at.isoformat()
-            if drop.expires_at else None,
-        },
-    )
+    return {
+        "upload_id": upload.id,
+        "offset": upload.received_bytes,
+        "size": upload.total_size,
+        "max_chunk_size": MAX_UPLOAD_CHUNK_SIZE,
+        "expires_at": upload.expires_at.isoformat(),
+    }
+
+
+@router.post(
+    "/sessions/{code}/uploads/direct",
+    status_code=201,
+    dependencies=[Depends(limit_file_drops)],
+)
+def start_direct_upload(
+    code: str,
+    data: DirectUploadRequest,
+    db: Session = Depends(get_db),
+):
+    """
+    The client PUTs the file to `upload.url` with `upload.headers`, then
+    calls .../complete. `upload` is null when storage already has the bytes.
+    """
+
+    _require_session(db, code)
+
+    try:
+        upload = create_upload(
+            db,
+            code,
+            data.filename,
+            data.size,
+            content_type=data.content_type,
+            sha256=data.sha256,
+        )
+        presigned = presign_direct_upload(db, upload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "upload_id": upload.id,
+        "size": upload.total_size,
+        "expires_at": upload.expires_at.isoformat(),
+        "upload": {
+            "method": "PUT",
+            "url": presigned.url,
+            "headers": presigned.headers,
+            "expires_at": presigned.expires_at.isoformat(),
+        } if presigned else None,
+    }
+
+
+@router.get("/sessions/{code}/uploads/{upload_id}")
+def get_upload_status(
+    code: str,
+    upload_id: str,
+    db: Session = Depends(get_db),
+):
+    upload = _require_upload(db, code, upload_id)
+
+    return {
+        "upload_id": upload.id,
+        "offset": upload.received_bytes,
+        "size": upload.total_size,
+    }
+
+
+@router.patch("/sessions/{code}/uploads/{upload_id}")
+async def upload_chunk(
+    code: str,
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # The session may have ended since the upload started
+    await _require_session_async(db, code)
+    upload = await _require_upload_async(db, code, upload_id)
+
+    try:
+        offset = await append_chunk(db, upload, upload_offset, request.stream())
+    except UploadConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadCapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "upload_id": upload.id,
+        "offset": offset,
+        "size": upload.total_size,
+    }
+
+
+@router.post("/sessions/{code}/uploads/{upload_id}/complete")
+async def complete_upload(
+    code: str,
+    upload_id: str,
+    db: AsyncSession = Depends(get_async_db),
+):
+    await _require_session_async(db, code)
+    upload = await _require_upload_async(db, code, upload_id)
+
+    try:
+        drop = await finalize_upload(db, upload)
+    except UploadConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadCapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    # Only a finished upload is announced to the session
+    await _broadcast_drop_event(code, _file_drop_event(drop))
 
     return {
         "id": drop.id,
         "path": drop.file_path,
+        "url": storage.url_for(drop.file_path),
     }
 
 
@@ -207,14 +610,9 @@ async def create_file_drop(
 async def consume_drop(
     code: str,
     drop_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    drop = (
-        db.query(Drop)
-        .filter(Drop.id == drop_id)
-        .filter(Drop.session_code == code)
-        .first()
-    )
+    drop = await get_drop_async(db, code, drop_id)
 
     if not drop:
         raise HTTPException(status_code=404, detail="Drop not found")
@@ -222,10 +620,10 @@ async def consume_drop(
     if not drop.burn_after_read:
         return {"consumed": False}
 
-    was_consumed = atomic_consume_drop(db, drop_id)
+    was_consumed = await atomic_consume_drop_async(db, drop_id)
 
     if was_consumed:
-        await manager.broadcast(
+        await _broadcast_drop_event(
             code,
             {
                 "event": "DELETE_DROP",
@@ -240,8 +638,47 @@ async def consume_drop(
 # ONE-TIME DOWNLOAD
 # =========================
 
+def _can_resume_download(drop: Drop, request: Request) -> bool:
+    """
+    A claimed one-time download may only be continued with a Range request
+    from the client that claimed it, within the resume window.
+    """
+
+    if "range" not in request.headers:
+        return False
+
+    resume_key = request.cookies.get(DOWNLOAD_RESUME_COOKIE)
+    if not resume_key or not drop.download_resume_key:
+        return False
+
+    if not secrets.compare_digest(resume_key, drop.download_resume_key):
+        return False
+
+    window_end = drop.downloaded_at + timedelta(seconds=DOWNLOAD_RESUME_WINDOW_SECONDS)
+    return datetime.utcnow() < window_end
+
+
+def _deliver_download(request: Request, drop: Drop) -> Response:
+    filename = os.path.basename(drop.file_path)
+    path = storage.local_path(drop.file_path)
+
+    # Remote storage serves the bytes itself
+    if path is None:
+        return RedirectResponse(storage.url_for(drop.file_path, filename=filename), status_code=307)
+
+    return serve_file(
+        request,
+        path,
+        filename=filename,
+        media_type="application/octet-stream",
+        cache_control=PRIVATE_CACHE_CONTROL,
+        conditional=False,
+        compressible=path.suffix == ".txt",
+    )
+
+
 @router.get("/downloads/{token}")
-def download_file(token: str, db: Session = Depends(get_db)):
+def download_file(token: str, request: Request, db: Session = Depends(get_db)):
 
     drop = (
         db.query(Drop)
@@ -253,17 +690,27 @@ def download_file(token: str, db: Session = Depends(get_db)):
     if not drop:
         raise HTTPException(status_code=404, detail="Invalid or expired link")
 
-    if drop.is_downloaded:
+    # Checked first: the storage GC removes the file once the resume window ends
+    if drop.is_downloaded and not _can_resume_download(drop, request):
         raise HTTPException(status_code=410, detail="File already downloaded")
 
-    if not drop.file_path or not os.path.exists(drop.file_path):
+    if not drop.file_path or not storage.exists(drop.file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
+    if drop.is_downloaded:
+        return _deliver_download(request, drop)
+
+    resume_key = secrets.token_urlsafe(32)
+
     result = db.execute(
         update(Drop)
         .where(Drop.id == drop.id)
         .where(Drop.is_downloaded == False)
-        .values(is_downloaded=True)
+        .values(
+            is_downloaded=True,
+            downloaded_at=datetime.utcnow(),
+            download_resume_key=resume_key,
+        )
     )
 
     db.commit()
@@ -271,20 +718,38 @@ def download_file(token: str, db: Session = Depends(get_db)):
     if result.rowcount == 0:
         raise HTTPException(status_code=410, detail="File already downloaded")
 
-    return FileResponse(
-        path=drop.file_path,
-        filename=os.path.basename(drop.file_path),
-        media_type="application/octet-stream",
+    response = _deliver_download(request, drop)
+
+    response.set_cookie(
+        DOWNLOAD_RESUME_COOKIE,
+        resume_key,
+        max_age=DOWNLOAD_RESUME_WINDOW_SECONDS,
+        path=f"/downloads/{token}",
+        httponly=True,
+        samesite="lax",
     )
 
+    return response
+
 
 # =========================
 # QR CODE
 # =========================
 
 @router.get("/sessions/{code}/qrcode")
-def get_qrcode(code: str):
-    return generate_session_qrcode(code)
+async def get_qrcode(code: str, request: Request, format: str = "png"):
+    try:
+        rendered = await generate_session_qrcode(code, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"etag": rendered.etag, "cache-control": IMMUTABLE_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, rendered.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(rendered.body, media_type=rendered.media_type, headers=headers)
 
 
 # =========================
@@ -292,17 +757,22 @@ def get_qrcode(code: str):
 # =========================
 
 @router.delete("/sessions/{code}/expire")
-def expire_session(code: str, db: Session = Depends(get_db)):
-    session = (
-        db.query(SessionModel)
-        .filter(SessionModel.code == code)
-        .first()
+async def expire_session(code: str, db: AsyncSession = Depends(get_async_db)):
+    session = await db.scalar(
+        select(SessionModel).where(SessionModel.code == code)
     )
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
     session.expires_at = datetime.utcnow() - timedelta(seconds=1)
-    db.commit()
+    await db.commit()
+
+    await invalidate_session(code)
+
+    expiry_scheduler.schedule(SESSION_EXPIRY, code, session.expires_at)
+
+    # Close the session's sockets on every worker
+    await manager.expire_session(code)
 
     return {"expired": True}
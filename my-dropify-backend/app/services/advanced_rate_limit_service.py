@@ -1,34 +1,157 @@
+import math
+import os
 import time
+import uuid
 from fastapi import HTTPException
 from redis.asyncio import Redis
+from redis.exceptions import ConnectionError, TimeoutError
 from app.db.redis import redis_client
+from app.services.local_rate_limit_service import local_limits
 
 
-class SlidingWindowRateLimiter:
+# Checks every policy, then records the request in all of them only if
+# none is exhausted; one round trip, and atomic because Redis runs scripts
+# one at a time.
+#
+# KEYS[i]           sorted set of request timestamps for policy i
+# ARGV[1], ARGV[2]  now (ms), unique member for this request
+# ARGV[2i+1..2i+2]  limit and window (ms) of policy i
+#
+# Returns {allowed, retry_after_ms, remaining_1, ..., remaining_n}
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local member = ARGV[2]
+local counts = {}
+local allowed = 1
+local retry_after = 0
+
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[2 * i + 1])
+    local window = tonumber(ARGV[2 * i + 2])
+
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    counts[i] = redis.call('ZCARD', key)
+
+    if counts[i] >= limit then
+        allowed = 0
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        local wait = window
+        if oldest[2] then
+            wait = tonumber(oldest[2]) + window - now
+        end
+        if wait > retry_after then
+            retry_after = wait
+        end
+    end
+end
+
+local result = {allowed, retry_after}
+
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[2 * i + 1])
+    local window = tonumber(ARGV[2 * i + 2])
+
+    if allowed == 1 then
+        redis.call('ZADD', key, now, member)
+        redis.call('PEXPIRE', key, window)
+        counts[i] = counts[i] + 1
+    end
+
+    result[i + 2] = math.max(limit - counts[i], 0)
+end
 
-    def __init__(self, limit: int, window_seconds: int):
+return result
+"""
+
+
+class RatePolicy:
+    def __init__(self, name: str, limit: int, window_seconds: float):
+        self.name = name
         self.limit = limit
         self.window = window_seconds
-        self.redis: Redis = redis_client
 
-    async def check(self, key: str):
-        now = time.time()
-        window_start = now - self.window
 
-        # Remove expired timestamps
-        await self.redis.zremrangebyscore(key, 0, window_start)
+class RateLimitResult:
+    def __init__(self, allowed: bool, retry_after: float, remaining: list[tuple[RatePolicy, int]]):
+        self.allowed = allowed
+        self.retry_after = retry_after
+        self.remaining = remaining
+
+    def headers(self) -> dict:
+        if not self.remaining:
+            return {}
+
+        # Report the policy closest to running out
+        policy, remaining = min(self.remaining, key=lambda item: item[1])
+
+        headers = {
+            "X-RateLimit-Limit": str(policy.limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Policy": policy.name,
+        }
+
+        if not self.allowed:
+            # A policy with limit 0 never frees up; the local buckets say inf
+            retry_after = min(self.retry_after, max(policy.window for policy, _ in self.remaining))
+            headers["Retry-After"] = str(max(math.ceil(retry_after), 1))
+
+        return headers
 
-        # Count current requests in window
-        count = await self.redis.zcard(key)
 
-        if count >= self.limit:
+def _check_locally(checks: list[tuple[str, RatePolicy]]) -> RateLimitResult:
+    # Token buckets sized like the windows: same burst, same average rate
+    allowed, retry_after, remaining = local_limits.take_many(
+        [(key, policy.limit, policy.limit / policy.window) for key, policy in checks]
+    )
+
+    return RateLimitResult(
+        allowed,
+        retry_after,
+        [(policy, left) for (_, policy), left in zip(checks, remaining)],
+    )
+
+
+class SlidingWindowRateLimiter:
+
+    def __init__(self, limit: int = 0, window_seconds: int = 60, redis: Redis | None = None):
+        self.policy = RatePolicy("default", limit, window_seconds)
+        self.redis: Redis = redis or redis_client
+        self.script = self.redis.register_script(SLIDING_WINDOW_SCRIPT)
+
+    async def check_many(self, checks: list[tuple[str, RatePolicy]]) -> RateLimitResult:
+        """Evaluates several (key, policy) pairs as one atomic check."""
+
+        if os.getenv("TESTING") == "true":
+            return _check_locally(checks)
+
+        now_ms = int(time.time() * 1000)
+        args = [now_ms, f"{now_ms}-{uuid.uuid4().hex[:8]}"]
+        for _, policy in checks:
+            args += [policy.limit, int(policy.window * 1000)]
+
+        try:
+            allowed, retry_after_ms, *remaining = await self.script(
+                keys=[key for key, _ in checks],
+                args=args,
+            )
+        except (ConnectionError, TimeoutError):
+            # Keep limiting with the buckets shared by this host's workers
+            return _check_locally(checks)
+
+        return RateLimitResult(
+            bool(allowed),
+            int(retry_after_ms) / 1000,
+            [(policy, int(left)) for (_, policy), left in zip(checks, remaining)],
+        )
+
+    async def check(self, key: str):
+        result = await self.check_many([(key, self.policy)])
+
+        if not result.allowed:
             raise HTTPException(
                 status_code=429,
-                detail="Rate limit exceeded"
+                detail="Rate limit exceeded",
+                headers=result.headers(),
             )
 
-        # Add current timestamp
-        await self.redis.zadd(key, {str(now): now})
-
-        # Ensure key expires automatically
-        await self.redis.expire(key, self.window)
+        return result
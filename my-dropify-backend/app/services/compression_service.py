@@ -0,0 +1,114 @@
+import gzip
+import os
+import uuid
+import zlib
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # br is offered only when the package is installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # likewise for zstd
+    zstandard = None
+
+from app.core.config import UPLOAD_CHUNK_SIZE
+
+
+# Preferred first when a client accepts several equally
+ENCODINGS = [
+    encoding
+    for encoding, available in (("zstd", zstandard), ("br", brotli), ("gzip", True))
+    if available
+]
+
+# Precompressed copies of a stored file sit next to it with these suffixes
+SIDECAR_SUFFIXES = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Best supported encoding for an Accept-Encoding header, or None."""
+
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        # mtime=0 keeps the output, and so its ETag, identical across workers
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+
+def _compressor(encoding: str):
+    """Returns (feed, finish) for streaming compression."""
+
+    if encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress, compressor.flush
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        return compressor.process, compressor.finish
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        return compressor.compress, compressor.flush
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+
+def sidecar_path(path: str | Path, encoding: str) -> Path:
+    return Path(f"{path}{SIDECAR_SUFFIXES[encoding]}")
+
+
+def ensure_sidecar(path: str | Path, encoding: str) -> Path:
+    """
+    Compressed copy of an immutable stored file, written on first use.
+    Built in a temp file and renamed, so concurrent requests at worst
+    compress twice and never serve a partial copy.
+    """
+
+    target = sidecar_path(path, encoding)
+    if target.exists():
+        return target
+
+    tmp_path = target.with_name(f".{uuid.uuid4()}.part")
+    feed, finish = _compressor(encoding)
+
+    try:
+        with open(path, "rb") as source, open(tmp_path, "wb") as out:
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                out.write(feed(chunk))
+            out.write(finish())
+        os.replace(tmp_path, target)
+    finally:
+        try:
+            tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    return target
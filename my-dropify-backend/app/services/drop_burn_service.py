@@ -1,3 +1,4 @@
+from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import update
 from app.models.drop import Drop
@@ -11,7 +12,7 @@ def consume_burn_drop(db: Session, drop_id: int) -> bool:
             Drop.burn_after_read == True,
             Drop.is_deleted == False,
         )
-        .values(is_deleted=True)
+        .values(is_deleted=True, deleted_at=datetime.utcnow())
     )
 
     db.commit()
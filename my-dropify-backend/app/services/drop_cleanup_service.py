@@ -1,51 +1,64 @@
+import time
 from datetime import datetime, UTC
 from sqlalchemy.orm import Session
 from sqlalchemy import update, select
 
+from app.core.config import EXPIRY_BATCH_SIZE, EXPIRY_TIME_BUDGET_SECONDS
 from app.models.drop import Drop
 
 
-def cleanup_expired_drops(db: Session):
+class ExpiredDrops:
+    def __init__(self, drops: list[dict], has_more: bool):
+        self.drops = drops
+        self.has_more = has_more
+
+
+def cleanup_expired_drops(
+    db: Session,
+    batch_size: int = EXPIRY_BATCH_SIZE,
+    time_budget: float = EXPIRY_TIME_BUDGET_SECONDS,
+) -> ExpiredDrops:
     """
-    Finds drops that:
-    - have expires_at set
-    - are expired
-    - are not already deleted
+    Marks expired, not yet deleted drops deleted, oldest expiry first, in
+    batches of `batch_size`, each its own transaction. Stops starting new
+    batches once `time_budget` seconds have passed; `has_more` then says
+    a backlog is left for the next tick.
 
-    Marks them deleted.
-    Returns list of {id, session_code}
+    Returns {id, session_code} of every drop marked, for the broadcasts.
     """
 
     now = datetime.now(UTC)
+    deadline = time.monotonic() + time_budget
+    expired = []
+
+    while True:
+        # SKIP LOCKED (Postgres only) lets workers sweeping at once split the backlog
+        batch = (
+            select(Drop.id)
+            .where(Drop.expires_at != None)
+            .where(Drop.expires_at < now)
+            .where(Drop.is_deleted == False)
+            .order_by(Drop.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+
+        rows = db.execute(
+            update(Drop)
+            .where(Drop.id.in_(batch))
+            .where(Drop.is_deleted == False)
+            .values(is_deleted=True, deleted_at=now.replace(tzinfo=None))
+            .returning(Drop.id, Drop.session_code),
+            execution_options={"synchronize_session": False},
+        ).all()
+
+        # Their files are released by the storage GC
+        db.commit()
+
+        expired += [{"id": row.id, "session_code": row.session_code} for row in rows]
+
+        if len(rows) < batch_size:
+            return ExpiredDrops(expired, has_more=False)
 
-    # Get expired drops first
-    expired = (
-        db.query(Drop)
-        .filter(Drop.expires_at != None)
-        .filter(Drop.expires_at < now)
-        .filter(Drop.is_deleted == False)
-        .all()
-    )
-
-    if not expired:
-        return []
-
-    expired_ids = [d.id for d in expired]
-
-    # Mark them deleted in one atomic statement
-    db.execute(
-        update(Drop)
-        .where(Drop.id.in_(expired_ids))
-        .values(is_deleted=True)
-    )
-
-    db.commit()
-
-    # Return info needed for websocket broadcast
-    return [
-        {
-            "id": d.id,
-            "session_code": d.session_code,
-        }
-        for d in expired
-    ]
+        if time.monotonic() >= deadline:
+            return ExpiredDrops(expired, has_more=True)
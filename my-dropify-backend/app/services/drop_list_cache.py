@@ -0,0 +1,122 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from app.core.config import DROP_LIST_CACHE_SIZE, DROP_LIST_CACHE_MAX_AGE_SECONDS
+
+
+def _etag(body: bytes) -> str:
+    # Derived from the bytes rather than the version, so every worker
+    # hands out the same ETag for the same list
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+class DropListEntry:
+    __slots__ = ("version", "body", "etag", "valid_until", "encoded")
+
+    def __init__(self, version: int, body: bytes | None, valid_until: datetime | None):
+        self.version = version
+        self.body = body
+        self.etag = _etag(body) if body is not None else None
+        self.valid_until = valid_until
+        # Compressed bodies by content-coding, filled in on first request
+        self.encoded: dict[str, bytes] = {}
+
+
+class DropListCache:
+    """
+    Bounded LRU of session code -> serialized live drop list.
+
+    `invalidate` bumps the session's version and empties the entry; a list
+    built from a read that started before the bump is not stored.
+    """
+
+    def __init__(self, max_sessions: int, max_age_seconds: float):
+        self.max_sessions = max_sessions
+        self.max_age = timedelta(seconds=max_age_seconds)
+        self._entries: OrderedDict[str, DropListEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def version(self, code: str) -> int:
+        with self._lock:
+            entry = self._entries.get(code)
+            return entry.version if entry else 0
+
+    def get(self, code: str, now: datetime | None = None) -> DropListEntry | None:
+        now = now or datetime.utcnow()
+
+        with self._lock:
+            entry = self._entries.get(code)
+
+            if entry is None or entry.body is None or entry.valid_until <= now:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(code)
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        code: str,
+        version: int,
+        body: bytes,
+        earliest_expiry: datetime | None = None,
+    ) -> DropListEntry:
+        """
+        Stores the list built at `version`. `earliest_expiry` is the first
+        drop expiry in it, after which the list is out of date by itself.
+        """
+
+        valid_until = datetime.utcnow() + self.max_age
+        if earliest_expiry is not None:
+            valid_until = min(valid_until, earliest_expiry)
+
+        entry = DropListEntry(version, body, valid_until)
+
+        if self.max_sessions <= 0:
+            return entry
+
+        with self._lock:
+            current = self._entries.get(code)
+            if (current.version if current else 0) != version:
+                return entry
+
+            self._entries[code] = entry
+            self._entries.move_to_end(code)
+            self._evict()
+
+        return entry
+
+    def invalidate(self, code: str):
+        with self._lock:
+            current = self._entries.get(code)
+            version = current.version + 1 if current else 1
+            self._entries[code] = DropListEntry(version, None, None)
+            self._entries.move_to_end(code)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_sessions:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_sessions": self.max_sessions,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+drop_list_cache = DropListCache(DROP_LIST_CACHE_SIZE, DROP_LIST_CACHE_MAX_AGE_SECONDS)
@@ -1,15 +1,26 @@
 import html
-from datetime import datetime, timedelta
+import base64
+from datetime import datetime, timedelta, UTC
 from sqlalchemy.orm import Session
-from sqlalchemy import update, and_, or_
+from sqlalchemy import update, select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import TOMBSTONE_RETENTION_SECONDS
 from app.models.drop import Drop
-from app.models.session import Session as SessionModel
+from app.services.session_service import get_session_expiry, get_session_expiry_async
+from app.services.expiry_scheduler import expiry_scheduler, DROP
 
 
 MAX_TEXT_LENGTH = 5000
 DEFAULT_DROP_TTL_SECONDS = 3600
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Cursor times come from whichever worker answered; tombstones are
+# idempotent, so a little overlap is harmless
+TOMBSTONE_CLOCK_SKEW = timedelta(seconds=5)
+
 
 def _to_naive_utc(dt):
     if not dt:
@@ -19,14 +30,7 @@ def _to_naive_utc(dt):
     return dt
 
 
-def create_text_drop(
-    db: Session,
-    session_code: str,
-    content: str,
-    drop_type: str = "text",
-    burn_after_read: bool = False,
-) -> Drop:
-
+def _validate_text_drop(content: str, drop_type: str):
     if not content or not content.strip():
         raise ValueError("Content cannot be empty")
 
@@ -36,29 +40,28 @@ def create_text_drop(
     if drop_type not in ("text", "code"):
         raise ValueError("Invalid drop type")
 
-    session = (
-        db.query(SessionModel)
-        .filter(SessionModel.code == session_code)
-        .first()
-    )
-
-    if not session:
-        raise ValueError("Session does not exist")
 
+def _build_text_drop(
+    session_code: str,
+    session_expires_at: datetime,
+    content: str,
+    drop_type: str,
+    burn_after_read: bool,
+) -> Drop:
     clean_content = html.escape(content)
 
     now = datetime.utcnow()
 
     drop_expiry = now + timedelta(seconds=DEFAULT_DROP_TTL_SECONDS)
 
-    session_expiry = _to_naive_utc(session.expires_at)
+    session_expiry = _to_naive_utc(session_expires_at)
 
     if session_expiry and session_expiry < drop_expiry:
         drop_expiry = session_expiry
 
     stored_content = f"{drop_type}|{clean_content}"
 
-    drop = Drop(
+    return Drop(
         session_code=session_code,
         content=stored_content,
         burn_after_read=burn_after_read,
@@ -67,33 +70,192 @@ def create_text_drop(
         created_at=now,
     )
 
+
+def create_text_drop(
+    db: Session,
+    session_code: str,
+    content: str,
+    drop_type: str = "text",
+    burn_after_read: bool = False,
+) -> Drop:
+
+    _validate_text_drop(content, drop_type)
+
+    session_expires_at = get_session_expiry(db, session_code)
+
+    if not session_expires_at:
+        raise ValueError("Session does not exist")
+
+    drop = _build_text_drop(
+        session_code, session_expires_at, content, drop_type, burn_after_read
+    )
+
     db.add(drop)
     db.commit()
     db.refresh(drop)
 
+    expiry_scheduler.schedule(DROP, drop.id, drop.expires_at)
+
     return drop
 
 
-def get_drops_by_session(db: Session, session_code: str):
+async def create_text_drop_async(
+    db: AsyncSession,
+    session_code: str,
+    content: str,
+    drop_type: str = "text",
+    burn_after_read: bool = False,
+) -> Drop:
+
+    _validate_text_drop(content, drop_type)
+
+    session_expires_at = await get_session_expiry_async(db, session_code)
+
+    if not session_expires_at:
+        raise ValueError("Session does not exist")
+
+    drop = _build_text_drop(
+        session_code, session_expires_at, content, drop_type, burn_after_read
+    )
+
+    db.add(drop)
+    await db.commit()
+    await db.refresh(drop)
+
+    expiry_scheduler.schedule(DROP, drop.id, drop.expires_at)
+
+    return drop
+
+
+def _live_drops_query(session_code: str):
     now = datetime.utcnow()
 
     return (
-        db.query(Drop)
-        .filter(Drop.session_code == session_code)
-        .filter(Drop.is_deleted == False)
-        .filter(
+        select(Drop)
+        .where(Drop.session_code == session_code)
+        .where(Drop.is_deleted == False)
+        .where(
             or_(
                 Drop.expires_at == None,
                 Drop.expires_at > now
             )
         )
         .order_by(Drop.id.asc())
-        .all()
     )
 
 
-def atomic_consume_drop(db: Session, drop_id: int) -> bool:
-    result = db.execute(
+def get_drops_by_session(db: Session, session_code: str):
+    return db.scalars(_live_drops_query(session_code)).all()
+
+
+class ResyncRequiredError(Exception):
+    """The cursor predates the tombstones still kept; reload the full list."""
+
+
+class DropsPage:
+    def __init__(self, drops: list[Drop], deleted: list[int], has_more: bool, cursor: str):
+        self.drops = drops
+        self.deleted = deleted
+        self.has_more = has_more
+        self.cursor = cursor
+
+
+def encode_cursor(last_id: int, synced_at: datetime) -> str:
+    raw = f"{last_id}:{int(synced_at.replace(tzinfo=UTC).timestamp() * 1000)}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, datetime]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id, millis = base64.urlsafe_b64decode(padded).decode().split(":")
+        return int(last_id), datetime.fromtimestamp(int(millis) / 1000, UTC).replace(tzinfo=None)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def get_drops_page(
+    db: Session,
+    session_code: str,
+    since_id: int = 0,
+    since: datetime | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> DropsPage:
+    """
+    Live drops with id > since_id (at most `limit`, by id), plus the ids at
+    or below since_id that stopped being live after `since`; without
+    `since`, every one of them that is gone and still kept.
+
+    Gone drops are kept for TOMBSTONE_RETENTION_SECONDS; an older `since`
+    raises ResyncRequiredError, as its deleted list could miss some.
+    """
+
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    now = datetime.utcnow()
+
+    if since is not None and since < now - timedelta(seconds=TOMBSTONE_RETENTION_SECONDS):
+        raise ResyncRequiredError("Cursor is too old; reload the full drop list")
+
+    drops = db.scalars(
+        _live_drops_query(session_code)
+        .where(Drop.id > since_id)
+        .limit(limit + 1)
+    ).all()
+
+    has_more = len(drops) > limit
+    drops = drops[:limit]
+
+    deleted = []
+    if since_id > 0:
+        gone = or_(
+            Drop.is_deleted == True,
+            and_(Drop.expires_at != None, Drop.expires_at <= now),
+        )
+
+        if since is not None:
+            since = since - TOMBSTONE_CLOCK_SKEW
+            gone = or_(
+                and_(
+                    Drop.is_deleted == True,
+                    # Rows deleted before deleted_at existed have none
+                    or_(Drop.deleted_at == None, Drop.deleted_at > since),
+                ),
+                and_(
+                    Drop.is_deleted == False,
+                    Drop.expires_at <= now,
+                    Drop.expires_at > since,
+                ),
+            )
+
+        deleted = db.scalars(
+            select(Drop.id)
+            .where(Drop.session_code == session_code)
+            .where(Drop.id <= since_id)
+            .where(gone)
+            .order_by(Drop.id.asc())
+        ).all()
+
+    last_id = drops[-1].id if drops else since_id
+
+    return DropsPage(drops, list(deleted), has_more, encode_cursor(last_id, now))
+
+
+async def get_drops_by_session_async(db: AsyncSession, session_code: str):
+    return (await db.scalars(_live_drops_query(session_code))).all()
+
+
+async def get_drop_async(db: AsyncSession, session_code: str, drop_id: int) -> Drop | None:
+    return await db.scalar(
+        select(Drop)
+        .where(Drop.id == drop_id)
+        .where(Drop.session_code == session_code)
+    )
+
+
+def _consume_statement(drop_id: int):
+    return (
         update(Drop)
         .where(
             and_(
@@ -102,9 +264,21 @@ def atomic_consume_drop(db: Session, drop_id: int) -> bool:
                 Drop.is_deleted == False,
             )
         )
-        .values(is_deleted=True)
+        .values(is_deleted=True, deleted_at=datetime.utcnow())
     )
 
+
+def atomic_consume_drop(db: Session, drop_id: int) -> bool:
+    result = db.execute(_consume_statement(drop_id))
+
     db.commit()
 
     return result.rowcount > 0
+
+
+async def atomic_consume_drop_async(db: AsyncSession, drop_id: int) -> bool:
+    result = await db.execute(_consume_statement(drop_id))
+
+    await db.commit()
+
+    return result.rowcount > 0
@@ -0,0 +1,157 @@
+import asyncio
+import heapq
+import itertools
+import threading
+from datetime import datetime, UTC
+from typing import Awaitable, Callable
+from sqlalchemy.orm import Session
+
+from app.models.drop import Drop
+from app.models.session import Session as SessionModel
+from app.models.upload import Upload
+
+SESSION = "session"
+DROP = "drop"
+UPLOAD = "upload"
+
+OnDue = Callable[[set[str]], Awaitable[None]]
+
+
+def _to_naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        return dt.astimezone(UTC).replace(tzinfo=None)
+    return dt
+
+
+class ExpiryScheduler:
+    """
+    Min-heap of upcoming expiry deadlines. The runner sleeps until the
+    earliest one, then hands the kinds that are due to `on_due`, so the
+    database is only touched when something has actually expired.
+
+    `schedule` is thread-safe; sync routes call it from the threadpool.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int, str, object]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, kind: str, key, deadline: datetime | None):
+        # Nothing to track until a runner exists; start() rebuilds from the DB
+        if deadline is None or not self.running:
+            return
+
+        deadline = _to_naive_utc(deadline)
+
+        with self._lock:
+            earliest = self._heap[0][0] if self._heap else None
+            heapq.heappush(self._heap, (deadline, next(self._counter), kind, key))
+
+        if earliest is None or deadline < earliest:
+            self._wake()
+
+    def _wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except (AttributeError, RuntimeError):
+            pass
+
+    def rebuild(self, db: Session):
+        now = datetime.utcnow()
+        entries = []
+
+        for code, expires_at in db.query(SessionModel.code, SessionModel.expires_at):
+            entries.append((expires_at, SESSION, code))
+
+        for drop_id, expires_at in (
+            db.query(Drop.id, Drop.expires_at)
+            .filter(Drop.is_deleted == False)
+            .filter(Drop.expires_at != None)
+        ):
+            entries.append((expires_at, DROP, drop_id))
+
+        for upload_id, expires_at in db.query(Upload.id, Upload.expires_at):
+            entries.append((expires_at, UPLOAD, upload_id))
+
+        with self._lock:
+            self._heap = [
+                (_to_naive_utc(deadline) if deadline else now, next(self._counter), kind, key)
+                for deadline, kind, key in entries
+            ]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, now: datetime) -> set[str]:
+        due = set()
+
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, kind, _ = heapq.heappop(self._heap)
+                due.add(kind)
+
+        return due
+
+    def _seconds_to_next(self, now: datetime) -> float | None:
+        with self._lock:
+            if not self._heap:
+                return None
+            return max((self._heap[0][0] - now).total_seconds(), 0)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+
+    def stop(self):
+        self._loop = None
+        self._wakeup = None
+        with self._lock:
+            self._heap = []
+
+    async def run(self, on_due: OnDue, fallback_interval: float | None = None):
+        """
+        Runs until cancelled. `fallback_interval` forces a full pass every so
+        often to catch deadlines created by other workers.
+        """
+
+        if not self.running:
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        next_fallback = loop.time() + fallback_interval if fallback_interval else None
+
+        while True:
+            # Cleared before reading the heap so a concurrent schedule() is never missed
+            self._wakeup.clear()
+
+            now = datetime.utcnow()
+            due = self._pop_due(now)
+
+            if next_fallback is not None and loop.time() >= next_fallback:
+                due |= {DROP, SESSION, UPLOAD}
+                next_fallback = loop.time() + fallback_interval
+
+            if due:
+                await on_due(due)
+                continue
+
+            timeout = self._seconds_to_next(now)
+            if next_fallback is not None:
+                until_fallback = max(next_fallback - loop.time(), 0)
+                timeout = until_fallback if timeout is None else min(timeout, until_fallback)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+expiry_scheduler = ExpiryScheduler()
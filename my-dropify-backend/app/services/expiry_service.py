@@ -1,27 +1,91 @@
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import and_, delete, exists, or_, select
 from sqlalchemy.orm import Session
+
+from app.core.config import EXPIRY_BATCH_SIZE, TOMBSTONE_RETENTION_SECONDS
 from app.models.session import Session as SessionModel
 from app.models.drop import Drop
+from app.services.file_service import release_blobs
+from app.services.session_code_pool import code_pool
+
+
+class ExpiredSessions:
+    def __init__(self, sessions: int, drops_purged: int):
+        self.sessions = sessions
+        self.drops_purged = drops_purged
+
 
+def cleanup_expired_sessions(db: Session, batch_size: int = EXPIRY_BATCH_SIZE):
+    """
+    Deletes expired sessions, and the drop rows nobody can sync anymore,
+    in batches of `batch_size`, each batch its own transaction: drops of
+    sessions that are over, and drops gone for longer than the tombstone
+    retention (cursor syncs report the others as deleted). Returns how
+    many of each were deleted.
+    """
 
-def cleanup_expired_sessions(db: Session):
     now = datetime.now(UTC)
+    retention_cutoff = now - timedelta(seconds=TOMBSTONE_RETENTION_SECONDS)
+    sessions = drops_purged = 0
 
-    # Delete expired drops
-    deleted_drops = (
-        db.query(Drop)
-        .filter(Drop.expires_at != None)
-        .filter(Drop.expires_at < now)
-        .delete()
+    live_session = (
+        exists()
+        .where(SessionModel.code == Drop.session_code)
+        .where(SessionModel.expires_at >= now)
     )
 
-    # Delete expired sessions
-    deleted_sessions = (
-        db.query(SessionModel)
-        .filter(SessionModel.expires_at < now)
-        .delete()
+    purgeable = or_(
+        ~live_session,
+        and_(Drop.is_deleted == True, Drop.deleted_at < retention_cutoff),
+        and_(Drop.is_deleted == False, Drop.expires_at < retention_cutoff),
     )
 
-    db.commit()
+    # Delete drops past their tombstone retention
+    while True:
+        batch = (
+            select(Drop.id)
+            .where(purgeable)
+            .limit(batch_size)
+        )
+
+        rows = db.execute(
+            delete(Drop)
+            .where(Drop.id.in_(batch))
+            .returning(Drop.blob_sha256),
+            execution_options={"synchronize_session": False},
+        ).all()
+
+        # The storage GC clears blob_sha256 of drops it already released
+        release_blobs(db, [row.blob_sha256 for row in rows])
+
+        db.commit()
+        drops_purged += len(rows)
+
+        if len(rows) < batch_size:
+            break
+
+    # Delete expired sessions
+    while True:
+        batch = (
+            select(SessionModel.code)
+            .where(SessionModel.expires_at < now)
+            .limit(batch_size)
+        )
+
+        expired_codes = db.scalars(
+            delete(SessionModel)
+            .where(SessionModel.code.in_(batch))
+            .returning(SessionModel.code),
+            execution_options={"synchronize_session": False},
+        ).all()
+
+        db.commit()
+        sessions += len(expired_codes)
+
+        # Their codes can be handed out again
+        code_pool.release(expired_codes)
+
+        if len(expired_codes) < batch_size:
+            break
 
-    return deleted_drops + deleted_sessions
+    return ExpiredSessions(sessions, drops_purged)
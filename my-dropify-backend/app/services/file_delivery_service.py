@@ -0,0 +1,180 @@
+import os
+import re
+import mimetypes
+from pathlib import Path
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import RESPONSE_COMPRESSION_MIN_BYTES
+from app.services.compression_service import negotiate, ensure_sidecar, SIDECAR_SUFFIXES
+from app.services.thumbnail_service import THUMBNAIL_SUFFIXES
+
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PRIVATE_CACHE_CONTROL = "private, no-store"
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+# Blob names are SHA-256 digests, legacy upload names are UUIDs
+IMMUTABLE_NAME = re.compile(
+    r"^(?:[0-9a-f]{64}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$"
+)
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """
+    FileResponse that hands the file descriptor to the server when it
+    supports the ASGI zero-copy send extension (sendfile), and otherwise
+    falls back to Starlette's pathsend / chunked reads. Range and If-Range
+    handling are inherited unchanged.
+    """
+
+    zerocopy = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.zerocopy = ZEROCOPY_EXTENSION in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _send_zerocopy(self, send: Send, offset: int, count: int):
+        handle = await run_in_threadpool(open, self.path, "rb")
+        try:
+            await send({
+                "type": ZEROCOPY_EXTENSION,
+                "file": handle,
+                "offset": offset,
+                "count": count,
+                "more_body": False,
+            })
+        finally:
+            await run_in_threadpool(handle.close)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool, send_pathsend: bool) -> None:
+        if not self.zerocopy or send_header_only:
+            await super()._handle_simple(send, send_header_only, send_pathsend)
+            return
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await self._send_zerocopy(send, 0, int(self.headers["content-length"]))
+
+    async def _handle_single_range(
+        self, send: Send, start: int, end: int, file_size: int, send_header_only: bool
+    ) -> None:
+        if not self.zerocopy or send_header_only:
+            await super()._handle_single_range(send, start, end, file_size, send_header_only)
+            return
+
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        await self._send_zerocopy(send, start, end - start)
+
+
+def is_immutable_file(path: str | Path) -> bool:
+    name = Path(path).name.split(".", 1)[0]
+    return bool(IMMUTABLE_NAME.match(name))
+
+
+def content_etag(path: str | Path) -> str | None:
+    """
+    Strong ETag derived from the file name for content-addressed/UUID
+    files. Compressed copies and thumbnails keep their suffix in it, as
+    their bytes differ from the original's.
+    """
+
+    if not is_immutable_file(path):
+        return None
+
+    name = Path(path).name
+    etag = name.split(".", 1)[0]
+
+    for suffix in (*SIDECAR_SUFFIXES.values(), *THUMBNAIL_SUFFIXES.values()):
+        if name.endswith(suffix):
+            etag += suffix
+            break
+
+    return f'"{etag}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header value matches `etag`."""
+
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+def _file_encoding(request: Request, path: str | Path, size: int) -> str | None:
+    # Ranges stay on the identity bytes; only immutable files get a
+    # precompressed copy, since it is never refreshed
+    if size < RESPONSE_COMPRESSION_MIN_BYTES or "range" in request.headers:
+        return None
+    if not is_immutable_file(path):
+        return None
+    return negotiate(request.headers.get("accept-encoding"))
+
+
+def serve_file(
+    request: Request,
+    path: str | Path,
+    *,
+    filename: str | None = None,
+    media_type: str | None = None,
+    cache_control: str | None = None,
+    headers: dict | None = None,
+    conditional: bool = True,
+    compressible: bool = False,
+) -> Response:
+    """
+    Single entry point for sending stored files: zero-copy where the server
+    allows it, byte ranges, If-Range, and If-None-Match revalidation.
+    `compressible` files are sent from a compressed copy when negotiated.
+    """
+
+    stat_result = os.stat(path)
+
+    response_headers = dict(headers or {})
+
+    etag = content_etag(path)
+
+    if compressible:
+        response_headers["vary"] = "Accept-Encoding"
+
+        encoding = _file_encoding(request, path, stat_result.st_size)
+        if encoding:
+            media_type = media_type or mimetypes.guess_type(str(path))[0]
+            path = ensure_sidecar(path, encoding)
+            stat_result = os.stat(path)
+            response_headers["content-encoding"] = encoding
+            etag = f'{etag[:-1]}-{encoding}"'
+
+    if etag:
+        response_headers["etag"] = etag
+
+    if cache_control is None:
+        cache_control = IMMUTABLE_CACHE_CONTROL if etag else "no-cache"
+    response_headers["cache-control"] = cache_control
+
+    response = ZeroCopyFileResponse(
+        path=path,
+        filename=filename,
+        media_type=media_type,
+        headers=response_headers,
+        stat_result=stat_result,
+    )
+
+    if_none_match = request.headers.get("if-none-match")
+    if conditional and if_none_match and etag_matches(if_none_match, response.headers["etag"]):
+        return Response(
+            status_code=304,
+            headers={
+                "etag": response.headers["etag"],
+                "cache-control": cache_control,
+            },
+        )
+
+    return response
@@ -1,12 +1,35 @@
 import os
+import time
 import uuid
+import codecs
+import asyncio
+import hashlib
+import hmac
 import secrets
+from collections import Counter, deque
 from pathlib import Path
+from typing import AsyncIterator
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from app.core.config import (
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_MEMORY_BUDGET_BYTES,
+    UPLOAD_BUDGET_TIMEOUT_SECONDS,
+    STORAGE_GC_WAIT_SECONDS,
+    BLOB_KEY_SECRET,
+    BLOB_KEY_SECRET_PATH,
+)
+from app.db.database import run_db
 from app.models.drop import Drop
-from app.models.session import Session as SessionModel
+from app.models.blob import Blob
+from app.services.session_service import get_session_expiry
 from app.services.expiry_prediction_service import predict_expiry
+from app.services.expiry_scheduler import expiry_scheduler, DROP
+from app.services.storage_backends import storage, shared_secret
 
 
 ALLOWED_EXTENSIONS = {"txt", "pdf", "png", "jpg", "jpeg"}
@@ -19,6 +42,72 @@ MAX_FILE_SIZE = 5 * 1024 * 1024
 
 UPLOAD_DIR = Path("uploads")
 
+# Expected leading bytes for each allowed extension ("txt" is checked separately)
+FILE_SIGNATURES = {
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "pdf": (b"%PDF-",),
+}
+
+JPEG_ALIASES = {"jpeg": "jpg"}
+
+# Seconds between checks whether the storage GC is done with a blob
+BLOB_COLLECTING_POLL_SECONDS = 0.05
+
+
+class UploadCapacityError(RuntimeError):
+    pass
+
+
+class UploadMemoryBudget:
+    """
+    Process-wide cap on the bytes held in memory by in-flight upload chunks.
+
+    Every upload reserves one chunk for as long as it is streaming, so the
+    budget also bounds the number of concurrent uploads per worker.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters = deque()
+
+    def _fits(self, size: int) -> bool:
+        return self.in_use + size <= self.limit or self.in_use == 0
+
+    async def acquire(self, size: int, timeout: float | None = None):
+        if not self._waiters and self._fits(size):
+            self.in_use += size
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (size, waiter)
+        self._waiters.append(entry)
+
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+            if waiter.done() and not waiter.cancelled():
+                # Granted right as we timed out: give it back
+                self.release(size)
+            raise UploadCapacityError("Too many uploads in progress")
+
+    def release(self, size: int):
+        self.in_use = max(0, self.in_use - size)
+
+        while self._waiters and self._fits(self._waiters[0][0]):
+            size, waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_use += size
+            waiter.set_result(None)
+
+
+upload_budget = UploadMemoryBudget(UPLOAD_MEMORY_BUDGET_BYTES)
+
 
 def _validate_extension(filename: str) -> str:
     if "." not in filename:
@@ -39,35 +128,326 @@ def _validate_extension(filename: str) -> str:
     return extension
 
 
-def _validate_mime_type(file: UploadFile):
-    if not file.content_type:
+def _validate_content_type(content_type: str | None):
+    if not content_type:
         raise ValueError("Invalid file type")
 
     if not (
-        file.content_type.startswith("image/")
-        or file.content_type == "application/pdf"
-        or file.content_type == "text/plain"
+        content_type.startswith("image/")
+        or content_type == "application/pdf"
+        or content_type == "text/plain"
     ):
         raise ValueError("Invalid file type")
 
 
+def _validate_mime_type(file: UploadFile):
+    _validate_content_type(file.content_type)
+
+
+def _sniff_matches_extension(head: bytes, extension: str) -> bool:
+    if extension == "txt":
+        if b"\x00" in head:
+            return False
+        try:
+            # Incremental decode so a multibyte char cut at the chunk edge is fine
+            codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        except UnicodeDecodeError:
+            return False
+        return True
+
+    return head.startswith(FILE_SIGNATURES.get(extension, ()))
+
+
 def _sanitize_filename(filename: str) -> str:
     return os.path.basename(filename)
 
 
 def _ensure_session_exists(db: Session, session_code: str):
-    session = (
-        db.query(SessionModel)
-        .filter(SessionModel.code == session_code)
+    if not get_session_expiry(db, session_code):
+        raise ValueError("Session does not exist")
+
+
+def _write_chunk(handle, chunk: bytes, digest=None):
+    handle.write(chunk)
+    if digest is not None:
+        digest.update(chunk)
+
+
+def _discard(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _hash_file(path: Path) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+
+    return digest.hexdigest(), size
+
+
+# =========================
+# CONTENT-ADDRESSED BLOBS
+# =========================
+
+_blob_key_secret = (BLOB_KEY_SECRET or shared_secret(BLOB_KEY_SECRET_PATH)).encode()
+
+
+def blob_key(sha256: str) -> str:
+    """Storage name of the bytes with this SHA-256; not derivable from it alone."""
+
+    return hmac.new(_blob_key_secret, sha256.encode(), hashlib.sha256).hexdigest()
+
+
+def _blob_location(sha256: str, extension: str) -> str:
+    key = blob_key(sha256)
+    return storage.location(f"blobs/{key[:2]}/{key}.{extension}")
+
+
+def get_blob(db: Session, sha256: str) -> Blob | None:
+    return (
+        db.query(Blob)
+        .filter(Blob.sha256 == sha256.lower())
+        .filter(Blob.ref_count > 0)
         .first()
     )
 
-    if not session:
-        raise ValueError("Session does not exist")
+
+def _incref(db: Session, sha256: str) -> bool:
+    result = db.execute(
+        update(Blob)
+        .where(Blob.sha256 == sha256)
+        .where(Blob.ref_count > 0)
+        .values(ref_count=Blob.ref_count + 1)
+    )
+    return result.rowcount == 1
+
+
+def _claim_existing_blob(db: Session, sha256: str) -> Blob | None:
+    claimed = _incref(db, sha256)
+
+    # Ends the transaction on a miss too, so a caller waiting out the GC
+    # holds no lock meanwhile
+    db.commit()
+
+    return db.get(Blob, sha256) if claimed else None
+
+
+def _insert_blob(db: Session, sha256: str, path: str, size: int) -> Blob | None:
+    """
+    Adds the row for bytes not stored yet, holding one reference, or takes
+    a reference to the row another worker added first. None while the GC
+    is collecting an earlier copy of the bytes.
+    """
+
+    # Rows left at ref_count 0 are waiting to be reclaimed; reuse them
+    db.query(Blob).filter(Blob.sha256 == sha256).filter(Blob.ref_count == 0).delete()
+
+    blob = Blob(sha256=sha256, path=path, size=size, ref_count=1)
+    db.add(blob)
+
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return _claim_existing_blob(db, sha256)
+
+    return blob
+
+
+def _release_blob(db: Session, sha256: str):
+    release_blobs(db, [sha256])
+    db.commit()
+
+
+async def _reserve_blob(db: Session | AsyncSession, sha256: str, path: str, size: int) -> Blob:
+    """
+    Takes a reference to the blob row of `sha256`, adding the row at `path`
+    if there is none. Once this returns the GC leaves the row and its file
+    alone, so the file is written, if at all, only after this.
+    """
+
+    deadline = time.monotonic() + STORAGE_GC_WAIT_SECONDS
+
+    while True:
+        blob = await run_db(db, _claim_existing_blob, sha256)
+        if blob is None:
+            blob = await run_db(db, _insert_blob, sha256, path, size)
+        if blob is not None:
+            return blob
+
+        # The GC is deleting an earlier copy; its row goes once the file is gone
+        if time.monotonic() >= deadline:
+            raise UploadCapacityError("Storage is busy, try again")
+        await asyncio.sleep(BLOB_COLLECTING_POLL_SECONDS)
+
+
+async def _store_blob(
+    db: Session | AsyncSession,
+    tmp_path: Path,
+    sha256: str,
+    size: int,
+    extension: str,
+    keep_on_error: bool = False,
+) -> Blob:
+    """
+    Moves a fully written temp file into storage, or drops it and takes
+    another reference if the same bytes are already stored. With
+    `keep_on_error` the temp file is left in place when storing fails.
+    """
+
+    stored = False
+
+    try:
+        blob = await _reserve_blob(db, sha256, _blob_location(sha256, extension), size)
+
+        try:
+            # New bytes, or a blob whose file went missing: write this copy
+            if not await run_in_threadpool(storage.exists, blob.path):
+                await run_in_threadpool(storage.put_file, tmp_path, blob.path, sha256)
+        except OSError:
+            await run_db(db, _release_blob, sha256)
+            raise
+
+        stored = True
+        return blob
+    except OSError:
+        raise ValueError("Failed to save file")
+    finally:
+        if stored or not keep_on_error:
+            await run_in_threadpool(_discard, tmp_path)
+
+
+def _check_stored_extension(blob: Blob, extension: str):
+    stored_extension = blob.path.rsplit(".", 1)[-1]
+    if JPEG_ALIASES.get(extension, extension) != JPEG_ALIASES.get(stored_extension, stored_extension):
+        raise ValueError("File type does not match the stored content")
+
+
+def acquire_blob(db: Session, sha256: str) -> Blob | None:
+    return _claim_existing_blob(db, sha256.lower())
+
+
+def release_blobs(db: Session, hashes):
+    """
+    Drops one reference per hash (repeat a hash to drop several). Blobs
+    left unreferenced are deleted, file and row, by the storage GC.
+    The caller commits.
+    """
+
+    for sha256, count in Counter(sha256 for sha256 in hashes if sha256).items():
+        db.execute(
+            update(Blob)
+            .where(Blob.sha256 == sha256)
+            .values(ref_count=Blob.ref_count - count)
+        )
+
+
+# =========================
+# UPLOADS
+# =========================
+
+async def receive_signed_put(key: str, sha256: str, size: int, chunks: AsyncIterator[bytes]):
+    """
+    Body of a direct upload to the local backend: streamed to a temp file,
+    checked against the signed size and SHA-256, then moved to `key`.
+    """
+
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = UPLOAD_DIR / f".{uuid.uuid4()}.part"
+    digest = hashlib.sha256()
+    total = 0
+
+    await upload_budget.acquire(UPLOAD_CHUNK_SIZE, UPLOAD_BUDGET_TIMEOUT_SECONDS)
+
+    try:
+        handle = await run_in_threadpool(open, tmp_path, "wb")
+
+        try:
+            async for chunk in chunks:
+                total += len(chunk)
+                if total > size:
+                    raise ValueError("Body is larger than the signed size")
+
+                await run_in_threadpool(_write_chunk, handle, chunk, digest)
+        finally:
+            await run_in_threadpool(handle.close)
+
+        if total != size or digest.hexdigest() != sha256:
+            raise ValueError("Body does not match the signed size and checksum")
+
+        await run_in_threadpool(storage.put_file, tmp_path, storage.location(key), sha256)
+    except OSError:
+        raise ValueError("Failed to save file")
+    finally:
+        upload_budget.release(UPLOAD_CHUNK_SIZE)
+        await run_in_threadpool(_discard, tmp_path)
+
+
+
+async def _stream_to_temp(file: UploadFile, extension: str) -> tuple[Path, str, int]:
+    """
+    Streams the upload into a temp file in UPLOAD_DIR chunk by chunk,
+    hashing it on the way. Returns the temp path, SHA-256 and size.
+    """
+
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise ValueError("File too large (max 5MB)")
+
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = UPLOAD_DIR / f".{uuid.uuid4()}.part"
+    digest = hashlib.sha256()
+
+    await upload_budget.acquire(UPLOAD_CHUNK_SIZE, UPLOAD_BUDGET_TIMEOUT_SECONDS)
+
+    try:
+        try:
+            handle = await run_in_threadpool(open, tmp_path, "wb")
+        except OSError:
+            raise ValueError("Failed to save file")
+
+        total = 0
+
+        try:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                if total == 0 and not _sniff_matches_extension(chunk, extension):
+                    raise ValueError("File content does not match its type")
+
+                total += len(chunk)
+                if total > MAX_FILE_SIZE:
+                    raise ValueError("File too large (max 5MB)")
+
+                await run_in_threadpool(_write_chunk, handle, chunk, digest)
+        except OSError:
+            raise ValueError("Failed to save file")
+        finally:
+            await run_in_threadpool(handle.close)
+
+        if total == 0:
+            raise ValueError("File cannot be empty")
+    except BaseException:
+        await run_in_threadpool(_discard, tmp_path)
+        raise
+    finally:
+        upload_budget.release(UPLOAD_CHUNK_SIZE)
+
+    return tmp_path, digest.hexdigest(), total
 
 
 async def save_file(
-    db: Session,
+    db: Session | AsyncSession,
     session_code: str,
     file: UploadFile
 ) -> Drop:
@@ -75,7 +455,7 @@ async def save_file(
     if not file.filename:
         raise ValueError("File must have a name")
 
-    _ensure_session_exists(db, session_code)
+    await run_db(db, _ensure_session_exists, session_code)
 
     clean_name = _sanitize_filename(file.filename)
 
@@ -83,43 +463,83 @@ async def save_file(
 
     _validate_mime_type(file)
 
-    content = await file.read()
+    tmp_path, sha256, size = await _stream_to_temp(file, extension)
 
-    if not content:
-        raise ValueError("File cannot be empty")
+    blob = await _store_blob(db, tmp_path, sha256, size, extension)
 
-    if len(content) > MAX_FILE_SIZE:
-        raise ValueError("File too large (max 5MB)")
+    return await run_db(db, _create_file_drop, session_code, blob)
 
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-    unique_filename = f"{uuid.uuid4()}.{extension}"
-    file_path = UPLOAD_DIR / unique_filename
+async def create_drop_from_blob(
+    db: Session | AsyncSession,
+    session_code: str,
+    sha256: str,
+    filename: str,
+) -> Drop:
+    """Creates a file drop for bytes the server already has, without an upload."""
+
+    return await run_db(db, _create_drop_from_blob, session_code, sha256, filename)
 
-    try:
-        with open(file_path, "wb") as f:
-            f.write(content)
-    except Exception:
-        raise ValueError("Failed to save file")
 
-    normalized_path = file_path.as_posix()
+def _create_drop_from_blob(
+    db: Session,
+    session_code: str,
+    sha256: str,
+    filename: str,
+) -> Drop:
+    _ensure_session_exists(db, session_code)
 
-    expiry = predict_expiry(None, normalized_path)
+    extension = _validate_extension(_sanitize_filename(filename))
 
-    download_token = secrets.token_urlsafe(32)
+    existing = get_blob(db, sha256)
+    if not existing:
+        raise LookupError("Blob not found")
 
-    drop = Drop(
-        session_code=session_code,
-        content=None,
-        file_path=normalized_path,
-        expires_at=expiry,
-        download_token=download_token,
-        is_downloaded=False,
-        is_deleted=False,
-    )
+    _check_stored_extension(existing, extension)
 
-    db.add(drop)
-    db.commit()
-    db.refresh(drop)
+    blob = acquire_blob(db, sha256)
+    if not blob:
+        raise LookupError("Blob not found")
+
+    return _create_file_drop(db, session_code, blob)
+
+
+def _create_file_drop(db: Session, session_code: str, blob: Blob) -> Drop:
+    """
+    Adds a drop holding the reference the caller took on `blob`. If that
+    fails, e.g. because the session ended meanwhile, the reference is
+    given back.
+    """
+
+    sha256 = blob.sha256
+    normalized_path = blob.path
+
+    try:
+        _ensure_session_exists(db, session_code)
+
+        expiry = predict_expiry(None, normalized_path)
+
+        download_token = secrets.token_urlsafe(32)
+
+        drop = Drop(
+            session_code=session_code,
+            content=None,
+            file_path=normalized_path,
+            blob_sha256=sha256,
+            expires_at=expiry,
+            download_token=download_token,
+            is_downloaded=False,
+            is_deleted=False,
+        )
+
+        db.add(drop)
+        db.commit()
+        db.refresh(drop)
+    except Exception:
+        db.rollback()
+        _release_blob(db, sha256)
+        raise
+
+    expiry_scheduler.schedule(DROP, drop.id, drop.expires_at)
 
     return drop
@@ -0,0 +1,159 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are shared between threads only
+    fcntl = None
+
+from app.core.config import LOCAL_RATE_LIMIT_PATH, LOCAL_RATE_LIMIT_SLOTS
+
+# key hash, tokens, last refill (unix seconds)
+SLOT = struct.Struct("<Qdd")
+
+# Slots tried per key before the least recently used one is reused
+PROBE_LIMIT = 16
+
+
+def _key_hash(key: str) -> int:
+    # 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+
+class SharedTokenBucketTable:
+    """
+    Fixed-size table of token buckets in a memory-mapped file.
+
+    Every worker on the host maps the same file, so they share one set of
+    buckets, and memory stays at `slots * 24` bytes however many keys are
+    seen: when a key's probe run is full, its least recently used bucket
+    is taken over. Writers are serialized with a file lock across
+    processes and a thread lock within one.
+    """
+
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        self.slots = slots
+        self._thread_lock = threading.Lock()
+        self._file = None
+        self._map = None
+
+    def _open(self):
+        if self._map is not None:
+            return
+
+        size = self.slots * SLOT.size
+
+        # The slot count is part of the name, so workers configured
+        # differently never resize a table another one has mapped
+        fd = os.open(f"{self.path}.{self.slots}", os.O_RDWR | os.O_CREAT, 0o600)
+        self._file = os.fdopen(fd, "r+b")
+
+        with self._file_lock():
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+
+        self._map = mmap.mmap(fd, size)
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _find_slot(self, key_hash: int) -> tuple[int, bool]:
+        """Returns (slot index, whether the bucket is new)."""
+
+        start = key_hash % self.slots
+        empty = None
+        oldest, oldest_updated = start, math.inf
+
+        for probe in range(min(PROBE_LIMIT, self.slots)):
+            index = (start + probe) % self.slots
+            stored_hash, _, updated = SLOT.unpack_from(self._map, index * SLOT.size)
+
+            if stored_hash == key_hash:
+                return index, False
+
+            if stored_hash == 0 and empty is None:
+                empty = index
+            elif updated < oldest_updated:
+                oldest, oldest_updated = index, updated
+
+        return (empty if empty is not None else oldest), True
+
+    def take_many(
+        self,
+        buckets: list[tuple[str, int, float]],
+        now: float | None = None,
+    ) -> tuple[bool, float, list[int]]:
+        """
+        Takes one token from every (key, capacity, refill per second)
+        bucket, or from none of them if any is empty.
+
+        Returns (allowed, retry_after seconds, whole tokens left per bucket).
+        """
+
+        now = time.time() if now is None else now
+
+        with self._thread_lock:
+            self._open()
+
+            with self._file_lock():
+                state = []
+                for key, capacity, rate in buckets:
+                    key_hash = _key_hash(key)
+                    index, new = self._find_slot(key_hash)
+
+                    if new:
+                        tokens = float(capacity)
+                        # Claim it now so another key in this call can't land on it
+                        SLOT.pack_into(self._map, index * SLOT.size, key_hash, tokens, now)
+                    else:
+                        _, tokens, updated = SLOT.unpack_from(self._map, index * SLOT.size)
+                        tokens = min(float(capacity), tokens + max(now - updated, 0) * rate)
+
+                    state.append((index, key_hash, tokens, rate))
+
+                allowed = all(tokens >= 1 for _, _, tokens, _ in state)
+
+                retry_after = 0.0
+                remaining = []
+                for index, key_hash, tokens, rate in state:
+                    if allowed:
+                        tokens -= 1
+                    elif tokens < 1:
+                        retry_after = max(retry_after, (1 - tokens) / rate if rate > 0 else math.inf)
+
+                    SLOT.pack_into(self._map, index * SLOT.size, key_hash, tokens, now)
+                    remaining.append(int(tokens))
+
+        return allowed, retry_after, remaining
+
+    def clear(self):
+        with self._thread_lock:
+            self._open()
+            with self._file_lock():
+                self._map[:] = bytes(len(self._map))
+
+    def close(self):
+        with self._thread_lock:
+            if self._map is not None:
+                self._map.close()
+                self._file.close()
+                self._map = self._file = None
+
+
+local_limits = SharedTokenBucketTable(LOCAL_RATE_LIMIT_PATH, LOCAL_RATE_LIMIT_SLOTS)
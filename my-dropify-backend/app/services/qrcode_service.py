@@ -1,16 +1,88 @@
+import hashlib
+import threading
+from collections import OrderedDict
 from io import BytesIO
 import qrcode
-from fastapi.responses import StreamingResponse
-from app.core.config import FRONTEND_URL
+import qrcode.image.svg
+from starlette.concurrency import run_in_threadpool
+from app.core.config import FRONTEND_URL, QRCODE_CACHE_SIZE
 
+MEDIA_TYPES = {
+    "png": "image/png",
+    # Rendered by qrcode itself, without PIL
+    "svg": "image/svg+xml",
+}
 
-def generate_session_qrcode(code: str) -> StreamingResponse:
-    session_url = f"{FRONTEND_URL}/session/{code}"
 
-    qr = qrcode.make(session_url)
+class RenderedQRCode:
+    __slots__ = ("body", "media_type", "etag")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+class QRCodeCache:
+    """Bounded LRU of (session code, format) -> rendered image."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], RenderedQRCode] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: tuple[str, str]) -> RenderedQRCode | None:
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is not None:
+                self._entries.move_to_end(key)
+            return rendered
+
+    def put(self, key: tuple[str, str], rendered: RenderedQRCode):
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = rendered
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+qrcode_cache = QRCodeCache(QRCODE_CACHE_SIZE)
+
+
+def _render(code: str, image_format: str) -> RenderedQRCode:
+    session_url = f"{FRONTEND_URL}/session/{code}"
 
     buffer = BytesIO()
-    qr.save(buffer, format="PNG")
-    buffer.seek(0)
 
-    return StreamingResponse(buffer, media_type="image/png")
+    if image_format == "svg":
+        qr = qrcode.make(session_url, image_factory=qrcode.image.svg.SvgPathImage)
+        qr.save(buffer)
+    else:
+        qr = qrcode.make(session_url)
+        qr.save(buffer, format="PNG")
+
+    return RenderedQRCode(buffer.getvalue(), MEDIA_TYPES[image_format])
+
+
+async def generate_session_qrcode(code: str, image_format: str = "png") -> RenderedQRCode:
+    """The QR code for a session never changes, so each one is rendered once."""
+
+    if image_format not in MEDIA_TYPES:
+        raise ValueError("Unsupported QR code format")
+
+    key = (code, image_format)
+
+    rendered = qrcode_cache.get(key)
+    if rendered is None:
+        # CPU-bound; keep it off the event loop
+        rendered = await run_in_threadpool(_render, code, image_format)
+        qrcode_cache.put(key, rendered)
+
+    return rendered
@@ -1,36 +1,27 @@
 from fastapi import HTTPException
-from redis.exceptions import ConnectionError
+from redis.exceptions import ConnectionError, TimeoutError
 from app.db.redis import redis_client
+from app.services.local_rate_limit_service import local_limits
 import os
-import time
 
 class RateLimiter:
     def __init__(self, limit: int = 5, window: int = 60):
         self.limit = limit
         self.window = window
-        self.memory_store = {}
 
-    async def check(self, key: str):
-        # 🔥 If running tests, use in-memory limiter
-        if os.getenv("TESTING") == "true":
-            now = time.time()
-            window_start = now - self.window
-
-            if key not in self.memory_store:
-                self.memory_store[key] = []
-
-            # remove expired timestamps
-            self.memory_store[key] = [
-                t for t in self.memory_store[key] if t > window_start
-            ]
+    def _check_locally(self, key: str):
+        allowed, _, _ = local_limits.take_many([(key, self.limit, self.limit / self.window)])
 
-            if len(self.memory_store[key]) >= self.limit:
-                raise HTTPException(
-                    status_code=429,
-                    detail="Too many requests",
-                )
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+            )
 
-            self.memory_store[key].append(now)
+    async def check(self, key: str):
+        # 🔥 If running tests, use the local limiter
+        if os.getenv("TESTING") == "true":
+            self._check_locally(key)
             return
 
         # 🔥 Production Redis limiter
@@ -40,11 +31,13 @@ class RateLimiter:
             if count == 1:
                 await redis_client.expire(key, self.window)
 
-            if count > self.limit:
-                raise HTTPException(
-                    status_code=429,
-                    detail="Too many requests",
-                )
-
-        except ConnectionError:
+        except (ConnectionError, TimeoutError):
+            # Keep limiting with the buckets shared by this host's workers
+            self._check_locally(key)
             return
+
+        if count > self.limit:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+            )
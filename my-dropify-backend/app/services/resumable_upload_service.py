@@ -0,0 +1,472 @@
+import re
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import (
+    MAX_UPLOAD_SIZE,
+    MAX_UPLOAD_CHUNK_SIZE,
+    RESUMABLE_UPLOAD_TTL_SECONDS,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_BUDGET_TIMEOUT_SECONDS,
+)
+from app.db.database import run_db
+from app.models.drop import Drop
+from app.models.upload import Upload
+from app.models.blob import Blob
+from app.models.session import Session as SessionModel
+from app.services import file_service
+from app.services.expiry_scheduler import expiry_scheduler, UPLOAD
+from app.services.storage_backends import storage, PresignedUpload
+from app.services.file_service import (
+    upload_budget,
+    get_blob,
+    _blob_location,
+    _check_stored_extension,
+    _release_blob,
+    _reserve_blob,
+    UploadCapacityError,
+    _create_file_drop,
+    _hash_file,
+    _store_blob,
+    _sanitize_filename,
+    _sniff_matches_extension,
+    _validate_content_type,
+    _validate_extension,
+    _write_chunk,
+)
+
+
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class UploadConflictError(Exception):
+    pass
+
+
+def _part_path(upload_id: str) -> Path:
+    # Lives on the same volume as UPLOAD_DIR so finalizing is a plain rename
+    return file_service.UPLOAD_DIR / ".resumable" / f"{upload_id}.part"
+
+
+def _create_part_file(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+
+def _discard(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _read_head(path: Path, size: int) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(size)
+
+
+def create_upload(
+    db: Session,
+    session_code: str,
+    filename: str,
+    total_size: int,
+    content_type: str | None = None,
+    sha256: str | None = None,
+) -> Upload:
+    """
+    Starts a resumable upload, or with `sha256` a direct upload that the
+    client PUTs straight to storage (see `presign_direct_upload`).
+    """
+
+    if not filename:
+        raise ValueError("File must have a name")
+
+    session = (
+        db.query(SessionModel)
+        .filter(SessionModel.code == session_code)
+        .first()
+    )
+
+    if not session:
+        raise ValueError("Session does not exist")
+
+    clean_name = _sanitize_filename(filename)
+    extension = _validate_extension(clean_name)
+
+    if content_type is not None:
+        _validate_content_type(content_type)
+
+    if total_size <= 0:
+        raise ValueError("File cannot be empty")
+
+    if total_size > MAX_UPLOAD_SIZE:
+        raise ValueError("File too large")
+
+    if sha256 is not None:
+        sha256 = sha256.lower()
+        if not SHA256_PATTERN.fullmatch(sha256):
+            raise ValueError("Invalid SHA-256")
+        if content_type is None:
+            raise ValueError("Invalid file type")
+
+    now = datetime.utcnow()
+    expires_at = min(
+        now + timedelta(seconds=RESUMABLE_UPLOAD_TTL_SECONDS),
+        session.expires_at,
+    )
+
+    upload = Upload(
+        id=uuid.uuid4().hex,
+        session_code=session_code,
+        filename=clean_name,
+        extension=extension,
+        total_size=total_size,
+        received_bytes=0,
+        created_at=now,
+        expires_at=expires_at,
+        is_complete=False,
+        sha256=sha256,
+        content_type=content_type,
+    )
+
+    if sha256 is None:
+        try:
+            _create_part_file(_part_path(upload.id))
+        except OSError:
+            raise ValueError("Failed to create upload")
+
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+
+    expiry_scheduler.schedule(UPLOAD, upload.id, upload.expires_at)
+
+    return upload
+
+
+def get_upload(db: Session, session_code: str, upload_id: str) -> Upload | None:
+    upload = (
+        db.query(Upload)
+        .filter(Upload.id == upload_id)
+        .filter(Upload.session_code == session_code)
+        .filter(Upload.is_complete == False)
+        .first()
+    )
+
+    if not upload or upload.expires_at < datetime.utcnow():
+        return None
+
+    return upload
+
+
+async def get_upload_async(
+    db: AsyncSession,
+    session_code: str,
+    upload_id: str,
+) -> Upload | None:
+    return await db.run_sync(get_upload, session_code, upload_id)
+
+
+def _chunk_path(upload_id: str) -> Path:
+    # One per PATCH; only appended to the part file once its offset is claimed
+    return file_service.UPLOAD_DIR / ".resumable" / f"{upload_id}.{uuid.uuid4().hex}.chunk"
+
+
+def _append_part(chunk_path: Path, part_path: Path, offset: int):
+    with open(chunk_path, "rb") as source, open(part_path, "r+b") as part:
+        part.seek(offset)
+        while data := source.read(UPLOAD_CHUNK_SIZE):
+            part.write(data)
+        # Drop anything an earlier, rolled back append left past the end
+        part.truncate()
+
+
+async def append_chunk(
+    db: Session | AsyncSession,
+    upload: Upload,
+    offset: int,
+    chunks: AsyncIterator[bytes],
+) -> int:
+    """
+    Receives one PATCH body into a temp file, then appends it at `offset`.
+
+    The part file is only written while this request holds the offset:
+    the stored offset is compared-and-set first, and committed once the
+    bytes are in place. A retried or duplicated chunk from any worker
+    loses the compare-and-set and is rejected without touching the file.
+    """
+
+    if offset != upload.received_bytes:
+        raise UploadConflictError("Offset does not match the upload's current offset")
+
+    remaining = upload.total_size - offset
+    max_chunk = min(MAX_UPLOAD_CHUNK_SIZE, remaining)
+    part_path = _part_path(upload.id)
+    chunk_path = _chunk_path(upload.id)
+
+    await upload_budget.acquire(UPLOAD_CHUNK_SIZE, UPLOAD_BUDGET_TIMEOUT_SECONDS)
+
+    written = 0
+    try:
+        try:
+            try:
+                handle = await run_in_threadpool(open, chunk_path, "xb")
+            except FileNotFoundError:
+                raise ValueError("Upload not found")
+
+            try:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+
+                    if offset == 0 and written == 0:
+                        if not _sniff_matches_extension(chunk, upload.extension):
+                            raise ValueError("File content does not match its type")
+
+                    written += len(chunk)
+                    if written > max_chunk:
+                        raise ValueError("Chunk exceeds the allowed size")
+
+                    await run_in_threadpool(_write_chunk, handle, chunk)
+            finally:
+                await run_in_threadpool(handle.close)
+        finally:
+            upload_budget.release(UPLOAD_CHUNK_SIZE)
+
+        if written == 0:
+            return offset
+
+        new_offset = offset + written
+
+        # Holds the row (Postgres) or the write lock (SQLite) until commit,
+        # so competing appends and finalize wait and then see the new offset
+        if not await run_db(db, _claim_offset, upload.id, offset, new_offset):
+            await run_db(db, _rollback)
+            raise UploadConflictError("Upload was modified concurrently")
+
+        try:
+            await run_in_threadpool(_append_part, chunk_path, part_path, offset)
+        except BaseException:
+            await run_db(db, _rollback)
+            raise
+
+        await run_db(db, _commit)
+    except FileNotFoundError:
+        raise ValueError("Upload not found")
+    except OSError:
+        raise ValueError("Failed to save chunk")
+    finally:
+        await run_in_threadpool(_discard, chunk_path)
+
+    return new_offset
+
+
+def _claim_offset(db: Session, upload_id: str, offset: int, new_offset: int) -> bool:
+    """Moves the offset without committing; the caller commits or rolls back."""
+
+    result = db.execute(
+        update(Upload)
+        .where(Upload.id == upload_id)
+        .where(Upload.received_bytes == offset)
+        .where(Upload.is_complete == False)
+        .values(received_bytes=new_offset)
+    )
+
+    return result.rowcount == 1
+
+
+def _commit(db: Session):
+    db.commit()
+
+
+def _rollback(db: Session):
+    db.rollback()
+
+
+def _claim_for_finalize(db: Session, upload_id: str) -> bool:
+    result = db.execute(
+        update(Upload)
+        .where(Upload.id == upload_id)
+        .where(Upload.is_complete == False)
+        .values(is_complete=True)
+    )
+    db.commit()
+
+    return result.rowcount == 1
+
+
+def _release_finalize_claim(db: Session, upload_id: str):
+    db.rollback()
+    db.execute(
+        update(Upload)
+        .where(Upload.id == upload_id)
+        .values(is_complete=False)
+    )
+    db.commit()
+
+
+def _restart_upload(db: Session, upload_id: str):
+    # The part file already went into storage; the client resends from 0
+    db.rollback()
+    _create_part_file(_part_path(upload_id))
+    db.execute(
+        update(Upload)
+        .where(Upload.id == upload_id)
+        .values(is_complete=False, received_bytes=0)
+    )
+    db.commit()
+
+
+async def finalize_upload(db: Session | AsyncSession, upload: Upload) -> Drop:
+    if upload.sha256 is not None:
+        return await _finalize_direct_upload(db, upload)
+
+    if upload.received_bytes != upload.total_size:
+        raise ValueError("Upload is incomplete")
+
+    upload_id, session_code = upload.id, upload.session_code
+    part_path = _part_path(upload_id)
+
+    head = await run_in_threadpool(_read_head, part_path, UPLOAD_CHUNK_SIZE)
+    if not _sniff_matches_extension(head, upload.extension):
+        raise ValueError("File content does not match its type")
+
+    # Claim the upload so only one finalize call creates a drop
+    if not await run_db(db, _claim_for_finalize, upload_id):
+        raise UploadConflictError("Upload already finalized")
+
+    try:
+        try:
+            sha256, size = await run_in_threadpool(_hash_file, part_path)
+        except OSError:
+            raise ValueError("Failed to save file")
+
+        # The part file survives a failed store, so finalizing can be retried
+        blob = await _store_blob(db, part_path, sha256, size, upload.extension, keep_on_error=True)
+    except (ValueError, UploadCapacityError):
+        await run_db(db, _release_finalize_claim, upload_id)
+        raise
+
+    try:
+        # Gives the blob reference back itself if it fails
+        return await run_db(db, _create_file_drop, session_code, blob)
+    except Exception:
+        await run_db(db, _restart_upload, upload_id)
+        raise
+
+
+# =========================
+# DIRECT UPLOADS
+# =========================
+
+def presign_direct_upload(db: Session, upload: Upload) -> PresignedUpload | None:
+    """
+    Where the client PUTs the bytes, or None when storage already has
+    them and completing the upload is enough.
+    """
+
+    existing = get_blob(db, upload.sha256)
+    if existing:
+        _check_stored_extension(existing, upload.extension)
+        return None
+
+    return storage.presign_put(
+        _blob_location(upload.sha256, upload.extension),
+        upload.sha256,
+        upload.total_size,
+        upload.content_type,
+    )
+
+
+def _check_direct_object(location: str, upload: Upload):
+    size = storage.size(location)
+    if size != upload.total_size:
+        raise ValueError("Upload is incomplete")
+
+    if not _sniff_matches_extension(storage.read_head(location, UPLOAD_CHUNK_SIZE), upload.extension):
+        storage.delete(location)
+        raise ValueError("File content does not match its type")
+
+
+async def _finalize_direct_upload(db: Session | AsyncSession, upload: Upload) -> Drop:
+    upload_id, session_code = upload.id, upload.session_code
+
+    # Storage checked the size and SHA-256 of the PUT; only the type is left
+    location = _blob_location(upload.sha256, upload.extension)
+
+    try:
+        if not await run_db(db, get_blob, upload.sha256):
+            await run_in_threadpool(_check_direct_object, location, upload)
+    except OSError:
+        raise ValueError("Failed to save file")
+
+    if not await run_db(db, _claim_for_finalize, upload_id):
+        raise UploadConflictError("Upload already finalized")
+
+    try:
+        blob = await _reserve_blob(db, upload.sha256, location, upload.total_size)
+
+        try:
+            # Same rule as create_drop_from_blob: known bytes keep their stored type
+            _check_stored_extension(blob, upload.extension)
+
+            # The PUT may have landed while the GC was deleting an earlier
+            # copy of the same bytes, and gone with it
+            if not await run_in_threadpool(storage.exists, blob.path):
+                raise ValueError("Upload is incomplete")
+        except OSError:
+            await run_db(db, _release_blob, upload.sha256)
+            raise ValueError("Failed to save file")
+        except ValueError:
+            await run_db(db, _release_blob, upload.sha256)
+            raise
+    except (ValueError, UploadCapacityError):
+        await run_db(db, _release_finalize_claim, upload_id)
+        raise
+
+    try:
+        # Gives the blob reference back itself if it fails
+        return await run_db(db, _create_file_drop, session_code, blob)
+    except Exception:
+        await run_db(db, _release_finalize_claim, upload_id)
+        raise
+
+
+def _discard_direct_object(db: Session, upload: Upload):
+    # Bytes PUT for an upload that was never completed
+    if db.get(Blob, upload.sha256) is None:
+        try:
+            storage.delete(_blob_location(upload.sha256, upload.extension))
+        except OSError:
+            pass
+
+
+def cleanup_expired_uploads(db: Session) -> int:
+    now = datetime.utcnow()
+
+    stale = (
+        db.query(Upload)
+        .filter(Upload.expires_at < now)
+        .all()
+    )
+
+    if not stale:
+        return 0
+
+    for upload in stale:
+        if not upload.is_complete:
+            if upload.sha256 is None:
+                _discard(_part_path(upload.id))
+            else:
+                _discard_direct_object(db, upload)
+        db.delete(upload)
+
+    db.commit()
+
+    return len(stale)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from redis.exceptions import ConnectionError, TimeoutError
+
+from app.core.config import SESSION_CACHE_SIZE, SESSION_CACHE_INVALIDATION
+from app.services.drop_list_cache import drop_list_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCache:
+    """
+    Bounded LRU of session code -> expires_at.
+
+    Sessions never change apart from being expired early, so an entry is
+    valid until its own expiry or until `invalidate` is called for it.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, datetime] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, code: str, now: datetime | None = None) -> datetime | None:
+        now = now or datetime.utcnow()
+
+        with self._lock:
+            expires_at = self._entries.get(code)
+
+            if expires_at is None:
+                self.misses += 1
+                return None
+
+            if expires_at < now:
+                del self._entries[code]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(code)
+            self.hits += 1
+            return expires_at
+
+    def put(self, code: str, expires_at: datetime):
+        if self.max_entries <= 0 or expires_at < datetime.utcnow():
+            return
+
+        with self._lock:
+            self._entries[code] = expires_at
+            self._entries.move_to_end(code)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, code: str):
+        with self._lock:
+            self._entries.pop(code, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class RedisSessionInvalidation:
+    """
+    Tells every worker to drop a session's entry from one of its
+    session-keyed caches. Messages are "<scope>:<session code>".
+    """
+
+    CHANNEL = "session-cache:invalidate"
+
+    def __init__(self, redis, caches: dict):
+        self.redis = redis
+        self.caches = caches
+
+    async def publish(self, scope: str, code: str):
+        try:
+            await self.redis.publish(self.CHANNEL, f"{scope}:{code}")
+        except (ConnectionError, TimeoutError):
+            logger.warning("Redis unavailable, %s cache invalidated locally only", scope)
+
+    def _clear_all(self):
+        for cache in self.caches.values():
+            cache.clear()
+
+    async def listen(self):
+        """Runs until cancelled."""
+
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.CHANNEL)
+
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True,
+                        timeout=1.0,
+                    )
+                    if message and message.get("type") == "message":
+                        scope, _, code = message["data"].partition(":")
+                        cache = self.caches.get(scope)
+                        if cache is not None:
+                            cache.invalidate(code)
+            except (ConnectionError, TimeoutError):
+                # Whatever was missed meanwhile can no longer be trusted
+                self._clear_all()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
+def create_invalidation(name: str, caches: dict) -> RedisSessionInvalidation | None:
+    if name == "redis":
+        from app.db.redis import redis_client
+        return RedisSessionInvalidation(redis_client, caches)
+
+    if name == "none":
+        return None
+
+    raise ValueError(f"Unknown session cache invalidation: {name}")
+
+
+session_cache = SessionCache(SESSION_CACHE_SIZE)
+session_invalidation = create_invalidation(
+    SESSION_CACHE_INVALIDATION,
+    {"session": session_cache, "drops": drop_list_cache},
+)
+
+
+async def invalidate_session(code: str):
+    session_cache.invalidate(code)
+    drop_list_cache.invalidate(code)
+
+    if session_invalidation is not None:
+        await session_invalidation.publish("session", code)
+        await session_invalidation.publish("drops", code)
+
+
+async def invalidate_drop_list(code: str):
+    """Called whenever a session's drops change (NEW_DROP / DELETE_DROP)."""
+
+    drop_list_cache.invalidate(code)
+
+    if session_invalidation is not None:
+        await session_invalidation.publish("drops", code)
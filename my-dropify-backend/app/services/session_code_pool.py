@@ -0,0 +1,106 @@
+import random
+import threading
+import time
+from array import array
+from typing import Iterable
+
+CODE_SPACE = 1_000_000
+
+
+class SessionCodePool:
+    """
+    Every free 6-digit session code in a flat array, with each code's
+    position kept in a second array. Allocating a random code, and taking
+    or returning a specific one, are all O(1) swap-removes / appends, so
+    cost does not grow with the number of live sessions.
+
+    The pool is per worker. Codes taken by other workers are found through
+    the unique constraint on insert and discarded here; `load` resyncs.
+    """
+
+    def __init__(self, space: int = CODE_SPACE):
+        self.space = space
+        self.width = len(str(space - 1))
+        self._free: array | None = None
+        self._positions: array | None = None
+        self._lock = threading.Lock()
+        self._random = random.SystemRandom()
+        self.loaded_at: float | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._free is not None
+
+    def __len__(self):
+        return len(self._free) if self._free is not None else 0
+
+    def _format(self, number: int) -> str:
+        return f"{number:0{self.width}d}"
+
+    def _parse(self, code: str) -> int | None:
+        if len(code) != self.width or not code.isdigit():
+            return None
+        return int(code)
+
+    def load(self, taken_codes: Iterable[str]):
+        # Start from every code, then swap-remove the taken ones, so the
+        # Python-level work is proportional to live sessions only
+        free = array("i", range(self.space))
+        positions = array("i", range(self.space))
+
+        for number in map(self._parse, taken_codes):
+            if number is not None and positions[number] >= 0:
+                self._remove_at(free, positions, positions[number])
+
+        with self._lock:
+            self._free = free
+            self._positions = positions
+            self.loaded_at = time.monotonic()
+
+    @staticmethod
+    def _remove_at(free: array, positions: array, index: int) -> int:
+        number = free[index]
+        last = free.pop()
+
+        if last != number:
+            free[index] = last
+            positions[last] = index
+
+        positions[number] = -1
+        return number
+
+    def allocate(self) -> str | None:
+        with self._lock:
+            if not self._free:
+                return None
+            index = self._random.randrange(len(self._free))
+            return self._format(self._remove_at(self._free, self._positions, index))
+
+    def discard(self, code: str):
+        """Marks a code as taken (e.g. by another worker)."""
+
+        number = self._parse(code)
+
+        with self._lock:
+            if number is None or self._free is None or self._positions[number] < 0:
+                return
+            self._remove_at(self._free, self._positions, self._positions[number])
+
+    def release(self, codes: Iterable[str]):
+        """Returns codes of deleted sessions to the pool."""
+
+        with self._lock:
+            if self._free is None:
+                return
+
+            for number in map(self._parse, codes):
+                if number is None or self._positions[number] >= 0:
+                    continue
+                self._positions[number] = len(self._free)
+                self._free.append(number)
+
+    def needs_resync(self, max_age_seconds: float) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at > max_age_seconds
+
+
+code_pool = SessionCodePool()
@@ -1,47 +1,55 @@
-import random
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.session import Session as SessionModel
+from app.services.expiry_scheduler import expiry_scheduler, SESSION
+from app.services.session_cache import session_cache
+from app.services.session_code_pool import code_pool
 
 SESSION_TTL_SECONDS = 3600
 MAX_CODE_GENERATION_ATTEMPTS = 20
 
 
-def generate_code() -> str:
-    return f"{random.randint(0, 999999):06d}"
+def load_code_pool(db: Session):
+    code_pool.load(db.scalars(select(SessionModel.code)))
 
 
-def _generate_unique_code(db: Session) -> str:
-    for _ in range(MAX_CODE_GENERATION_ATTEMPTS):
-        code = generate_code()
+def _new_session() -> SessionModel:
+    code = code_pool.allocate()
+    if code is None:
+        raise RuntimeError("No free session codes")
 
-        exists = (
-            db.query(SessionModel)
-            .filter(SessionModel.code == code)
-            .first()
-        )
+    return SessionModel(
+        code=code,
+        expires_at=datetime.utcnow() + timedelta(seconds=SESSION_TTL_SECONDS),
+    )
 
-        if not exists:
-            return code
 
-    raise RuntimeError("Unable to generate unique session code")
+def create_session(db: Session) -> SessionModel:
+    if not code_pool.loaded:
+        load_code_pool(db)
 
+    # The pool only knows this worker's sessions; the unique constraint
+    # catches codes another worker took since the pool was loaded
+    for _ in range(MAX_CODE_GENERATION_ATTEMPTS):
+        session = _new_session()
+        db.add(session)
 
-def create_session(db: Session) -> SessionModel:
-    code = _generate_unique_code(db)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            continue
 
-    expires_at = datetime.utcnow() + timedelta(seconds=SESSION_TTL_SECONDS)
+        db.refresh(session)
 
-    session = SessionModel(
-        code=code,
-        expires_at=expires_at,
-    )
+        expiry_scheduler.schedule(SESSION, session.code, session.expires_at)
 
-    db.add(session)
-    db.commit()
-    db.refresh(session)
+        return session
 
-    return session
+    raise RuntimeError("Unable to generate unique session code")
 
 
 def get_session_by_code(db: Session, code: str) -> SessionModel | None:
@@ -58,3 +66,74 @@ def get_session_by_code(db: Session, code: str) -> SessionModel | None:
         return None
 
     return session
+
+
+def get_session_expiry(db: Session, code: str) -> datetime | None:
+    """expires_at of a live session, served from the session cache when possible."""
+
+    expires_at = session_cache.get(code)
+    if expires_at is not None:
+        return expires_at
+
+    expires_at = db.scalar(
+        select(SessionModel.expires_at).where(SessionModel.code == code)
+    )
+
+    if expires_at is None or expires_at < datetime.utcnow():
+        return None
+
+    session_cache.put(code, expires_at)
+    return expires_at
+
+
+async def create_session_async(db: AsyncSession) -> SessionModel:
+    if not code_pool.loaded:
+        await db.run_sync(load_code_pool)
+
+    for _ in range(MAX_CODE_GENERATION_ATTEMPTS):
+        session = _new_session()
+        db.add(session)
+
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            continue
+
+        await db.refresh(session)
+
+        expiry_scheduler.schedule(SESSION, session.code, session.expires_at)
+
+        return session
+
+    raise RuntimeError("Unable to generate unique session code")
+
+
+async def get_session_by_code_async(db: AsyncSession, code: str) -> SessionModel | None:
+    session = await db.scalar(
+        select(SessionModel).where(SessionModel.code == code)
+    )
+
+    if not session:
+        return None
+
+    if session.expires_at < datetime.utcnow():
+        return None
+
+    return session
+
+
+async def get_session_expiry_async(db: AsyncSession, code: str) -> datetime | None:
+    expires_at = session_cache.get(code)
+    if expires_at is not None:
+        return expires_at
+
+    expires_at = await db.scalar(
+        select(SessionModel.expires_at).where(SessionModel.code == code)
+    )
+
+    if expires_at is None or expires_at < datetime.utcnow():
+        return None
+
+    session_cache.put(code, expires_at)
+    return expires_at
@@ -0,0 +1,392 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from datetime import datetime, UTC
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+import httpx
+
+from app.core.config import (
+    STORAGE_BACKEND,
+    STORAGE_SIGNING_SECRET,
+    STORAGE_SIGNING_SECRET_PATH,
+    STORAGE_URL_TTL_SECONDS,
+    S3_ENDPOINT_URL,
+    S3_BUCKET,
+    S3_REGION,
+    S3_ACCESS_KEY_ID,
+    S3_SECRET_ACCESS_KEY,
+    S3_VIRTUAL_HOSTED,
+)
+
+
+class PresignedUpload:
+    def __init__(self, url: str, headers: dict[str, str], expires_at: datetime):
+        self.url = url
+        self.headers = headers
+        self.expires_at = expires_at
+
+
+def _signed_at(now: float, ttl: int) -> int:
+    # Signing on a fixed grid gives every worker the same URL for a while,
+    # so cached drop lists and their ETags stay stable; each URL is still
+    # good for at least half its TTL
+    step = max(ttl // 2, 1)
+    return int(now) // step * step
+
+
+class StorageBackend:
+    """
+    Where blob bytes live. A blob's location (Blob.path / Drop.file_path)
+    is whatever `location` returned for its key; keys look like
+    "blobs/ab/<keyed hash>.png".
+
+    Methods do blocking I/O; async callers run them in the threadpool.
+    Failures surface as OSError, like the local file operations they wrap.
+    """
+
+    def location(self, key: str) -> str:
+        raise NotImplementedError
+
+    def local_path(self, location: str) -> Path | None:
+        """Filesystem path to serve directly, or None for remote storage."""
+        return None
+
+    def put_file(self, source: Path, location: str, sha256: str):
+        """Stores a fully written temp file; the temp file may be consumed."""
+        raise NotImplementedError
+
+    def size(self, location: str) -> int | None:
+        raise NotImplementedError
+
+    def exists(self, location: str) -> bool:
+        return self.size(location) is not None
+
+    def read_head(self, location: str, size: int) -> bytes:
+        raise NotImplementedError
+
+    def delete(self, location: str) -> int | None:
+        """Deletes the object, returning its size, or None if it was gone."""
+        raise NotImplementedError
+
+    def presign_put(self, location: str, sha256: str, size: int, content_type: str) -> PresignedUpload:
+        raise NotImplementedError
+
+    def url_for(self, location: str, filename: str | None = None) -> str:
+        """URL a client fetches the bytes from; `filename` forces a download."""
+        raise NotImplementedError
+
+
+# =========================
+# LOCAL FILESYSTEM
+# =========================
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Blobs under UPLOAD_DIR, read back through /uploads. Direct uploads
+    PUT to /storage/<key> with an HMAC signature over the key, expiry,
+    SHA-256 and size, which that route checks before accepting bytes.
+    """
+
+    def __init__(self, secret: str, ttl: int):
+        self.secret = secret.encode()
+        self.ttl = ttl
+
+    @staticmethod
+    def _root() -> Path:
+        # Read on every call so tests can point UPLOAD_DIR elsewhere
+        from app.services import file_service
+        return file_service.UPLOAD_DIR
+
+    def _key(self, location: str) -> str | None:
+        try:
+            return Path(location).relative_to(self._root()).as_posix()
+        except ValueError:
+            return None
+
+    def location(self, key: str) -> str:
+        return (self._root() / key).as_posix()
+
+    def local_path(self, location: str) -> Path | None:
+        return Path(location)
+
+    def put_file(self, source: Path, location: str, sha256: str):
+        path = Path(location)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, path)
+
+    def size(self, location: str) -> int | None:
+        try:
+            return os.stat(location).st_size
+        except FileNotFoundError:
+            return None
+
+    def read_head(self, location: str, size: int) -> bytes:
+        with open(location, "rb") as f:
+            return f.read(size)
+
+    def delete(self, location: str) -> int | None:
+        path = Path(location)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return None
+        return size
+
+    def signature(self, key: str, expires: int, sha256: str, size: int) -> str:
+        message = f"PUT\n{key}\n{expires}\n{sha256}\n{size}".encode()
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def verify_put(self, key: str, expires: int, sha256: str, size: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self.signature(key, expires, sha256, size), signature)
+
+    def presign_put(self, location: str, sha256: str, size: int, content_type: str) -> PresignedUpload:
+        key = self._key(location)
+        expires = int(time.time()) + self.ttl
+        query = f"expires={expires}&sha256={sha256}&size={size}&signature={self.signature(key, expires, sha256, size)}"
+
+        return PresignedUpload(
+            f"/storage/{quote(key)}?{query}",
+            {"content-type": content_type},
+            datetime.fromtimestamp(expires, UTC).replace(tzinfo=None),
+        )
+
+    def url_for(self, location: str, filename: str | None = None) -> str:
+        key = self._key(location)
+        return f"/uploads/{quote(key)}" if key is not None else f"/{quote(location)}"
+
+
+# =========================
+# S3-COMPATIBLE
+# =========================
+
+class S3StorageBackend(StorageBackend):
+    """
+    Blobs in an S3-compatible bucket (AWS, MinIO, R2, ...). Everything,
+    including the server's own requests, goes through SigV4 query-string
+    presigned URLs, so there is one signing path and no SDK dependency.
+    """
+
+    SERVICE = "s3"
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        region: str,
+        access_key_id: str,
+        secret_access_key: str,
+        ttl: int,
+        virtual_hosted: bool = False,
+        client: httpx.Client | None = None,
+    ):
+        endpoint = urlsplit(endpoint_url)
+        self.scheme = endpoint.scheme
+        self.host = f"{bucket}.{endpoint.netloc}" if virtual_hosted else endpoint.netloc
+        self.prefix = endpoint.path.rstrip("/") + ("" if virtual_hosted else f"/{bucket}")
+        self.region = region
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.ttl = ttl
+        self.client = client or httpx.Client(timeout=30)
+
+    def location(self, key: str) -> str:
+        return key
+
+    def presign(
+        self,
+        method: str,
+        key: str,
+        expires_in: int,
+        headers: dict[str, str] | None = None,
+        query: dict[str, str] | None = None,
+        now: datetime | None = None,
+    ) -> str:
+        now = now or datetime.now(UTC)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{now:%Y%m%d}/{self.region}/{self.SERVICE}/aws4_request"
+
+        signed = {"host": self.host}
+        signed.update({name.lower(): value.strip() for name, value in (headers or {}).items()})
+        signed_names = ";".join(sorted(signed))
+
+        params = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key_id}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires_in),
+            "X-Amz-SignedHeaders": signed_names,
+            **(query or {}),
+        }
+
+        path = quote(f"{self.prefix}/{key}", safe="/-_.~")
+        canonical_query = "&".join(
+            f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+            for name, value in sorted(params.items())
+        )
+        canonical_request = "\n".join([
+            method,
+            path,
+            canonical_query,
+            "".join(f"{name}:{signed[name]}\n" for name in sorted(signed)),
+            signed_names,
+            "UNSIGNED-PAYLOAD",
+        ])
+
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+
+        signing_key = f"AWS4{self.secret_access_key}".encode()
+        for part in (f"{now:%Y%m%d}", self.region, self.SERVICE, "aws4_request"):
+            signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+
+        signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        return f"{self.scheme}://{self.host}{path}?{canonical_query}&X-Amz-Signature={signature}"
+
+    def _request(self, method: str, key: str, headers: dict | None = None, **kwargs) -> httpx.Response:
+        url = self.presign(method, key, 300, headers=headers)
+        try:
+            return self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            raise OSError(f"Storage request failed: {e}") from e
+
+    @staticmethod
+    def _checksum(sha256: str) -> str:
+        return base64.b64encode(bytes.fromhex(sha256)).decode()
+
+    def put_file(self, source: Path, location: str, sha256: str):
+        headers = {"x-amz-checksum-sha256": self._checksum(sha256)}
+
+        with open(source, "rb") as f:
+            response = self._request("PUT", location, headers, content=f)
+
+        if response.status_code >= 300:
+            raise OSError(f"Storage PUT failed with {response.status_code}")
+
+    def size(self, location: str) -> int | None:
+        response = self._request("HEAD", location)
+
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 300:
+            raise OSError(f"Storage HEAD failed with {response.status_code}")
+
+        return int(response.headers.get("content-length", 0))
+
+    def read_head(self, location: str, size: int) -> bytes:
+        # Range is not signed, so it can be added to the presigned GET
+        url = self.presign("GET", location, 300)
+        try:
+            response = self.client.get(url, headers={"range": f"bytes=0-{size - 1}"})
+        except httpx.HTTPError as e:
+            raise OSError(f"Storage request failed: {e}") from e
+
+        if response.status_code >= 300:
+            raise OSError(f"Storage GET failed with {response.status_code}")
+
+        return response.content[:size]
+
+    def delete(self, location: str) -> int | None:
+        size = self.size(location)
+        if size is None:
+            return None
+
+        response = self._request("DELETE", location)
+        if response.status_code >= 300 and response.status_code != 404:
+            raise OSError(f"Storage DELETE failed with {response.status_code}")
+
+        return size
+
+    def presign_put(self, location: str, sha256: str, size: int, content_type: str) -> PresignedUpload:
+        # The store itself rejects a body whose length or SHA-256 differs
+        headers = {
+            "content-length": str(size),
+            "content-type": content_type,
+            "x-amz-checksum-sha256": self._checksum(sha256),
+        }
+
+        now = datetime.now(UTC)
+        url = self.presign("PUT", location, self.ttl, headers=headers, now=now)
+
+        return PresignedUpload(
+            url,
+            {name: value for name, value in headers.items() if name != "content-length"},
+            datetime.fromtimestamp(now.timestamp() + self.ttl, UTC).replace(tzinfo=None),
+        )
+
+    def url_for(self, location: str, filename: str | None = None) -> str:
+        query = None
+        if filename:
+            query = {"response-content-disposition": f'attachment; filename="{filename}"'}
+
+        signed_at = datetime.fromtimestamp(_signed_at(time.time(), self.ttl), UTC)
+        return self.presign("GET", location, self.ttl, query=query, now=signed_at)
+
+
+def shared_secret(path: str) -> str:
+    """
+    A secret every worker on this host agrees on: the first to start
+    generates it, the others read it. Published with a link so nobody
+    reads a half-written file.
+    """
+
+    try:
+        with open(path) as f:
+            secret = f.read().strip()
+        if secret:
+            return secret
+    except FileNotFoundError:
+        pass
+
+    tmp_path = f"{path}.{os.getpid()}.{secrets.token_hex(4)}"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            # Another worker won; use theirs
+            pass
+    finally:
+        os.unlink(tmp_path)
+
+    with open(path) as f:
+        return f.read().strip()
+
+
+def create_backend(name: str) -> StorageBackend:
+    if name == "s3":
+        if not S3_BUCKET:
+            raise RuntimeError("S3_BUCKET not set")
+        return S3StorageBackend(
+            S3_ENDPOINT_URL,
+            S3_BUCKET,
+            S3_REGION,
+            S3_ACCESS_KEY_ID,
+            S3_SECRET_ACCESS_KEY,
+            STORAGE_URL_TTL_SECONDS,
+            virtual_hosted=S3_VIRTUAL_HOSTED,
+        )
+
+    if name == "local":
+        # A per-worker random secret would fail PUTs signed by another worker
+        secret = STORAGE_SIGNING_SECRET or shared_secret(STORAGE_SIGNING_SECRET_PATH)
+        return LocalStorageBackend(secret, STORAGE_URL_TTL_SECONDS)
+
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+storage = create_backend(STORAGE_BACKEND)
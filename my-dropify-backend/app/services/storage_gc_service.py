@@ -0,0 +1,305 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    DOWNLOAD_RESUME_WINDOW_SECONDS,
+    STORAGE_GC_BATCH_SIZE,
+    STORAGE_GC_GRACE_SECONDS,
+)
+from app.models.blob import Blob, COLLECTING
+from app.models.drop import Drop
+from app.models.upload import Upload
+from app.services import file_service
+from app.services.compression_service import SIDECAR_SUFFIXES
+from app.services.file_service import release_blobs
+from app.services.storage_backends import storage
+from app.services.thumbnail_service import THUMBNAIL_SUFFIXES
+
+# Files derived from a blob and stored next to it
+DERIVED_SUFFIXES = (*SIDECAR_SUFFIXES.values(), *THUMBNAIL_SUFFIXES.values())
+
+
+class StorageGCStats:
+    """Running totals for this worker, reported on /health/storage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.reconciliations = 0
+        self.references_released = 0
+        self.files_removed = 0
+        self.bytes_reclaimed = 0
+
+    def record(self, references: int = 0, files: int = 0, size: int = 0, reconciliation: bool = False):
+        with self._lock:
+            if reconciliation:
+                self.reconciliations += 1
+            else:
+                self.runs += 1
+            self.references_released += references
+            self.files_removed += files
+            self.bytes_reclaimed += size
+
+    def snapshot(self) -> dict:
+        return {
+            "runs": self.runs,
+            "reconciliations": self.reconciliations,
+            "references_released": self.references_released,
+            "files_removed": self.files_removed,
+            "bytes_reclaimed": self.bytes_reclaimed,
+        }
+
+
+storage_gc_stats = StorageGCStats()
+
+
+def _remove(path: Path) -> int | None:
+    """Deletes a file, returning its size, or None if it was already gone."""
+
+    try:
+        size = path.stat().st_size
+        path.unlink()
+    except FileNotFoundError:
+        return None
+    return size
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+# =========================
+# DEAD DROPS AND BLOBS
+# =========================
+
+def release_dead_drops(db: Session, batch_size: int = STORAGE_GC_BATCH_SIZE) -> int:
+    """
+    Gives up the blob references of drops whose file can no longer be
+    fetched: deleted (expired, consumed, burned) drops, and one-time
+    downloads past their resume window. blob_sha256 is cleared as the
+    reference is released, so each drop releases exactly once.
+
+    Returns the number of references released.
+    """
+
+    resume_cutoff = datetime.utcnow() - timedelta(seconds=DOWNLOAD_RESUME_WINDOW_SECONDS)
+    released = 0
+
+    while True:
+        candidates = db.execute(
+            select(Drop.id, Drop.blob_sha256)
+            .where(Drop.blob_sha256 != None)
+            .where(or_(
+                Drop.is_deleted == True,
+                and_(Drop.is_downloaded == True, Drop.downloaded_at < resume_cutoff),
+            ))
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        if not candidates:
+            return released
+
+        hashes = dict(candidates)
+
+        # Only rows this statement cleared count; another worker may have
+        # released the rest between the select and here
+        cleared = db.scalars(
+            update(Drop)
+            .where(Drop.id.in_(hashes))
+            .where(Drop.blob_sha256 != None)
+            .values(blob_sha256=None)
+            .returning(Drop.id),
+            execution_options={"synchronize_session": False},
+        ).all()
+
+        release_blobs(db, [hashes[drop_id] for drop_id in cleared])
+        db.commit()
+
+        released += len(cleared)
+
+        if len(candidates) < batch_size:
+            return released
+
+
+def collect_unreferenced_blobs(db: Session, batch_size: int = STORAGE_GC_BATCH_SIZE) -> tuple[int, int]:
+    """
+    Deletes blobs whose reference count reached zero. Each row is marked
+    COLLECTING first: from then on uploads can neither take a reference to
+    it nor store the same bytes again at its path, until the file is gone
+    and the row with it. Returns (files removed, bytes).
+    """
+
+    files = reclaimed = 0
+
+    while True:
+        # Also picks up rows a crashed run left COLLECTING
+        batch = (
+            select(Blob.sha256)
+            .where(Blob.ref_count <= 0)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+
+        rows = db.execute(
+            update(Blob)
+            .where(Blob.sha256.in_(batch))
+            .where(Blob.ref_count <= 0)
+            .values(ref_count=COLLECTING)
+            .returning(Blob.sha256, Blob.path),
+            execution_options={"synchronize_session": False},
+        ).all()
+
+        db.commit()
+
+        for row in rows:
+            size = storage.delete(row.path)
+            if size is not None:
+                files += 1
+                reclaimed += size
+
+            # Compressed copies and thumbnails kept next to local files
+            if storage.local_path(row.path) is not None:
+                for suffix in DERIVED_SUFFIXES:
+                    size = _remove(Path(f"{row.path}{suffix}"))
+                    if size is not None:
+                        files += 1
+                        reclaimed += size
+
+        if rows:
+            db.execute(
+                delete(Blob)
+                .where(Blob.sha256.in_([row.sha256 for row in rows]))
+                .where(Blob.ref_count == COLLECTING),
+                execution_options={"synchronize_session": False},
+            )
+            db.commit()
+
+        if len(rows) < batch_size:
+            return files, reclaimed
+
+
+def collect_garbage(db: Session, batch_size: int = STORAGE_GC_BATCH_SIZE) -> dict:
+    released = release_dead_drops(db, batch_size)
+    files, reclaimed = collect_unreferenced_blobs(db, batch_size)
+
+    storage_gc_stats.record(released, files, reclaimed)
+
+    return {
+        "references_released": released,
+        "files_removed": files,
+        "bytes_reclaimed": reclaimed,
+    }
+
+
+# =========================
+# RECONCILIATION
+# =========================
+
+def _old_files(paths: Iterable[Path], cutoff: float) -> Iterator[Path]:
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if path.is_file() and stat.st_mtime < cutoff:
+            yield path
+
+
+def _without_derived_suffix(path: Path) -> Path:
+    for suffix in DERIVED_SUFFIXES:
+        if path.name.endswith(suffix):
+            return path.with_name(path.name.removesuffix(suffix))
+    return path
+
+
+def _orphans(paths: Iterable[Path], known, batch_size: int) -> Iterator[Path]:
+    """Yields the paths missing from what `known` returns for their batch."""
+
+    for batch in _batches(paths, batch_size):
+        keep = known(batch)
+        yield from (path for path in batch if path not in keep)
+
+
+def reconcile_upload_dir(
+    db: Session,
+    batch_size: int = STORAGE_GC_BATCH_SIZE,
+    grace_seconds: float = STORAGE_GC_GRACE_SECONDS,
+) -> dict:
+    """
+    Walks UPLOAD_DIR and deletes files the database does not know about:
+    blob files without a row (e.g. the commit after the move failed),
+    temp files of interrupted uploads, part files of resumable uploads
+    that are gone, and loose files no live drop points at. Files younger
+    than `grace_seconds` are skipped, as they may belong to a request
+    still in flight.
+    """
+
+    root = file_service.UPLOAD_DIR
+    cutoff = time.time() - grace_seconds
+
+    # Direct uploads land at their final path before they are completed
+    pending = {
+        file_service.blob_key(sha256)
+        for sha256 in db.scalars(select(Upload.sha256).where(Upload.sha256 != None))
+    }
+
+    def known_blobs(batch):
+        # Compressed copies and thumbnails belong to the blob they sit next to
+        primary = {path: _without_derived_suffix(path).as_posix() for path in batch}
+        stored = set(db.scalars(
+            select(Blob.path).where(Blob.path.in_(set(primary.values())))
+        ))
+        return {
+            path for path in batch
+            if primary[path] in stored or path.name.split(".")[0] in pending
+        }
+
+    def known_uploads(batch):
+        ids = set(db.scalars(
+            select(Upload.id).where(Upload.id.in_([path.stem for path in batch]))
+        ))
+        return {path for path in batch if path.stem in ids}
+
+    def known_drop_files(batch):
+        # Same for the sidecars and thumbnails of loose files
+        primary = {path: _without_derived_suffix(path).as_posix() for path in batch}
+        referenced = set(db.scalars(
+            select(Drop.file_path)
+            .where(Drop.is_deleted == False)
+            .where(Drop.file_path.in_(set(primary.values())))
+        ))
+        return {path for path in batch if primary[path] in referenced}
+
+    orphans = [
+        _orphans(_old_files(root.glob("blobs/*/*"), cutoff), known_blobs, batch_size),
+        _orphans(_old_files(root.glob(".resumable/*.part"), cutoff), known_uploads, batch_size),
+        _old_files(root.glob(".*.part"), cutoff),
+        _old_files(root.glob(".resumable/*.chunk"), cutoff),
+        _orphans(
+            (path for path in _old_files(root.glob("*"), cutoff) if not path.name.startswith(".")),
+            known_drop_files,
+            batch_size,
+        ),
+    ]
+
+    files = reclaimed = 0
+
+    for paths in orphans:
+        for path in paths:
+            size = _remove(path)
+            if size is not None:
+                files += 1
+                reclaimed += size
+
+    storage_gc_stats.record(files=files, size=reclaimed, reconciliation=True)
+
+    return {"files_removed": files, "bytes_reclaimed": reclaimed}
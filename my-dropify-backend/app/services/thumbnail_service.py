@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from app.core.config import THUMBNAIL_WORKERS, THUMBNAIL_MAX_SIZE, THUMBNAIL_FORMAT
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg"}
+
+# Thumbnails sit next to their (immutable) original with one of these. The
+# size is part of the name, so changing it gives new files and new URLs
+THUMBNAIL_SUFFIXES = {
+    "webp": f".thumb{THUMBNAIL_MAX_SIZE}.webp",
+    "jpeg": f".thumb{THUMBNAIL_MAX_SIZE}.jpg",
+}
+
+OnReady = Callable[[str, int, str], Awaitable[None]]
+
+# Images whose render failed, remembered so they are not retried on every
+# drop list build; the oldest are forgotten (and retried) past this
+MAX_FAILED = 10_000
+
+
+def thumbnail_path(path: str | Path) -> Path:
+    return Path(f"{path}{THUMBNAIL_SUFFIXES[THUMBNAIL_FORMAT]}")
+
+
+def is_image(path: str | None) -> bool:
+    return bool(path) and path.rsplit(".", 1)[-1].lower() in IMAGE_EXTENSIONS
+
+
+def render_thumbnail(source: str, target: str, max_size: int, image_format: str):
+    """Runs in a worker process."""
+
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        # Lets the JPEG decoder skip straight to a reduced scale
+        image.draft("RGB", (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size))
+
+        if image_format == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA")
+
+        tmp_path = Path(target).with_name(f".{uuid.uuid4()}.part")
+        try:
+            image.save(tmp_path, format=image_format.upper(), quality=80)
+            os.replace(tmp_path, target)
+        finally:
+            try:
+                tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ThumbnailPipeline:
+    """
+    Renders image thumbnails in a process pool, so decoding never holds
+    the event loop or the GIL. Each stored image is rendered once however
+    many drops point at it; `on_ready` is called for every one of them
+    when its thumbnail exists.
+
+    `request` is thread-safe; sync routes call it from the threadpool.
+    Workers are started with forkserver, not forked from the threaded
+    server process. A pool broken by a dying worker is replaced on the
+    next request; until then images fall back to the original.
+    """
+
+    def __init__(self, workers: int, max_size: int, image_format: str):
+        self.workers = workers
+        self.max_size = max_size
+        self.image_format = image_format
+        self._executor: ProcessPoolExecutor | None = None
+        # Reentrant: cancelling a broken pool's futures runs their callbacks here
+        self._lock = threading.RLock()
+        self._waiting: dict[str, list[tuple[str, int]]] = {}
+        self._failed: OrderedDict[str, None] = OrderedDict()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._on_ready: OnReady | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def start(self, on_ready: OnReady):
+        self._loop = asyncio.get_running_loop()
+        self._on_ready = on_ready
+
+    def status(self, path: str) -> str | None:
+        """"ready", "pending", or None when there is no thumbnail to wait for."""
+
+        if not self.enabled or path in self._failed:
+            return None
+        return "ready" if thumbnail_path(path).exists() else "pending"
+
+    def request(self, path: str, session_code: str, drop_id: int) -> str | None:
+        """Queues a render unless done or under way. Returns the status."""
+
+        status = self.status(path)
+        if status != "pending":
+            return status
+
+        with self._lock:
+            waiting = self._waiting.get(path)
+            if waiting is not None:
+                waiting.append((session_code, drop_id))
+                return "pending"
+
+            self._waiting[path] = [(session_code, drop_id)]
+
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+
+            try:
+                future = self._executor.submit(
+                    render_thumbnail,
+                    path,
+                    str(thumbnail_path(path)),
+                    self.max_size,
+                    self.image_format,
+                )
+            except (BrokenProcessPool, RuntimeError) as e:
+                # A worker died (e.g. out of memory); start a fresh pool next time
+                logger.warning("Thumbnail pool unavailable: %s", e)
+                del self._waiting[path]
+                self._discard_executor(self._executor)
+                return None
+
+            executor = self._executor
+
+        future.add_done_callback(lambda done: self._finished(path, done, executor))
+        return "pending"
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """Drops a broken pool unless it was already replaced. Call with the lock held."""
+
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finished(self, path: str, future: Future, executor: ProcessPoolExecutor):
+        with self._lock:
+            waiting = self._waiting.pop(path, [])
+
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            # Not necessarily this image's fault; it is retried on a new pool
+            logger.warning("Thumbnail pool broke rendering %s", path)
+            with self._lock:
+                self._discard_executor(executor)
+            return
+
+        if error is not None:
+            # Clients keep showing the original; not retried for this image
+            logger.warning("Thumbnail for %s failed: %s", path, error)
+            with self._lock:
+                self._failed[path] = None
+                while len(self._failed) > MAX_FAILED:
+                    self._failed.popitem(last=False)
+            return
+
+        if self._loop is None or self._on_ready is None:
+            return
+
+        for session_code, drop_id in waiting:
+            try:
+                asyncio.run_coroutine_threadsafe(
+                    self._on_ready(session_code, drop_id, path),
+                    self._loop,
+                )
+            except RuntimeError:
+                # Loop already closed during shutdown
+                return
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._waiting.clear()
+
+        self._loop = None
+        self._on_ready = None
+
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+thumbnails = ThumbnailPipeline(THUMBNAIL_WORKERS, THUMBNAIL_MAX_SIZE, THUMBNAIL_FORMAT)
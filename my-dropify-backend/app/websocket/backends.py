@@ -0,0 +1,146 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable
+from redis.exceptions import ConnectionError, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[str, dict], Awaitable[None]]
+
+
+class BroadcastBackend:
+    """
+    Carries broadcast messages to every worker that holds sockets for a
+    session. Workers subscribe only to the sessions they have sockets for,
+    and hand received messages to `deliver` for local fan-out.
+    """
+
+    def __init__(self):
+        self._deliver: Deliver | None = None
+
+    def bind(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def publish(self, session_code: str, message: dict):
+        raise NotImplementedError
+
+    async def subscribe(self, session_code: str):
+        pass
+
+    async def unsubscribe(self, session_code: str):
+        pass
+
+    async def close(self):
+        pass
+
+
+class InMemoryBroadcastBackend(BroadcastBackend):
+    """Single-process backend: publishing is local delivery."""
+
+    async def publish(self, session_code: str, message: dict):
+        await self._deliver(session_code, message)
+
+
+class RedisBroadcastBackend(BroadcastBackend):
+    """Publishes on one Redis channel per session."""
+
+    CHANNEL_PREFIX = "ws:session:"
+
+    def __init__(self, redis):
+        super().__init__()
+        self.redis = redis
+        self._pubsub = None
+        self._channels: set[str] = set()
+        self._listener: asyncio.Task | None = None
+
+    def _channel(self, session_code: str) -> str:
+        return f"{self.CHANNEL_PREFIX}{session_code}"
+
+    async def publish(self, session_code: str, message: dict):
+        try:
+            await self.redis.publish(self._channel(session_code), json.dumps(message))
+        except (ConnectionError, TimeoutError):
+            # Degrade to this worker's sockets rather than dropping the event
+            logger.warning("Redis unavailable, broadcasting to local sockets only")
+            await self._deliver(session_code, message)
+
+    async def subscribe(self, session_code: str):
+        channel = self._channel(session_code)
+        if channel in self._channels:
+            return
+
+        if self._pubsub is None:
+            self._pubsub = self.redis.pubsub()
+
+        try:
+            await self._pubsub.subscribe(channel)
+        except (ConnectionError, TimeoutError):
+            logger.warning("Could not subscribe to %s", channel)
+            return
+
+        self._channels.add(channel)
+
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, session_code: str):
+        channel = self._channel(session_code)
+        if channel not in self._channels:
+            return
+
+        self._channels.discard(channel)
+
+        try:
+            await self._pubsub.unsubscribe(channel)
+        except (ConnectionError, TimeoutError):
+            pass
+
+    async def _listen(self):
+        while self._channels:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=1.0,
+                )
+            except (ConnectionError, TimeoutError):
+                await asyncio.sleep(1)
+                continue
+
+            if not message or message.get("type") != "message":
+                continue
+
+            session_code = message["channel"].removeprefix(self.CHANNEL_PREFIX)
+
+            try:
+                payload = json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+
+            await self._deliver(session_code, payload)
+
+    async def close(self):
+        self._channels.clear()
+
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+
+def create_backend(name: str) -> BroadcastBackend:
+    if name == "redis":
+        from app.db.redis import redis_client
+        return RedisBroadcastBackend(redis_client)
+
+    if name == "memory":
+        return InMemoryBroadcastBackend()
+
+    raise ValueError(f"Unknown broadcast backend: {name}")
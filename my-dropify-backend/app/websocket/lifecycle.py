@@ -0,0 +1,80 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from fastapi import WebSocket
+
+from app.core.config import WS_PING_INTERVAL_SECONDS, WS_IDLE_TIMEOUT_SECONDS
+from app.websocket.manager import (
+    ConnectionManager,
+    SESSION_EXPIRED_CLOSE_CODE,
+    IDLE_TIMEOUT_CLOSE_CODE,
+)
+
+
+def _seconds_until(expires_at: datetime) -> float:
+    return (expires_at - datetime.utcnow()).total_seconds()
+
+
+async def run_connection(
+    manager: ConnectionManager,
+    session_code: str,
+    websocket: WebSocket,
+    expires_at: datetime,
+    ping_interval: float = WS_PING_INTERVAL_SECONDS,
+    idle_timeout: float = WS_IDLE_TIMEOUT_SECONDS,
+):
+    """
+    Reads from an accepted socket until it goes away.
+
+    Sends a PING event every `ping_interval` seconds and answers client
+    PINGs with PONG. Any inbound frame counts as activity, binary frames
+    are otherwise ignored; a socket that is silent for `idle_timeout`
+    seconds, or whose session reaches `expires_at`, is closed. Returns
+    when the client disconnects.
+    """
+
+    now = time.monotonic()
+    last_seen = now
+    next_ping = now + ping_interval
+    session_deadline = now + _seconds_until(expires_at)
+
+    while True:
+        now = time.monotonic()
+
+        if now >= session_deadline:
+            manager.send(session_code, websocket, {"event": "SESSION_EXPIRED"})
+            await manager.close(session_code, websocket, SESSION_EXPIRED_CLOSE_CODE)
+            return
+
+        if now - last_seen >= idle_timeout:
+            await manager.close(session_code, websocket, IDLE_TIMEOUT_CLOSE_CODE)
+            return
+
+        if now >= next_ping:
+            manager.send(session_code, websocket, {"event": "PING"})
+            next_ping = now + ping_interval
+
+        wait = min(next_ping, last_seen + idle_timeout, session_deadline) - now
+
+        try:
+            frame = await asyncio.wait_for(websocket.receive(), max(wait, 0))
+        except asyncio.TimeoutError:
+            continue
+
+        if frame["type"] == "websocket.disconnect":
+            return
+
+        last_seen = time.monotonic()
+
+        text = frame.get("text")
+        if text is None:
+            continue
+
+        try:
+            message = json.loads(text)
+        except ValueError:
+            continue
+
+        if isinstance(message, dict) and message.get("event") == "PING":
+            manager.send(session_code, websocket, {"event": "PONG"})
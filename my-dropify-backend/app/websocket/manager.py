@@ -1,35 +1,289 @@
 from fastapi import WebSocket
-from typing import Dict, List
+from typing import Dict
+import asyncio
 import json
+import time
 
+from app.core.config import (
+    BROADCAST_BACKEND,
+    WS_SEND_QUEUE_SIZE,
+    WS_SLOW_CONSUMER_POLICY,
+    WS_SEND_TIMEOUT_SECONDS,
+    WS_MAX_CONNECTIONS,
+    WS_MAX_CONNECTIONS_PER_SESSION,
+)
+from app.core.metrics import BROADCAST_FANOUT_SECONDS, WEBSOCKET_CONNECTIONS
+from app.websocket.backends import (
+    BroadcastBackend,
+    InMemoryBroadcastBackend,
+    create_backend,
+)
 
-class ConnectionManager:
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+# Close code for "try again later": slow client or connection cap reached
+SLOW_CONSUMER_CLOSE_CODE = 1013
+TRY_AGAIN_LATER_CLOSE_CODE = 1013
+
+SESSION_NOT_FOUND_CLOSE_CODE = 4404
+SESSION_EXPIRED_CLOSE_CODE = 4410
+IDLE_TIMEOUT_CLOSE_CODE = 4408
+
+
+class _Close:
+    """Queued after the last payload a socket should get before closing."""
+
+    def __init__(self, code: int):
+        self.code = code
+
+
+class BroadcastStats:
     def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.broadcasts = 0
+        self.messages_enqueued = 0
+        self.messages_dropped = 0
+        self.slow_consumer_disconnects = 0
+        self.send_failures = 0
+
+
+class ClientConnection:
+    """
+    One socket with its own bounded outbound queue, drained by a dedicated
+    writer task so a slow client never holds up delivery to the others.
+    """
+
+    def __init__(self, manager: "ConnectionManager", session_code: str, websocket: WebSocket):
+        self.manager = manager
+        self.session_code = session_code
+        self.websocket = websocket
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=manager.queue_size)
+        self.writer = self.loop.create_task(self._write())
+        self.closed = False
+
+    def enqueue(self, payload: str):
+        """Safe to call from any thread or event loop."""
+
+        if self.closed:
+            return
+
+        try:
+            if asyncio.get_running_loop() is self.loop:
+                self._enqueue(payload)
+                return
+        except RuntimeError:
+            pass
+
+        try:
+            self.loop.call_soon_threadsafe(self._enqueue, payload)
+        except RuntimeError:
+            # The socket's event loop is gone
+            self.manager.disconnect(self.session_code, self.websocket)
+
+    def close_after_flush(self, code: int):
+        """Closes the socket once everything queued before this is sent."""
+
+        try:
+            self.loop.call_soon_threadsafe(self._enqueue_close, code)
+        except RuntimeError:
+            self.manager.disconnect(self.session_code, self.websocket)
+
+    def _enqueue_close(self, code: int):
+        if self.closed:
+            return
+
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.manager.stats.messages_dropped += 1
+
+        self.queue.put_nowait(_Close(code))
+
+    def _enqueue(self, payload: str):
+        if self.closed:
+            return
+
+        stats = self.manager.stats
+
+        try:
+            self.queue.put_nowait(payload)
+            stats.messages_enqueued += 1
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.manager.slow_consumer_policy == DISCONNECT:
+            stats.slow_consumer_disconnects += 1
+            self.manager.disconnect(self.session_code, self.websocket)
+            self.loop.create_task(self._close(SLOW_CONSUMER_CLOSE_CODE))
+            return
+
+        self.queue.get_nowait()
+        stats.messages_dropped += 1
+        self.queue.put_nowait(payload)
+        stats.messages_enqueued += 1
+
+    async def _write(self):
+        while True:
+            payload = await self.queue.get()
+
+            if isinstance(payload, _Close):
+                await self._close(payload.code)
+                self.manager.disconnect(self.session_code, self.websocket)
+                return
+
+            try:
+                await asyncio.wait_for(
+                    self.websocket.send_text(payload),
+                    self.manager.send_timeout,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.manager.stats.send_failures += 1
+                self.manager.disconnect(self.session_code, self.websocket)
+                return
+
+    async def _close(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def stop(self):
+        if self.closed:
+            return
+
+        self.closed = True
+
+        try:
+            self.loop.call_soon_threadsafe(self.writer.cancel)
+        except RuntimeError:
+            pass
+
+
+class ConnectionManager:
+    def __init__(
+        self,
+        backend: BroadcastBackend | None = None,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        slow_consumer_policy: str = WS_SLOW_CONSUMER_POLICY,
+        send_timeout: float = WS_SEND_TIMEOUT_SECONDS,
+        max_connections: int = WS_MAX_CONNECTIONS,
+        max_per_session: int = WS_MAX_CONNECTIONS_PER_SESSION,
+    ):
+        self.active_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}
+        self.backend = backend or InMemoryBroadcastBackend()
+        self.backend.bind(self.broadcast_local)
+
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.max_connections = max_connections
+        self.max_per_session = max_per_session
+        self.stats = BroadcastStats()
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self.active_connections.values())
+
+    def can_accept(self, session_code: str) -> bool:
+        if self.connection_count >= self.max_connections:
+            return False
+
+        return len(self.active_connections.get(session_code, {})) < self.max_per_session
 
     async def connect(self, session_code: str, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.setdefault(session_code, []).append(websocket)
+        connections = self.active_connections.setdefault(session_code, {})
+        connections[websocket] = ClientConnection(self, session_code, websocket)
+        WEBSOCKET_CONNECTIONS.inc()
+        await self.backend.subscribe(session_code)
 
     def disconnect(self, session_code: str, websocket: WebSocket):
         if session_code in self.active_connections:
-            if websocket in self.active_connections[session_code]:
-                self.active_connections[session_code].remove(websocket)
+            connection = self.active_connections[session_code].pop(websocket, None)
+            if connection:
+                connection.stop()
+                WEBSOCKET_CONNECTIONS.dec()
 
             if not self.active_connections[session_code]:
                 del self.active_connections[session_code]
+                self._schedule(self._release(session_code))
+
+    def _schedule(self, coro):
+        try:
+            asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            coro.close()
+
+    async def _release(self, session_code: str):
+        # A socket may have joined again before this ran
+        if session_code not in self.active_connections:
+            await self.backend.unsubscribe(session_code)
 
     async def broadcast(self, code: str, message: dict):
+        await self.backend.publish(code, message)
+
+    async def broadcast_local(self, code: str, message: dict):
         if code not in self.active_connections:
             return
 
-        connections = list(self.active_connections[code])
+        self.stats.broadcasts += 1
+        start = time.perf_counter()
 
-        for connection in connections:
-            try:
-                await connection.send_json(message)   # 🔥 FIX
-            except Exception:
-                self.disconnect(code, connection)
+        # Encoded once, whatever the number of sockets
+        payload = json.dumps(message, separators=(",", ":"))
+
+        session_over = message.get("event") == "SESSION_EXPIRED"
+
+        for connection in list(self.active_connections[code].values()):
+            connection.enqueue(payload)
+            if session_over:
+                connection.close_after_flush(SESSION_EXPIRED_CLOSE_CODE)
+
+        BROADCAST_FANOUT_SECONDS.observe(time.perf_counter() - start)
+
+    def send(self, session_code: str, websocket: WebSocket, message: dict):
+        """Queues a message for one socket, behind anything already queued."""
+
+        connection = self.active_connections.get(session_code, {}).get(websocket)
+        if connection:
+            connection.enqueue(json.dumps(message, separators=(",", ":")))
+
+    async def close(self, session_code: str, websocket: WebSocket, code: int):
+        """Closes one socket after its queue drains, and waits for that."""
+
+        connection = self.active_connections.get(session_code, {}).get(websocket)
+        if not connection:
+            return
+
+        connection.close_after_flush(code)
+        await asyncio.wait({connection.writer}, timeout=self.send_timeout)
+
+    async def expire_session(self, session_code: str):
+        """Tells every worker's sockets for the session it is over, then closes them."""
+
+        await self.broadcast(session_code, {"event": "SESSION_EXPIRED"})
+
+    def queue_depths(self) -> dict:
+        depths = [
+            connection.queue.qsize()
+            for connections in self.active_connections.values()
+            for connection in connections.values()
+        ]
+        return {
+            "connections": len(depths),
+            "total": sum(depths),
+            "max": max(depths, default=0),
+        }
+
+    async def shutdown(self):
+        for code, connections in list(self.active_connections.items()):
+            for websocket in list(connections):
+                self.disconnect(code, websocket)
+
+        await self.backend.close()
 
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager(create_backend(BROADCAST_BACKEND))
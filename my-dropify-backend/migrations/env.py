@@ -0,0 +1,54 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.core.config import DATABASE_URL
+from app.models.base import Base
+from app.models import blob, drop, session, upload  # register models
+
+config = context.config
+target_metadata = Base.metadata
+
+# init_db() hands over the app's own connection
+connection = config.attributes.get("connection")
+
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+
+def _configure(**kwargs):
+    context.configure(
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+        render_as_batch=True,
+        **kwargs,
+    )
+
+
+def run_migrations_offline():
+    _configure(url=DATABASE_URL, literal_binds=True)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(DATABASE_URL)
+    with engine.connect() as conn:
+        _configure(connection=conn)
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
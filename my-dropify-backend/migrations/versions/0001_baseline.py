@@ -0,0 +1,52 @@
+"""Baseline schema
+
+Databases created by the old Base.metadata.create_all() already have these
+tables, so they are only created when missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if "sessions" not in tables:
+        op.create_table(
+            "sessions",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("code", sa.String(6), nullable=False, unique=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+        )
+
+    if "drops" not in tables:
+        op.create_table(
+            "drops",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("session_code", sa.String()),
+            sa.Column("content", sa.String(), nullable=True),
+            sa.Column("file_path", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("expires_at", sa.DateTime(), nullable=True),
+            sa.Column("burn_after_read", sa.Boolean()),
+            sa.Column("is_deleted", sa.Boolean()),
+            sa.Column("download_token", sa.String(), nullable=True, unique=True),
+            sa.Column("is_downloaded", sa.Boolean()),
+        )
+        op.create_index("ix_drops_id", "drops", ["id"])
+        op.create_index("ix_drops_session_code", "drops", ["session_code"])
+
+
+def downgrade():
+    op.drop_table("drops")
+    op.drop_table("sessions")
@@ -0,0 +1,67 @@
+"""Content-addressed blobs, resumable uploads and download resume columns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if "blobs" not in tables:
+        op.create_table(
+            "blobs",
+            sa.Column("sha256", sa.String(64), primary_key=True),
+            sa.Column("path", sa.String(), nullable=False),
+            sa.Column("size", sa.BigInteger(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+
+    if "uploads" not in tables:
+        op.create_table(
+            "uploads",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("session_code", sa.String(), nullable=False),
+            sa.Column("filename", sa.String(), nullable=False),
+            sa.Column("extension", sa.String(), nullable=False),
+            sa.Column("total_size", sa.BigInteger(), nullable=False),
+            sa.Column("received_bytes", sa.BigInteger(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("is_complete", sa.Boolean()),
+        )
+        op.create_index("ix_uploads_session_code", "uploads", ["session_code"])
+
+    drop_columns = {column["name"] for column in inspector.get_columns("drops")}
+
+    if "blob_sha256" not in drop_columns:
+        op.add_column("drops", sa.Column("blob_sha256", sa.String(64), nullable=True))
+        op.create_index("ix_drops_blob_sha256", "drops", ["blob_sha256"])
+
+    if "downloaded_at" not in drop_columns:
+        op.add_column("drops", sa.Column("downloaded_at", sa.DateTime(), nullable=True))
+
+    if "download_resume_key" not in drop_columns:
+        op.add_column("drops", sa.Column("download_resume_key", sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("drops") as batch:
+        batch.drop_index("ix_drops_blob_sha256")
+        batch.drop_column("download_resume_key")
+        batch.drop_column("downloaded_at")
+        batch.drop_column("blob_sha256")
+
+    op.drop_table("uploads")
+    op.drop_table("blobs")
@@ -0,0 +1,68 @@
+"""Indexes for the live-drop listing and the expiry sweeps
+
+- ix_drops_session_live: get_drops_by_session (live drops of a session, by id)
+- ix_drops_pending_expiry: cleanup_expired_drops (undeleted drops by expiry)
+- ix_drops_expires_at: cleanup_expired_sessions hard-deleting expired drops
+- ix_sessions_expires_at / ix_uploads_expires_at: the session and upload sweeps
+
+On PostgreSQL they are built CONCURRENTLY so existing tables stay writable.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+LIVE = {
+    "sqlite_where": sa.text("is_deleted = 0"),
+    "postgresql_where": sa.text("is_deleted = false"),
+}
+
+PENDING_EXPIRY = {
+    "sqlite_where": sa.text("is_deleted = 0 AND expires_at IS NOT NULL"),
+    "postgresql_where": sa.text("is_deleted = false AND expires_at IS NOT NULL"),
+}
+
+INDEXES = [
+    ("ix_drops_session_live", "drops", ["session_code", "id"], LIVE),
+    ("ix_drops_pending_expiry", "drops", ["expires_at"], PENDING_EXPIRY),
+    ("ix_drops_expires_at", "drops", ["expires_at"], {}),
+    ("ix_sessions_expires_at", "sessions", ["expires_at"], {}),
+    ("ix_uploads_expires_at", "uploads", ["expires_at"], {}),
+]
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for name, table, columns, options in INDEXES:
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        if name in existing:
+            continue
+
+        if _is_postgres():
+            with op.get_context().autocommit_block():
+                op.create_index(name, table, columns, postgresql_concurrently=True, **options)
+        else:
+            op.create_index(name, table, columns, **options)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        if _is_postgres():
+            with op.get_context().autocommit_block():
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        else:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,26 @@
+"""Record when a drop was deleted, for incremental sync tombstones
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("drops")}
+
+    if "deleted_at" not in columns:
+        op.add_column("drops", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("drops") as batch:
+        batch.drop_column("deleted_at")
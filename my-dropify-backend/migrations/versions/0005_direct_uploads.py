@@ -0,0 +1,30 @@
+"""Track uploads that go straight to storage through presigned URLs
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("uploads")}
+
+    if "sha256" not in columns:
+        op.add_column("uploads", sa.Column("sha256", sa.String(length=64), nullable=True))
+
+    if "content_type" not in columns:
+        op.add_column("uploads", sa.Column("content_type", sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("uploads") as batch:
+        batch.drop_column("content_type")
+        batch.drop_column("sha256")
@@ -0,0 +1,109 @@
+"""
+Session code allocation latency as the code space fills up.
+
+    python -m tests.benchmark.session_codes [--samples 500] [--levels 0,0.5,0.9,0.99]
+
+Prints JSON with p50/p99 (ms) of create_session at each occupancy, next to
+the old approach of probing random codes with a SELECT each (probe
+timings exclude the insert and commit, so compare their growth, not size).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from datetime import datetime, timedelta  # noqa: E402
+from sqlalchemy import delete, insert, select  # noqa: E402
+
+from app.db.database import SessionLocal, engine  # noqa: E402
+from app.models.session import Session as SessionModel  # noqa: E402
+from app.services import session_service  # noqa: E402
+from app.services.session_code_pool import SessionCodePool, CODE_SPACE  # noqa: E402
+
+
+def _fill(occupancy: float):
+    with engine.begin() as connection:
+        connection.execute(delete(SessionModel))
+
+        expires_at = datetime.utcnow() + timedelta(hours=1)
+        codes = random.sample(range(CODE_SPACE), int(CODE_SPACE * occupancy))
+
+        for start in range(0, len(codes), 50_000):
+            connection.execute(
+                insert(SessionModel),
+                [{"id": uuid.uuid4(), "code": f"{code:06d}", "expires_at": expires_at} for code in codes[start:start + 50_000]],
+            )
+
+
+def _probe_allocate(db, attempts: int = 20):
+    # The allocator this replaced: random code, one SELECT per try
+    for _ in range(attempts):
+        code = f"{random.randint(0, 999999):06d}"
+        if not db.scalar(select(SessionModel.id).where(SessionModel.code == code)):
+            return code
+    raise RuntimeError("Unable to generate unique session code")
+
+
+def _percentiles(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1] * 1000, 3),
+    }
+
+
+def run(levels: list[float], samples: int) -> list[dict]:
+    results = []
+
+    for occupancy in levels:
+        _fill(occupancy)
+
+        db = SessionLocal()
+        try:
+            session_service.code_pool = SessionCodePool()
+            session_service.load_code_pool(db)
+
+            pooled = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                session_service.create_session(db)
+                pooled.append(time.perf_counter() - start)
+
+            probed, failures = [], 0
+            for _ in range(samples):
+                start = time.perf_counter()
+                try:
+                    _probe_allocate(db)
+                except RuntimeError:
+                    failures += 1
+                probed.append(time.perf_counter() - start)
+        finally:
+            db.close()
+
+        results.append({
+            "occupancy": occupancy,
+            "pool": _percentiles(pooled),
+            "probe_select": {**_percentiles(probed), "failures": failures},
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--levels", default="0,0.5,0.9,0.99")
+    args = parser.parse_args()
+
+    levels = [float(level) for level in args.levels.split(",")]
+    print(json.dumps(run(levels, args.samples), indent=2))
+
+
+if __name__ == "__main__":
+    main()
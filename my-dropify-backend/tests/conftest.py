@@ -1,14 +1,16 @@
 import os
+import tempfile
 os.environ["TESTING"] = "true"
+os.environ.setdefault("LOCAL_RATE_LIMIT_PATH", os.path.join(tempfile.mkdtemp(), "rate-limit"))
 
 import pytest
 from app.main import app
 from fastapi.testclient import TestClient
-from app.core.dependencies import limiter
+from app.services.local_rate_limit_service import local_limits
 
 @pytest.fixture(autouse=True)
 def reset_rate_limiter():
-    limiter.memory_store = {}
+    local_limits.clear()
 
 @pytest.fixture
 def client():
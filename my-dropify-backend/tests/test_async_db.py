@@ -0,0 +1,38 @@
+import pytest
+from app.db.database import AsyncSessionLocal, _async_database_url
+from app.services.session_service import create_session_async, get_session_by_code_async
+from app.services.drop_service import (
+    create_text_drop_async,
+    get_drops_by_session_async,
+    atomic_consume_drop_async,
+)
+
+
+def test_async_url_uses_async_drivers():
+    assert _async_database_url("sqlite:///./dev.db").drivername == "sqlite+aiosqlite"
+
+    url = _async_database_url("postgresql://u:p@db/dropify?sslmode=require")
+    assert url.drivername == "postgresql+asyncpg"
+    assert url.query == {"ssl": "require"}
+
+
+@pytest.mark.asyncio
+async def test_async_drop_lifecycle():
+    async with AsyncSessionLocal() as db:
+        session = await create_session_async(db)
+        assert await get_session_by_code_async(db, session.code) is not None
+
+        drop = await create_text_drop_async(
+            db,
+            session.code,
+            "burn me",
+            burn_after_read=True,
+        )
+
+        drops = await get_drops_by_session_async(db, session.code)
+        assert [d.id for d in drops] == [drop.id]
+
+        assert await atomic_consume_drop_async(db, drop.id) is True
+        assert await atomic_consume_drop_async(db, drop.id) is False
+
+        assert await get_drops_by_session_async(db, session.code) == []
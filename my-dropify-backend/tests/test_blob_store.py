@@ -0,0 +1,127 @@
+import os
+import hashlib
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.database import SessionLocal
+from app.models.blob import Blob
+from app.models.drop import Drop
+from app.services.drop_cleanup_service import cleanup_expired_drops
+from app.services.storage_gc_service import collect_garbage
+
+client = TestClient(app)
+
+
+def _upload(code, content):
+    response = client.post(
+        f"/sessions/{code}/drops/file",
+        files={"file": ("shared.txt", content, "text/plain")},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def _expire_drop(drop_id):
+    db = SessionLocal()
+    db.query(Drop).filter(Drop.id == drop_id).update(
+        {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    cleanup_expired_drops(db)
+    collect_garbage(db)
+    db.close()
+
+
+def test_identical_uploads_share_one_blob():
+    content = b"the same quarterly report"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    first_code = client.post("/sessions").json()["code"]
+    second_code = client.post("/sessions").json()["code"]
+
+    first = _upload(first_code, content)
+    second = _upload(second_code, content)
+
+    assert first["path"] == second["path"]
+    # Knowing the hash does not give the URL
+    assert sha256 not in first["path"]
+
+    db = SessionLocal()
+    assert db.get(Blob, sha256).ref_count == 2
+    db.close()
+
+    # The file survives until the last drop referencing it expires
+    _expire_drop(first["id"])
+    assert os.path.exists(first["path"])
+
+    _expire_drop(second["id"])
+    assert not os.path.exists(first["path"])
+
+    db = SessionLocal()
+    assert db.get(Blob, sha256) is None
+    db.close()
+
+
+def test_known_blob_can_be_dropped_without_upload():
+    content = b"already on the server"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    code = client.post("/sessions").json()["code"]
+
+    assert client.get(f"/sessions/{code}/blobs/{sha256}").status_code == 404
+
+    uploaded = _upload(code, content)
+
+    check = client.get(f"/sessions/{code}/blobs/{sha256}")
+    assert check.status_code == 200
+    assert check.json()["size"] == len(content)
+
+    other_code = client.post("/sessions").json()["code"]
+    response = client.post(
+        f"/sessions/{other_code}/drops/blob",
+        json={"sha256": sha256, "filename": "copy.txt"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["path"] == uploaded["path"]
+
+
+def test_dropping_unknown_blob_is_not_found():
+    code = client.post("/sessions").json()["code"]
+
+    response = client.post(
+        f"/sessions/{code}/drops/blob",
+        json={"sha256": "0" * 64, "filename": "copy.txt"},
+    )
+
+    assert response.status_code == 404
+
+
+def test_failed_drop_gives_its_blob_reference_back(monkeypatch):
+    from app.services import file_service
+
+    content = b"uploaded while the session ends"
+    sha256 = hashlib.sha256(content).hexdigest()
+    code = client.post("/sessions").json()["code"]
+    _upload(code, content)
+
+    checks = []
+
+    def session_ends_mid_upload(db, session_code):
+        # Live when the upload starts, gone when its drop is added
+        checks.append(session_code)
+        if len(checks) > 1:
+            raise ValueError("Session does not exist")
+
+    monkeypatch.setattr(file_service, "_ensure_session_exists", session_ends_mid_upload)
+
+    response = client.post(
+        f"/sessions/{code}/drops/file",
+        files={"file": ("shared.txt", content, "text/plain")},
+    )
+
+    assert response.status_code == 400
+
+    db = SessionLocal()
+    assert db.get(Blob, sha256).ref_count == 1
+    db.close()
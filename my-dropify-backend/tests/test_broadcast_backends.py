@@ -0,0 +1,98 @@
+import asyncio
+import json
+import pytest
+from app.websocket.backends import InMemoryBroadcastBackend, RedisBroadcastBackend
+from app.websocket.manager import ConnectionManager
+
+
+class FakePubSub:
+    def __init__(self, broker):
+        self.broker = broker
+        self.channels = set()
+        self.queue = asyncio.Queue()
+        broker.subscribers.append(self)
+
+    async def subscribe(self, *channels):
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        self.channels.difference_update(channels)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        pass
+
+
+class FakeRedis:
+    """Stands in for one Redis server shared by several workers."""
+
+    def __init__(self):
+        self.subscribers = []
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def publish(self, channel, data):
+        receivers = 0
+        for pubsub in self.subscribers:
+            if channel in pubsub.channels:
+                receivers += 1
+                await pubsub.queue.put({"type": "message", "channel": channel, "data": data})
+        return receivers
+
+
+class FakeSocket:
+    def __init__(self):
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        self.received.append(json.loads(payload))
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_delivers_locally():
+    manager = ConnectionManager(InMemoryBroadcastBackend())
+    socket = FakeSocket()
+
+    await manager.connect("123456", socket)
+    await manager.broadcast("123456", {"event": "NEW_DROP", "id": 1})
+    await _settle()
+
+    assert socket.received == [{"event": "NEW_DROP", "id": 1}]
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_fans_out_across_workers():
+    redis = FakeRedis()
+    worker_a = ConnectionManager(RedisBroadcastBackend(redis))
+    worker_b = ConnectionManager(RedisBroadcastBackend(redis))
+
+    socket_b = FakeSocket()
+    await worker_b.connect("123456", socket_b)
+
+    # Drop created on worker A reaches the client connected to worker B
+    await worker_a.broadcast("123456", {"event": "NEW_DROP", "id": 7})
+    await _settle()
+
+    assert socket_b.received == [{"event": "NEW_DROP", "id": 7}]
+
+    # Worker B stops listening once its last socket for the session leaves
+    worker_b.disconnect("123456", socket_b)
+    await _settle()
+    assert await redis.publish("ws:session:123456", "{}") == 0
+
+    await worker_a.shutdown()
+    await worker_b.shutdown()
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import pytest
+from app.websocket.manager import ConnectionManager
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.received = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        self.received.append(json.loads(payload))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class StalledSocket(RecordingSocket):
+    """A client whose network never drains."""
+
+    async def send_text(self, payload):
+        await asyncio.Event().wait()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_delay_others():
+    manager = ConnectionManager(queue_size=2)
+    fast = RecordingSocket()
+    slow = StalledSocket()
+
+    await manager.connect("111111", slow)
+    await manager.connect("111111", fast)
+
+    for i in range(5):
+        await manager.broadcast("111111", {"event": "NEW_DROP", "id": i})
+        await _settle()
+
+    assert [m["id"] for m in fast.received] == [0, 1, 2, 3, 4]
+
+    # The stalled client only keeps the newest messages, the rest are dropped
+    assert manager.stats.messages_dropped == 2
+    assert manager.queue_depths()["max"] == 2
+
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_client():
+    manager = ConnectionManager(queue_size=1, slow_consumer_policy="disconnect")
+    slow = StalledSocket()
+
+    await manager.connect("222222", slow)
+
+    for i in range(4):
+        await manager.broadcast("222222", {"event": "NEW_DROP", "id": i})
+    await _settle()
+
+    assert "222222" not in manager.active_connections
+    assert slow.closed_with == 1013
+    assert manager.stats.slow_consumer_disconnects == 1
+
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_payload_is_serialized_once(monkeypatch):
+    from app.websocket import manager as manager_module
+
+    calls = []
+    real_dumps = json.dumps
+
+    def counting_dumps(*args, **kwargs):
+        calls.append(args)
+        return real_dumps(*args, **kwargs)
+
+    monkeypatch.setattr(manager_module.json, "dumps", counting_dumps)
+
+    manager = ConnectionManager()
+    sockets = [RecordingSocket() for _ in range(10)]
+    for socket in sockets:
+        await manager.connect("333333", socket)
+
+    await manager.broadcast("333333", {"event": "NEW_DROP", "id": 1})
+    await _settle()
+
+    assert len(calls) == 1
+    assert all(s.received == [{"event": "NEW_DROP", "id": 1}] for s in sockets)
+
+    await manager.shutdown()
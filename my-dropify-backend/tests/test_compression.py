@@ -0,0 +1,94 @@
+import os
+from sqlalchemy import text
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.db.database import SessionLocal
+from app.models.types import CompressedText
+from app.services.compression_service import negotiate, sidecar_path, ENCODINGS
+
+client = TestClient(app)
+
+CODE = "def handler(request):\n    return {'status': 'ok', 'items': list(range(10))}\n" * 40
+
+
+def test_large_text_drops_are_stored_compressed():
+    code = client.post("/sessions").json()["code"]
+
+    drop = client.post(
+        f"/sessions/{code}/drops/text",
+        json={"content": CODE, "drop_type": "code"},
+    ).json()
+
+    db = SessionLocal()
+    stored = db.execute(text("SELECT content FROM drops WHERE id = :id"), {"id": drop["id"]}).scalar()
+    db.close()
+
+    assert stored.startswith(CompressedText.MARKER)
+    assert len(stored) < len(CODE) / 2
+
+    drops = client.get(f"/sessions/{code}/drops").json()
+    assert drops[0]["content"] == drop["content"]
+
+
+def test_small_and_legacy_values_read_back_unchanged():
+    column = CompressedText(1024)
+
+    assert column.process_bind_param("text|hi", None) == "text|hi"
+    assert column.process_result_value("text|hi", None) == "text|hi"
+
+    packed = column.process_bind_param("text|" + "a" * 2000, None)
+    assert column.process_result_value(packed, None) == "text|" + "a" * 2000
+
+
+def test_negotiation_follows_client_weights():
+    assert negotiate(None) is None
+    assert negotiate("identity") is None
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("*") == ENCODINGS[0]
+    assert negotiate("gzip;q=1.0, br;q=0.1, zstd;q=0.1") == "gzip"
+
+
+def test_drop_list_is_sent_compressed():
+    code = client.post("/sessions").json()["code"]
+    client.post(f"/sessions/{code}/drops/text", json={"content": CODE, "drop_type": "code"})
+
+    response = client.get(f"/sessions/{code}/drops", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json()[0]["type"] == "code"
+
+    again = client.get(
+        f"/sessions/{code}/drops",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]},
+    )
+    assert again.status_code == 304
+
+    plain = client.get(f"/sessions/{code}/drops", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+
+def test_text_files_are_served_from_a_compressed_copy():
+    code = client.post("/sessions").json()["code"]
+    content = CODE.encode()
+
+    drop = client.post(
+        f"/sessions/{code}/drops/file",
+        files={"file": ("handler.txt", content, "text/plain")},
+    ).json()
+
+    response = client.get(drop["url"], headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.content == content
+    assert os.path.exists(sidecar_path(drop["path"], "gzip"))
+
+    # Byte ranges are always answered from the original
+    partial = client.get(drop["url"], headers={"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert "content-encoding" not in partial.headers
+    assert partial.content == content[:10]
@@ -1,6 +1,60 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
 from app.db.database import engine
+from app.db.pool import InstrumentedQueuePool, PoolStats, pool_snapshot
 
 
 def test_db_connection():
     connection = engine.connect()
     connection.close()
+
+
+def test_pool_reports_checkouts_and_timeouts():
+    small = create_engine(
+        "sqlite://",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+
+    held = small.connect()
+
+    with pytest.raises(TimeoutError):
+        small.connect()
+
+    stats = pool_snapshot(small.pool)
+    assert stats["checked_out"] == 1
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+
+    held.close()
+    small.dispose()
+
+
+def test_pool_stats_count_every_concurrent_checkout():
+    stats = PoolStats()
+
+    def check_out():
+        for _ in range(2000):
+            stats.record_checkout(0.001, opened_overflow=True)
+
+    threads = [threading.Thread(target=check_out) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = stats.snapshot()
+    assert snapshot["checkouts"] == 16000
+    assert snapshot["overflow_opened"] == 16000
+
+
+def test_db_pool_health_endpoint(client):
+    response = client.get("/health/db")
+
+    assert response.status_code == 200
+    assert response.json()["sync_pool"]["checkouts"] >= 1
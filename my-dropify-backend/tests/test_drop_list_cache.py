@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.drop_list_cache import DropListCache
+
+client = TestClient(app)
+
+
+def _new_session_with_drop():
+    code = client.post("/sessions").json()["code"]
+    client.post(f"/sessions/{code}/drops/text", json={"content": "first"})
+    return code
+
+
+def test_unchanged_drop_list_answers_304():
+    code = _new_session_with_drop()
+
+    first = client.get(f"/sessions/{code}/drops")
+    assert first.status_code == 200
+    assert first.json()[0]["content"] == "first"
+
+    etag = first.headers["etag"]
+    again = client.get(f"/sessions/{code}/drops", headers={"If-None-Match": etag})
+
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+
+def test_new_and_deleted_drops_change_the_etag():
+    code = _new_session_with_drop()
+    etag = client.get(f"/sessions/{code}/drops").headers["etag"]
+
+    created = client.post(
+        f"/sessions/{code}/drops/text",
+        json={"content": "burn me", "burn_after_read": True},
+    ).json()
+
+    after_new = client.get(f"/sessions/{code}/drops", headers={"If-None-Match": etag})
+    assert after_new.status_code == 200
+    assert [drop["content"] for drop in after_new.json()] == ["first", "burn me"]
+
+    client.post(f"/sessions/{code}/drops/{created['id']}/consume")
+
+    after_delete = client.get(
+        f"/sessions/{code}/drops",
+        headers={"If-None-Match": after_new.headers["etag"]},
+    )
+    assert after_delete.status_code == 200
+    assert [drop["content"] for drop in after_delete.json()] == ["first"]
+    assert after_delete.headers["etag"] == etag
+
+
+def test_list_built_before_an_invalidation_is_not_cached():
+    cache = DropListCache(max_sessions=10, max_age_seconds=60)
+
+    version = cache.version("123456")
+    cache.invalidate("123456")
+    cache.put("123456", version, b"[]")
+
+    assert cache.get("123456") is None
+
+    cache.put("123456", cache.version("123456"), b"[]")
+    assert cache.get("123456").body == b"[]"
+
+
+def test_entry_goes_stale_at_first_drop_expiry():
+    cache = DropListCache(max_sessions=10, max_age_seconds=60)
+    expiry = datetime.utcnow() + timedelta(seconds=5)
+
+    cache.put("123456", 0, b"[]", earliest_expiry=expiry)
+
+    assert cache.get("123456") is not None
+    assert cache.get("123456", now=expiry) is None
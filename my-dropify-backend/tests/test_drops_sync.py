@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.database import SessionLocal
+from app.models.drop import Drop
+from app.services.drop_service import encode_cursor
+from app.services.expiry_service import cleanup_expired_sessions
+
+client = TestClient(app)
+
+
+def _session_with_drops(count, **options):
+    code = client.post("/sessions").json()["code"]
+    ids = [
+        client.post(
+            f"/sessions/{code}/drops/text",
+            json={"content": f"drop {i}", **options},
+        ).json()["id"]
+        for i in range(count)
+    ]
+    return code, ids
+
+
+def test_plain_request_still_returns_full_list():
+    code, ids = _session_with_drops(3)
+
+    response = client.get(f"/sessions/{code}/drops")
+
+    assert [drop["id"] for drop in response.json()] == ids
+
+
+def test_pages_follow_the_cursor():
+    code, ids = _session_with_drops(5)
+
+    first = client.get(f"/sessions/{code}/drops", params={"limit": 2}).json()
+    assert [drop["id"] for drop in first["drops"]] == ids[:2]
+    assert first["has_more"] is True
+
+    second = client.get(
+        f"/sessions/{code}/drops",
+        params={"cursor": first["cursor"], "limit": 3},
+    ).json()
+    assert [drop["id"] for drop in second["drops"]] == ids[2:]
+    assert second["has_more"] is False
+
+
+def test_delta_reports_new_drops_and_tombstones():
+    code, ids = _session_with_drops(3, burn_after_read=True)
+
+    synced = client.get(f"/sessions/{code}/drops", params={"limit": 100}).json()
+
+    client.post(f"/sessions/{code}/drops/{ids[1]}/consume")
+    new_id = client.post(f"/sessions/{code}/drops/text", json={"content": "late"}).json()["id"]
+
+    delta = client.get(f"/sessions/{code}/drops", params={"cursor": synced["cursor"]}).json()
+
+    assert [drop["id"] for drop in delta["drops"]] == [new_id]
+    assert delta["deleted"] == [ids[1]]
+
+
+def test_since_id_lists_every_gone_drop_at_or_below_it():
+    code, ids = _session_with_drops(3, burn_after_read=True)
+    client.post(f"/sessions/{code}/drops/{ids[0]}/consume")
+
+    delta = client.get(f"/sessions/{code}/drops", params={"since_id": ids[1]}).json()
+
+    assert [drop["id"] for drop in delta["drops"]] == [ids[2]]
+    assert delta["deleted"] == [ids[0]]
+
+
+def test_bad_cursor_and_limit_are_rejected():
+    code, _ = _session_with_drops(1)
+
+    assert client.get(f"/sessions/{code}/drops", params={"cursor": "nope"}).status_code == 400
+    assert client.get(f"/sessions/{code}/drops", params={"limit": 0}).status_code == 400
+
+
+def test_expired_drops_stay_as_tombstones_for_live_sessions():
+    code, ids = _session_with_drops(2)
+    synced = client.get(f"/sessions/{code}/drops", params={"limit": 100}).json()
+
+    db = SessionLocal()
+    db.query(Drop).filter(Drop.id == ids[0]).update(
+        {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+
+    # A session sweep no longer hard-deletes drops a cursor may still ask about
+    cleanup_expired_sessions(db)
+    assert db.get(Drop, ids[0]) is not None
+    db.close()
+
+    delta = client.get(f"/sessions/{code}/drops", params={"cursor": synced["cursor"]}).json()
+    assert delta["deleted"] == [ids[0]]
+
+
+def test_cursor_older_than_tombstone_retention_needs_full_resync():
+    code, ids = _session_with_drops(1)
+    stale = encode_cursor(ids[0], datetime.utcnow() - timedelta(days=30))
+
+    response = client.get(f"/sessions/{code}/drops", params={"cursor": stale})
+
+    assert response.status_code == 410
@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta, UTC
 from app.services.expiry_service import cleanup_expired_sessions
+from app.services.drop_cleanup_service import cleanup_expired_drops
 from app.db.database import SessionLocal
 from app.models.session import Session as SessionModel
+from app.models.drop import Drop
 
 
 def test_expired_session_cleanup():
@@ -21,3 +23,78 @@ def test_expired_session_cleanup():
     assert result is None
 
     db.close()
+
+
+def _expired_drops(code, count):
+    db = SessionLocal()
+    past = datetime.utcnow() - timedelta(minutes=1)
+    drops = [Drop(session_code=code, content=f"drop {i}", expires_at=past) for i in range(count)]
+    db.add_all(drops)
+    db.commit()
+    ids = [drop.id for drop in drops]
+    db.close()
+    return ids
+
+
+def test_drop_expiry_runs_in_batches():
+    ids = _expired_drops("888888", 7)
+
+    db = SessionLocal()
+    expired = cleanup_expired_drops(db, batch_size=3)
+
+    assert expired.has_more is False
+    assert sorted(drop["id"] for drop in expired.drops if drop["session_code"] == "888888") == ids
+    assert db.query(Drop).filter(Drop.id.in_(ids), Drop.is_deleted == False).count() == 0
+
+    db.close()
+
+
+def test_drop_expiry_stops_at_time_budget():
+    ids = _expired_drops("777777", 5)
+
+    db = SessionLocal()
+    first = cleanup_expired_drops(db, batch_size=2, time_budget=0)
+
+    assert len(first.drops) == 2
+    assert first.has_more is True
+
+    rest = cleanup_expired_drops(db, batch_size=2, time_budget=60)
+
+    assert rest.has_more is False
+    expired = first.drops + rest.drops
+    assert sorted(drop["id"] for drop in expired if drop["session_code"] == "777777") == ids
+
+    db.close()
+
+
+def test_session_cleanup_deletes_in_batches():
+    db = SessionLocal()
+    past = datetime.now(UTC) - timedelta(minutes=1)
+    codes = [f"66666{i}" for i in range(5)]
+    db.add_all(SessionModel(code=code, expires_at=past) for code in codes)
+    db.commit()
+
+    assert cleanup_expired_sessions(db, batch_size=2).sessions >= 5
+    assert db.query(SessionModel).filter(SessionModel.code.in_(codes)).count() == 0
+
+    db.close()
+
+
+def test_session_cleanup_purges_drops_of_expired_sessions():
+    db = SessionLocal()
+    db.add(SessionModel(code="555555", expires_at=datetime.now(UTC) - timedelta(minutes=1)))
+    db.commit()
+    db.close()
+
+    # Not expired themselves, but nobody can sync the session anymore
+    ids = _expired_drops("555555", 2)
+    db = SessionLocal()
+    db.query(Drop).filter(Drop.id.in_(ids)).update({"expires_at": None})
+    db.commit()
+
+    cleaned = cleanup_expired_sessions(db)
+
+    assert cleaned.drops_purged >= 2
+    assert cleaned.sessions >= 1
+    assert db.query(Drop).filter(Drop.id.in_(ids)).count() == 0
+    db.close()
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+
+from app.services.expiry_scheduler import ExpiryScheduler, SESSION, DROP, UPLOAD
+
+
+async def _collect(scheduler, *, fallback=None, wait=0.3):
+    fired = []
+
+    async def on_due(due):
+        fired.append((due, datetime.utcnow()))
+
+    task = asyncio.create_task(scheduler.run(on_due, fallback))
+    await asyncio.sleep(wait)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+    return fired
+
+
+@pytest.mark.asyncio
+async def test_fires_when_deadline_passes():
+    scheduler = ExpiryScheduler()
+    scheduler.start()
+
+    scheduler.schedule(DROP, 1, datetime.utcnow() + timedelta(milliseconds=50))
+
+    fired = await _collect(scheduler)
+
+    assert [due for due, _ in fired] == [{DROP}]
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_groups_kinds_that_are_due_together():
+    scheduler = ExpiryScheduler()
+    scheduler.start()
+
+    past = datetime.utcnow() - timedelta(seconds=1)
+    scheduler.schedule(SESSION, "123456", past)
+    scheduler.schedule(UPLOAD, "abc", past)
+    scheduler.schedule(DROP, 2, datetime.utcnow() + timedelta(hours=1))
+
+    fired = await _collect(scheduler, wait=0.05)
+
+    assert [due for due, _ in fired] == [{SESSION, UPLOAD}]
+    assert len(scheduler) == 1
+
+
+@pytest.mark.asyncio
+async def test_earlier_deadline_wakes_a_sleeping_runner():
+    scheduler = ExpiryScheduler()
+    scheduler.start()
+
+    scheduler.schedule(DROP, 1, datetime.utcnow() + timedelta(hours=1))
+
+    async def add_soon():
+        await asyncio.sleep(0.05)
+        scheduler.schedule(SESSION, "123456", datetime.utcnow())
+
+    adder = asyncio.create_task(add_soon())
+    fired = await _collect(scheduler, wait=0.2)
+    await adder
+
+    assert [due for due, _ in fired] == [{SESSION}]
+
+
+@pytest.mark.asyncio
+async def test_fallback_sweep_runs_every_kind():
+    scheduler = ExpiryScheduler()
+    scheduler.start()
+
+    fired = await _collect(scheduler, fallback=0.05, wait=0.2)
+
+    assert fired
+    assert fired[0][0] == {SESSION, DROP, UPLOAD}
+
+
+def test_schedule_is_ignored_until_started():
+    scheduler = ExpiryScheduler()
+
+    scheduler.schedule(DROP, 1, datetime.utcnow())
+
+    assert len(scheduler) == 0
@@ -0,0 +1,87 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.database import SessionLocal
+from app.models.drop import Drop
+
+client = TestClient(app)
+
+CONTENT = b"0123456789 range friendly content"
+
+
+def _upload():
+    code = client.post("/sessions").json()["code"]
+    response = client.post(
+        f"/sessions/{code}/drops/file",
+        files={"file": ("range.txt", CONTENT, "text/plain")},
+    )
+    return response.json()
+
+
+def _download_token(drop_id):
+    db = SessionLocal()
+    token = db.get(Drop, drop_id).download_token
+    db.close()
+    return token
+
+
+def test_uploads_are_served_with_immutable_caching():
+    drop = _upload()
+
+    response = client.get(f"/{drop['path']}")
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert "immutable" in response.headers["cache-control"]
+
+    etag = response.headers["etag"]
+    revalidated = client.get(f"/{drop['path']}", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+
+
+def test_uploads_support_range_requests():
+    drop = _upload()
+
+    response = client.get(f"/{drop['path']}", headers={"Range": "bytes=0-9"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+    assert response.headers["content-range"] == f"bytes 0-9/{len(CONTENT)}"
+
+
+def test_hidden_and_outside_paths_are_not_served():
+    assert client.get("/uploads/.resumable/anything.part").status_code == 404
+    assert client.get("/uploads/../app/main.py").status_code == 404
+
+
+def test_one_time_download_can_only_be_resumed_by_its_client():
+    drop = _upload()
+    token = _download_token(drop["id"])
+
+    downloader = TestClient(app)
+    first = downloader.get(f"/downloads/{token}")
+    assert first.status_code == 200
+    assert first.content == CONTENT
+
+    # The same client may resume from where the transfer broke off
+    resumed = downloader.get(f"/downloads/{token}", headers={"Range": "bytes=10-"})
+    assert resumed.status_code == 206
+    assert resumed.content == CONTENT[10:]
+
+    # But a fresh full download is not allowed
+    downloader.cookies.clear()
+    assert downloader.get(f"/downloads/{token}").status_code == 410
+
+    # Nor is a ranged request from anyone else
+    other = TestClient(app)
+    assert other.get(f"/downloads/{token}", headers={"Range": "bytes=0-"}).status_code == 410
+
+
+def test_thumbnails_and_compressed_copies_have_their_own_etag():
+    from app.services.file_delivery_service import content_etag
+    from app.services.thumbnail_service import thumbnail_path
+
+    original = f"uploads/blobs/ab/{'ab' * 32}.png"
+    etags = {content_etag(path) for path in (original, thumbnail_path(original), f"{original}.gz")}
+
+    assert content_etag(original) == f'"{"ab" * 32}"'
+    assert len(etags) == 3
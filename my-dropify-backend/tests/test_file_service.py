@@ -67,3 +67,69 @@ async def test_empty_file(tmp_path):
         await save_file(db, session.code, file)
 
     db.close()
+
+
+@pytest.mark.asyncio
+async def test_content_not_matching_extension():
+    db = SessionLocal()
+
+    session = create_session(db)
+
+    file = UploadFile(
+        filename="image.png",
+        file=BytesIO(b"definitely not a png"),
+        headers=Headers({"content-type": "image/png"})
+    )
+
+    with pytest.raises(ValueError):
+        await save_file(db, session.code, file)
+
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_oversized_file_is_rejected_while_streaming(monkeypatch, tmp_path):
+    from app.services import file_service
+
+    monkeypatch.setattr(file_service, "MAX_FILE_SIZE", 10)
+    monkeypatch.setattr(file_service, "UPLOAD_CHUNK_SIZE", 4)
+    monkeypatch.setattr(file_service, "UPLOAD_DIR", tmp_path)
+
+    db = SessionLocal()
+
+    session = create_session(db)
+
+    file = UploadFile(
+        filename="big.txt",
+        file=BytesIO(b"x" * 20),
+        headers=Headers({"content-type": "text/plain"})
+    )
+
+    with pytest.raises(ValueError):
+        await save_file(db, session.code, file)
+
+    # Nothing, not even the temp file, is left behind
+    assert list(tmp_path.iterdir()) == []
+
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_upload_memory_budget_waits_for_release():
+    import asyncio
+    from app.services.file_service import UploadMemoryBudget, UploadCapacityError
+
+    budget = UploadMemoryBudget(limit=10)
+
+    await budget.acquire(8)
+
+    with pytest.raises(UploadCapacityError):
+        await budget.acquire(8, timeout=0.01)
+
+    waiting = asyncio.create_task(budget.acquire(8, timeout=1))
+    await asyncio.sleep(0)
+
+    budget.release(8)
+    await waiting
+
+    assert budget.in_use == 8
@@ -24,3 +24,19 @@ def test_file_upload_creates_drop(tmp_path):
 
     # Verify file actually exists
     assert os.path.exists(data["file_path"])
+
+
+def test_oversized_upload_rejected_from_content_length():
+    response = client.post("/sessions")
+    code = response.json()["code"]
+
+    upload_response = client.post(
+        f"/sessions/{code}/drops/file",
+        content=b"x",
+        headers={
+            "content-type": "multipart/form-data; boundary=x",
+            "content-length": str(100 * 1024 * 1024),
+        },
+    )
+
+    assert upload_response.status_code == 413
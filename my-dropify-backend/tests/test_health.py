@@ -8,3 +8,16 @@ def test_health():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+def test_websocket_health_reports_queue_metrics():
+    response = client.get("/health/websockets")
+    assert response.status_code == 200
+    assert "messages_dropped" in response.json()
+    assert "max" in response.json()["queue_depth"]
+
+
+def test_storage_health_reports_bytes_reclaimed():
+    response = client.get("/health/storage")
+    assert response.status_code == 200
+    assert "bytes_reclaimed" in response.json()["gc"]
@@ -0,0 +1,95 @@
+import re
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.main import app, _run_expiry_cleanups
+from app.db.database import SessionLocal
+from app.models.drop import Drop
+from app.services.expiry_scheduler import DROP
+
+client = TestClient(app)
+
+
+def _sample(text, name):
+    match = re.search(rf"^{re.escape(name)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_timed_by_route_template():
+    code = client.post("/sessions").json()["code"]
+    requests = "dropify_http_request_duration_seconds_count"
+    before = _value(requests, method="POST", route="/sessions/{code}/drops/text", status="200")
+
+    client.post(f"/sessions/{code}/drops/text", json={"content": "hi"})
+    client.get("/no/such/page")
+
+    assert _value(requests, method="POST", route="/sessions/{code}/drops/text", status="200") == before + 1
+    assert _value(requests, method="GET", route="unmatched", status="404") >= 1
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=")
+    assert f"/sessions/{code}" not in response.text
+    assert 'route="/sessions/{code}/drops/text"' in response.text
+
+
+def test_queries_are_counted_by_operation():
+    queries = "dropify_db_query_duration_seconds_count"
+    before = _value(queries, engine="async", operation="INSERT")
+
+    client.post("/sessions")
+
+    assert _value(queries, engine="async", operation="INSERT") > before
+
+
+def test_db_time_is_attributed_to_the_request():
+    route = {"method": "POST", "route": "/sessions/{code}/drops/text"}
+    code = client.post("/sessions").json()["code"]
+    count = _value("dropify_http_request_db_duration_seconds_count", **route)
+    total = _value("dropify_http_request_db_duration_seconds_sum", **route)
+
+    client.post(f"/sessions/{code}/drops/text", json={"content": "timed"})
+
+    assert _value("dropify_http_request_db_duration_seconds_count", **route) == count + 1
+    assert _value("dropify_http_request_db_duration_seconds_sum", **route) > total
+
+
+def test_open_sockets_and_fanout_are_reported():
+    code = client.post("/sessions").json()["code"]
+    fanouts = _value("dropify_broadcast_fanout_duration_seconds_count")
+
+    with client.websocket_connect(f"/ws/{code}") as websocket:
+        assert _sample(client.get("/metrics").text, "dropify_websocket_connections") >= 1
+
+        client.post(f"/sessions/{code}/drops/text", json={"content": "hello"})
+        assert websocket.receive_json()["event"] == "NEW_DROP"
+
+    assert _value("dropify_broadcast_fanout_duration_seconds_count") > fanouts
+
+
+def test_expiry_sweep_reports_duration_and_rows():
+    code = client.post("/sessions").json()["code"]
+    drop = client.post(f"/sessions/{code}/drops/text", json={"content": "bye"}).json()
+
+    db = SessionLocal()
+    db.query(Drop).filter(Drop.id == drop["id"]).update(
+        {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    db.close()
+
+    sweeps = _value("dropify_expiry_sweep_duration_seconds_count")
+    text = client.get("/metrics").text
+    rows = _sample(text, 'dropify_expiry_rows_total{kind="drops"}') or 0
+
+    _run_expiry_cleanups({DROP})
+
+    text = client.get("/metrics").text
+    assert _value("dropify_expiry_sweep_duration_seconds_count") == sweeps + 1
+    assert _sample(text, 'dropify_expiry_rows_total{kind="drops"}') >= rows + 1
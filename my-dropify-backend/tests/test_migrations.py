@@ -0,0 +1,87 @@
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.dialects import sqlite
+
+from app.db.database import run_migrations
+from app.models.base import Base
+from app.models.session import Session as SessionModel
+from app.services.drop_service import _live_drops_query
+
+
+@pytest.fixture
+def fresh_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _query_plan(connection, statement) -> str:
+    compiled = statement.compile(
+        dialect=sqlite.dialect(),
+        compile_kwargs={"literal_binds": True},
+    )
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_migrations_match_the_models(fresh_engine):
+    with fresh_engine.connect() as connection:
+        run_migrations(connection)
+
+    with fresh_engine.connect() as connection:
+        # SQLite reflects the PostgreSQL UUID type back as NUMERIC, so skip types
+        context = MigrationContext.configure(connection, opts={"compare_type": False})
+        diff = compare_metadata(context, Base.metadata)
+
+    assert diff == []
+
+
+def test_migrations_upgrade_a_create_all_database(fresh_engine):
+    # Schema as the old Base.metadata.create_all() left it, without alembic_version
+    with fresh_engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE sessions (id CHAR(32) PRIMARY KEY, code VARCHAR(6) NOT NULL UNIQUE, "
+            "expires_at DATETIME NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "CREATE TABLE drops (id INTEGER PRIMARY KEY, session_code VARCHAR, content VARCHAR, "
+            "file_path VARCHAR, created_at DATETIME, expires_at DATETIME, burn_after_read BOOLEAN, "
+            "is_deleted BOOLEAN, download_token VARCHAR UNIQUE, is_downloaded BOOLEAN)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO drops (session_code, content, is_deleted) VALUES ('123456', 'kept', 0)"
+        )
+
+    with fresh_engine.connect() as connection:
+        run_migrations(connection)
+
+    inspector = inspect(fresh_engine)
+
+    assert {"blob_sha256", "downloaded_at", "download_resume_key"} <= {
+        column["name"] for column in inspector.get_columns("drops")
+    }
+    assert "ix_drops_session_live" in {index["name"] for index in inspector.get_indexes("drops")}
+    assert "ix_sessions_expires_at" in {index["name"] for index in inspector.get_indexes("sessions")}
+
+    with fresh_engine.connect() as connection:
+        assert connection.execute(text("SELECT content FROM drops")).scalar() == "kept"
+
+
+def test_hot_queries_use_their_indexes(fresh_engine):
+    with fresh_engine.connect() as connection:
+        run_migrations(connection)
+
+    with fresh_engine.connect() as connection:
+        live_drops = _query_plan(connection, _live_drops_query("123456"))
+        expired_sessions = _query_plan(
+            connection,
+            select(SessionModel.code).where(SessionModel.expires_at < datetime.utcnow()),
+        )
+
+    assert "ix_drops_session_live" in live_drops
+    # The index already yields rows in id order
+    assert "TEMP B-TREE" not in live_drops
+    assert "ix_sessions_expires_at" in expired_sessions
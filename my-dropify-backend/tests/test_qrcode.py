@@ -12,3 +12,35 @@ def test_qrcode_generation():
 
     assert qr_response.status_code == 200
     assert qr_response.headers["content-type"] == "image/png"
+
+
+def test_qrcode_is_cached_and_revalidates():
+    code = client.post("/sessions").json()["code"]
+
+    first = client.get(f"/sessions/{code}/qrcode")
+    assert "immutable" in first.headers["cache-control"]
+
+    second = client.get(f"/sessions/{code}/qrcode")
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+
+    revalidated = client.get(
+        f"/sessions/{code}/qrcode",
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+    assert revalidated.status_code == 304
+
+
+def test_svg_qrcode():
+    code = client.post("/sessions").json()["code"]
+
+    response = client.get(f"/sessions/{code}/qrcode", params={"format": "svg"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/svg+xml"
+    assert b"<svg" in response.content
+
+
+def test_unknown_qrcode_format_is_rejected():
+    response = client.get("/sessions/123456/qrcode", params={"format": "gif"})
+    assert response.status_code == 400
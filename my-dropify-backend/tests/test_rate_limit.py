@@ -14,3 +14,154 @@ def test_rate_limit_exceeded():
         for _ in range(6):
             response = client.post("/sessions")
         assert response.status_code == 429
+
+
+def test_drop_routes_report_remaining_quota():
+    with TestClient(app) as client:
+        code = client.post("/sessions").json()["code"]
+
+        first = client.post(f"/sessions/{code}/drops/text", json={"content": "a"})
+        second = client.post(f"/sessions/{code}/drops/text", json={"content": "b"})
+
+    assert first.headers["x-ratelimit-policy"] == "text"
+    assert int(second.headers["x-ratelimit-remaining"]) == int(first.headers["x-ratelimit-remaining"]) - 1
+
+
+def test_text_limit_is_reached_before_the_session_limit():
+    from app.core.advanced_rate_limit_dependency import drop_type_policies
+
+    with TestClient(app) as client:
+        code = client.post("/sessions").json()["code"]
+
+        for _ in range(drop_type_policies["text"].limit):
+            assert client.post(f"/sessions/{code}/drops/text", json={"content": "x"}).status_code == 200
+
+        response = client.post(f"/sessions/{code}/drops/text", json={"content": "x"})
+        file = client.post(
+            f"/sessions/{code}/drops/file",
+            files={"file": ("still.txt", b"still fine", "text/plain")},
+        )
+
+    assert response.status_code == 429
+    assert response.headers["x-ratelimit-policy"] == "text"
+    assert file.status_code == 200
+
+
+def test_session_policy_is_shared_by_drop_types():
+    from app.core.advanced_rate_limit_dependency import drop_type_policies, session_policy
+
+    text_limit = drop_type_policies["text"].limit
+
+    with TestClient(app) as client:
+        code = client.post("/sessions").json()["code"]
+
+        for _ in range(text_limit):
+            assert client.post(f"/sessions/{code}/drops/text", json={"content": "x"}).status_code == 200
+
+        for i in range(session_policy.limit - text_limit):
+            assert client.post(
+                f"/sessions/{code}/drops/file",
+                files={"file": (f"file-{i}.txt", b"file", "text/plain")},
+            ).status_code == 200
+
+        response = client.post(
+            f"/sessions/{code}/drops/file",
+            files={"file": ("late.txt", b"late", "text/plain")},
+        )
+
+    assert response.status_code == 429
+    assert response.headers["x-ratelimit-policy"] == "session"
+    assert int(response.headers["retry-after"]) >= 1
+    assert response.headers["x-ratelimit-remaining"] == "0"
+
+
+def test_denied_requests_are_not_counted(tmp_path):
+    from app.services.local_rate_limit_service import SharedTokenBucketTable
+
+    table = SharedTokenBucketTable(str(tmp_path / "buckets"), slots=64)
+
+    assert table.take_many([("a", 5, 1), ("b", 1, 1)], now=0)[0]
+    allowed, retry_after, remaining = table.take_many([("a", 5, 1), ("b", 1, 1)], now=0.25)
+
+    assert not allowed
+    assert retry_after == 0.75
+    assert remaining == [4, 0]
+
+    table.close()
+
+
+def test_bucket_table_is_bounded_and_shared(tmp_path):
+    from app.services.local_rate_limit_service import SharedTokenBucketTable
+
+    path = str(tmp_path / "buckets")
+    first = SharedTokenBucketTable(path, slots=32)
+    second = SharedTokenBucketTable(path, slots=32)
+
+    for i in range(1000):
+        first.take_many([(f"client-{i}", 1, 0.01)], now=i)
+    assert (tmp_path / "buckets.32").stat().st_size == 32 * 24
+
+    # A second worker mapping the same file sees the same buckets
+    assert first.take_many([("shared", 1, 0.01)], now=2000)[0]
+    assert not second.take_many([("shared", 1, 0.01)], now=2000)[0]
+
+    first.close()
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_script_checks_every_policy(monkeypatch):
+    import fakeredis
+    from app.services import advanced_rate_limit_service as service
+
+    now = [1_700_000_000.0]
+    monkeypatch.setenv("TESTING", "false")
+    monkeypatch.setattr(service.time, "time", lambda: now[0])
+
+    burst = service.RatePolicy("burst", 2, 10)
+    hourly = service.RatePolicy("hourly", 3, 3600)
+    checks = [("rl:burst", burst), ("rl:hourly", hourly)]
+    redis = fakeredis.FakeAsyncRedis()
+    limiter = service.SlidingWindowRateLimiter(redis=redis)
+
+    first = await limiter.check_many(checks)
+    assert first.allowed
+    assert first.remaining == [(burst, 1), (hourly, 2)]
+    assert first.headers() == {
+        "X-RateLimit-Limit": "2",
+        "X-RateLimit-Remaining": "1",
+        "X-RateLimit-Policy": "burst",
+    }
+
+    now[0] += 4
+    await limiter.check_many(checks)
+    denied = await limiter.check_many(checks)
+
+    # The oldest burst entry leaves the window 10 s after it was made
+    assert not denied.allowed
+    assert denied.retry_after == 6
+    assert denied.remaining == [(burst, 0), (hourly, 1)]
+    assert denied.headers()["Retry-After"] == "6"
+    assert await redis.zcard("rl:hourly") == 2
+
+    now[0] += 6
+    assert (await limiter.check_many(checks)).allowed
+
+    # Both policies are full; the caller waits for the later of the two
+    now[0] += 1
+    exhausted = await limiter.check_many(checks)
+    assert not exhausted.allowed
+    assert exhausted.remaining == [(burst, 0), (hourly, 0)]
+    assert exhausted.retry_after == 3600 - 11
+    assert exhausted.headers()["Retry-After"] == "3589"
+
+
+def test_zero_limit_is_refused_with_a_finite_retry_after():
+    from app.services.advanced_rate_limit_service import RatePolicy, _check_locally
+
+    closed = RatePolicy("closed", 0, 30)
+
+    result = _check_locally([("rl:closed", closed)])
+
+    assert not result.allowed
+    assert result.headers()["Retry-After"] == "30"
@@ -0,0 +1,207 @@
+import os
+import asyncio
+import hashlib
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.database import SessionLocal
+from app.services.storage_backends import storage
+from app.services.resumable_upload_service import (
+    append_chunk,
+    get_upload,
+    UploadConflictError,
+    _part_path,
+)
+
+client = TestClient(app)
+
+
+def _start_upload(code, size, filename="notes.txt"):
+    response = client.post(
+        f"/sessions/{code}/uploads",
+        json={"filename": filename, "size": size, "content_type": "text/plain"},
+    )
+    assert response.status_code == 201
+    return response.json()["upload_id"]
+
+
+def test_resumable_upload_in_chunks():
+    code = client.post("/sessions").json()["code"]
+    content = b"hello resumable world"
+
+    upload_id = _start_upload(code, len(content))
+
+    first = client.patch(
+        f"/sessions/{code}/uploads/{upload_id}",
+        content=content[:5],
+        headers={"Upload-Offset": "0"},
+    )
+    assert first.json()["offset"] == 5
+
+    # A client reconnecting asks where to resume from
+    status = client.get(f"/sessions/{code}/uploads/{upload_id}")
+    assert status.json()["offset"] == 5
+
+    second = client.patch(
+        f"/sessions/{code}/uploads/{upload_id}",
+        content=content[5:],
+        headers={"Upload-Offset": "5"},
+    )
+    assert second.json()["offset"] == len(content)
+
+    with client.websocket_connect(f"/ws/{code}") as websocket:
+        done = client.post(f"/sessions/{code}/uploads/{upload_id}/complete")
+        assert done.status_code == 200
+
+        event = websocket.receive_json()
+        assert event["event"] == "NEW_DROP"
+        assert event["id"] == done.json()["id"]
+
+    with open(done.json()["path"], "rb") as f:
+        assert f.read() == content
+
+    drops = client.get(f"/sessions/{code}/drops").json()
+    assert [d["id"] for d in drops] == [done.json()["id"]]
+
+
+def test_chunk_at_wrong_offset_conflicts():
+    code = client.post("/sessions").json()["code"]
+    upload_id = _start_upload(code, 10)
+
+    response = client.patch(
+        f"/sessions/{code}/uploads/{upload_id}",
+        content=b"hello",
+        headers={"Upload-Offset": "3"},
+    )
+
+    assert response.status_code == 409
+
+
+def test_incomplete_upload_cannot_be_finalized():
+    code = client.post("/sessions").json()["code"]
+    upload_id = _start_upload(code, 10)
+
+    client.patch(
+        f"/sessions/{code}/uploads/{upload_id}",
+        content=b"hello",
+        headers={"Upload-Offset": "0"},
+    )
+
+    response = client.post(f"/sessions/{code}/uploads/{upload_id}/complete")
+    assert response.status_code == 400
+
+
+def test_finalized_upload_is_gone():
+    code = client.post("/sessions").json()["code"]
+    upload_id = _start_upload(code, 2)
+
+    client.patch(
+        f"/sessions/{code}/uploads/{upload_id}",
+        content=b"hi",
+        headers={"Upload-Offset": "0"},
+    )
+
+    assert client.post(f"/sessions/{code}/uploads/{upload_id}/complete").status_code == 200
+    assert client.post(f"/sessions/{code}/uploads/{upload_id}/complete").status_code == 404
+
+
+async def _body(data):
+    yield data
+
+
+def test_duplicate_chunk_leaves_the_part_file_alone():
+    code = client.post("/sessions").json()["code"]
+    upload_id = _start_upload(code, 10)
+
+    # Two requests that both read the upload at offset 0
+    first_db, second_db = SessionLocal(), SessionLocal()
+    try:
+        first = get_upload(first_db, code, upload_id)
+        second = get_upload(second_db, code, upload_id)
+
+        assert asyncio.run(append_chunk(first_db, first, 0, _body(b"hello"))) == 5
+
+        with pytest.raises(UploadConflictError):
+            asyncio.run(append_chunk(second_db, second, 0, _body(b"XXXXXXX")))
+    finally:
+        first_db.close()
+        second_db.close()
+
+    assert _part_path(upload_id).read_bytes() == b"hello"
+    assert not list(_part_path(upload_id).parent.glob(f"{upload_id}.*.chunk"))
+
+
+def test_finalize_can_be_retried_after_a_storage_error(monkeypatch):
+    code = client.post("/sessions").json()["code"]
+    content = os.urandom(8).hex().encode()
+    upload_id = _start_upload(code, len(content))
+
+    client.patch(
+        f"/sessions/{code}/uploads/{upload_id}",
+        content=content,
+        headers={"Upload-Offset": "0"},
+    )
+
+    def failing_put(*args):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(storage, "put_file", failing_put)
+        assert client.post(f"/sessions/{code}/uploads/{upload_id}/complete").status_code == 400
+
+    done = client.post(f"/sessions/{code}/uploads/{upload_id}/complete")
+    assert done.status_code == 200
+
+    with open(done.json()["path"], "rb") as f:
+        assert f.read() == content
+
+
+def test_failed_drop_restarts_the_upload(monkeypatch):
+    from app.models.blob import Blob
+    from app.services import file_service
+
+    code = client.post("/sessions").json()["code"]
+    content = os.urandom(8).hex().encode()
+    upload_id = _start_upload(code, len(content))
+
+    def send():
+        return client.patch(
+            f"/sessions/{code}/uploads/{upload_id}",
+            content=content,
+            headers={"Upload-Offset": "0"},
+        )
+
+    send()
+
+    def session_gone(db, session_code):
+        raise ValueError("Session does not exist")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(file_service, "_ensure_session_exists", session_gone)
+        assert client.post(f"/sessions/{code}/uploads/{upload_id}/complete").status_code == 400
+
+    # The bytes went to storage with the failed attempt; they are sent again
+    assert client.get(f"/sessions/{code}/uploads/{upload_id}").json()["offset"] == 0
+    assert send().status_code == 200
+
+    done = client.post(f"/sessions/{code}/uploads/{upload_id}/complete")
+    assert done.status_code == 200
+
+    db = SessionLocal()
+    assert db.get(Blob, hashlib.sha256(content).hexdigest()).ref_count == 1
+    db.close()
+
+
+def test_chunks_are_refused_once_the_session_ends():
+    code = client.post("/sessions").json()["code"]
+    upload_id = _start_upload(code, 4)
+
+    client.delete(f"/sessions/{code}/expire")
+
+    response = client.patch(
+        f"/sessions/{code}/uploads/{upload_id}",
+        content=b"late",
+        headers={"Upload-Offset": "0"},
+    )
+
+    assert response.status_code == 404
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.session_cache import SessionCache, RedisSessionInvalidation, session_cache
+from tests.test_broadcast_backends import FakeRedis
+
+client = TestClient(app)
+
+
+def test_cache_is_bounded_lru():
+    cache = SessionCache(max_entries=2)
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    cache.put("111111", expires_at)
+    cache.put("222222", expires_at)
+    cache.get("111111")
+    cache.put("333333", expires_at)
+
+    assert cache.get("111111") == expires_at
+    assert cache.get("222222") is None
+    assert len(cache) == 2
+
+
+def test_entries_evict_at_session_expiry():
+    cache = SessionCache(max_entries=10)
+    expires_at = datetime.utcnow() + timedelta(seconds=30)
+
+    cache.put("111111", expires_at)
+
+    assert cache.get("111111") == expires_at
+    assert cache.get("111111", now=expires_at + timedelta(seconds=1)) is None
+    assert len(cache) == 0
+
+
+def test_repeated_lookups_are_served_from_cache():
+    code = client.post("/sessions").json()["code"]
+
+    client.get(f"/sessions/{code}")
+    hits = session_cache.hits
+
+    assert client.get(f"/sessions/{code}").status_code == 200
+    assert client.post(f"/sessions/{code}/drops/text", json={"content": "hi"}).status_code == 200
+    assert session_cache.hits >= hits + 3
+
+
+def test_expire_route_invalidates_cached_session():
+    code = client.post("/sessions").json()["code"]
+    assert client.get(f"/sessions/{code}").status_code == 200
+
+    client.delete(f"/sessions/{code}/expire")
+
+    assert client.get(f"/sessions/{code}").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_redis_invalidation_reaches_other_workers():
+    redis = FakeRedis()
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    first, second = SessionCache(10), SessionCache(10)
+    first.put("123456", expires_at)
+    second.put("123456", expires_at)
+
+    listener = asyncio.create_task(RedisSessionInvalidation(redis, {"session": second}).listen())
+    await asyncio.sleep(0.01)
+
+    first.invalidate("123456")
+    await RedisSessionInvalidation(redis, {"session": first}).publish("session", "123456")
+    await asyncio.sleep(0.01)
+
+    listener.cancel()
+    try:
+        await listener
+    except asyncio.CancelledError:
+        pass
+
+    assert second.get("123456") is None
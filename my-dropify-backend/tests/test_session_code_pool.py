@@ -0,0 +1,52 @@
+from app.db.database import SessionLocal
+from app.models.session import Session as SessionModel
+from app.services.session_code_pool import SessionCodePool
+from app.services import session_service
+
+
+def test_allocates_every_code_exactly_once():
+    pool = SessionCodePool(space=100)
+    pool.load([])
+
+    codes = [pool.allocate() for _ in range(100)]
+
+    assert len(set(codes)) == 100
+    assert all(len(code) == 2 for code in codes)
+    assert pool.allocate() is None
+
+
+def test_taken_discarded_and_released_codes():
+    pool = SessionCodePool(space=10)
+    pool.load(["3", "7"])
+    assert len(pool) == 8
+
+    pool.discard("5")
+    allocated = {pool.allocate() for _ in range(7)}
+    assert allocated.isdisjoint({"3", "5", "7"})
+
+    pool.release(["5", "5"])
+    assert len(pool) == 1
+    assert pool.allocate() == "5"
+
+
+def test_code_taken_by_another_worker_is_skipped(monkeypatch):
+    pool = SessionCodePool(space=10)
+    pool.load([])
+    monkeypatch.setattr(session_service, "code_pool", pool)
+
+    taken = [str(n) for n in range(10) if n != 4]
+
+    db = SessionLocal()
+    try:
+        # Another worker holds every code but one, behind this pool's back
+        for code in taken:
+            db.add(SessionModel(code=code))
+        db.commit()
+
+        session = session_service.create_session(db)
+
+        assert session.code == "4"
+    finally:
+        db.query(SessionModel).filter(SessionModel.code.in_(taken + ["4"])).delete(synchronize_session=False)
+        db.commit()
+        db.close()
@@ -0,0 +1,227 @@
+import os
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.database import SessionLocal
+from app.models.blob import Blob
+from app.models.drop import Drop
+from app.services import file_service
+from app.services.storage_backends import storage
+from app.services.storage_gc_service import collect_garbage, reconcile_upload_dir
+from app.services.thumbnail_service import thumbnail_path
+
+client = TestClient(app)
+
+
+def _upload(content):
+    code = client.post("/sessions").json()["code"]
+    response = client.post(
+        f"/sessions/{code}/drops/file",
+        files={"file": ("notes.txt", content, "text/plain")},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def _update_drop(drop_id, **values):
+    db = SessionLocal()
+    db.query(Drop).filter(Drop.id == drop_id).update(values)
+    db.commit()
+    db.close()
+
+
+def test_consumed_drop_file_is_reclaimed():
+    content = b"read me once, then forget me"
+    drop = _upload(content)
+
+    # What consuming a burn-after-read drop leaves behind
+    _update_drop(drop["id"], is_deleted=True, deleted_at=datetime.utcnow())
+    assert os.path.exists(drop["path"])
+
+    db = SessionLocal()
+    reclaimed = collect_garbage(db)
+
+    assert reclaimed["references_released"] >= 1
+    assert reclaimed["bytes_reclaimed"] >= len(content)
+    assert not os.path.exists(drop["path"])
+    assert db.get(Blob, hashlib.sha256(content).hexdigest()) is None
+    assert db.get(Drop, drop["id"]).blob_sha256 is None
+
+    # Nothing is released twice
+    assert collect_garbage(db)["references_released"] == 0
+
+    db.close()
+
+
+def test_reupload_during_collection_never_loses_the_file(monkeypatch):
+    content = b"collected while someone uploads it again"
+    drop = _upload(content)
+    _update_drop(drop["id"], is_deleted=True, deleted_at=datetime.utcnow())
+
+    delete = storage.delete
+    racing = []
+
+    def reupload():
+        racing.append(client.post(
+            f"/sessions/{client.post('/sessions').json()['code']}/drops/file",
+            files={"file": ("notes.txt", content, "text/plain")},
+        ))
+
+    uploader = threading.Thread(target=reupload)
+
+    def delete_while_reuploading(location):
+        # The same bytes arrive between the GC's commit and its unlink
+        if not uploader.is_alive() and not racing:
+            uploader.start()
+            time.sleep(0.3)
+        return delete(location)
+
+    monkeypatch.setattr(storage, "delete", delete_while_reuploading)
+    db = SessionLocal()
+    collect_garbage(db)
+    db.close()
+    monkeypatch.undo()
+    uploader.join()
+
+    # Waited for the GC instead of pointing at a file about to go
+    assert racing[0].status_code == 200
+    assert os.path.exists(racing[0].json()["path"])
+
+
+def test_collection_right_after_a_store_keeps_the_file(monkeypatch):
+    content = b"stored again while the GC runs"
+    drop = _upload(content)
+    _update_drop(drop["id"], is_deleted=True, deleted_at=datetime.utcnow())
+
+    db = SessionLocal()
+    collect_garbage(db)
+    db.close()
+
+    exists = storage.exists
+
+    def collect_before_writing(location):
+        # The row is already claimed, so the GC must leave the path alone
+        monkeypatch.setattr(storage, "exists", exists)
+        gc_db = SessionLocal()
+        collect_garbage(gc_db)
+        gc_db.close()
+        return exists(location)
+
+    monkeypatch.setattr(storage, "exists", collect_before_writing)
+    again = _upload(content)
+
+    assert os.path.exists(again["path"])
+
+    db = SessionLocal()
+    assert db.get(Blob, hashlib.sha256(content).hexdigest()).ref_count == 1
+    db.close()
+
+
+def test_downloaded_drop_is_kept_until_resume_window_ends():
+    drop = _upload(b"one-time download")
+
+    _update_drop(drop["id"], is_downloaded=True, downloaded_at=datetime.utcnow())
+
+    db = SessionLocal()
+    collect_garbage(db)
+    assert os.path.exists(drop["path"])
+    db.close()
+
+    _update_drop(drop["id"], downloaded_at=datetime.utcnow() - timedelta(days=2))
+
+    db = SessionLocal()
+    collect_garbage(db)
+    assert not os.path.exists(drop["path"])
+    db.close()
+
+
+def test_reconciliation_removes_old_orphans_only(monkeypatch, tmp_path):
+    monkeypatch.setattr(file_service, "UPLOAD_DIR", tmp_path)
+
+    old = time.time() - 7200
+
+    def write(relative, data=b"x" * 10, mtime=old):
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    orphan_blob = write("blobs/ab/" + "ab" * 32 + ".txt")
+    stale_temp = write(".interrupted.part")
+    stale_part = write(".resumable/no-such-upload.part")
+    loose = write("legacy.txt")
+    fresh = write("blobs/cd/" + "cd" * 32 + ".txt", mtime=time.time())
+    known = write("blobs/ef/" + "ef" * 32 + ".txt")
+    known_gzip = write("blobs/ef/" + "ef" * 32 + ".txt.gz")
+
+    db = SessionLocal()
+    db.add(Blob(sha256="ef" * 32, path=known.as_posix(), size=10, ref_count=1))
+    db.commit()
+
+    try:
+        reclaimed = reconcile_upload_dir(db, grace_seconds=3600)
+    finally:
+        db.query(Blob).filter(Blob.sha256 == "ef" * 32).delete()
+        db.commit()
+        db.close()
+
+    assert reclaimed == {"files_removed": 4, "bytes_reclaimed": 40}
+    for path in (orphan_blob, stale_temp, stale_part, loose):
+        assert not path.exists()
+    assert fresh.exists()
+    assert known.exists()
+    assert known_gzip.exists()
+
+
+def test_reconciliation_keeps_derived_files_of_live_loose_drops(monkeypatch, tmp_path):
+    monkeypatch.setattr(file_service, "UPLOAD_DIR", tmp_path)
+
+    old = time.time() - 7200
+    original = tmp_path / "photo.png"
+    paths = [original, tmp_path / "photo.png.gz", thumbnail_path(original)]
+    for path in paths:
+        path.write_bytes(b"x" * 10)
+        os.utime(path, (old, old))
+
+    db = SessionLocal()
+    drop = Drop(session_code="000000", file_path=paths[0].as_posix(), is_deleted=False)
+    db.add(drop)
+    db.commit()
+
+    try:
+        reclaimed = reconcile_upload_dir(db, grace_seconds=3600)
+    finally:
+        db.delete(drop)
+        db.commit()
+        db.close()
+
+    assert reclaimed["files_removed"] == 0
+    assert all(path.exists() for path in paths)
+
+
+def test_reconciliation_keeps_objects_of_pending_direct_uploads():
+    content = b"put, not completed yet"
+    code = client.post("/sessions").json()["code"]
+    started = client.post(
+        f"/sessions/{code}/uploads/direct",
+        json={
+            "filename": "pending.txt",
+            "size": len(content),
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "content_type": "text/plain",
+        },
+    ).json()
+    upload = started["upload"]
+    assert client.put(upload["url"], content=content, headers=upload["headers"]).status_code == 200
+
+    db = SessionLocal()
+    reconcile_upload_dir(db, grace_seconds=-60)
+    db.close()
+
+    done = client.post(f"/sessions/{code}/uploads/{started['upload_id']}/complete")
+    assert done.status_code == 200
+    assert os.path.exists(done.json()["path"])
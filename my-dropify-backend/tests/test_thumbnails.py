@@ -0,0 +1,131 @@
+import asyncio
+import io
+import os
+import signal
+from PIL import Image
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.thumbnail_service import ThumbnailPipeline, thumbnail_path, thumbnails
+
+client = TestClient(app)
+
+
+def _png(size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 40, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def _wait_for(condition, timeout=10):
+    for _ in range(int(timeout / 0.05)):
+        if condition():
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError("timed out")
+
+
+def test_thumbnail_is_rendered_once_for_every_waiting_drop(tmp_path):
+    source = tmp_path / "photo.png"
+    source.write_bytes(_png())
+
+    pipeline = ThumbnailPipeline(workers=1, max_size=64, image_format="webp")
+    ready = []
+
+    async def on_ready(session_code, drop_id, path):
+        ready.append((session_code, drop_id, path))
+
+    async def run():
+        pipeline.start(on_ready)
+        assert pipeline.request(str(source), "111111", 1) == "pending"
+        assert pipeline.request(str(source), "222222", 2) == "pending"
+        await _wait_for(lambda: len(ready) == 2)
+
+    try:
+        asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert sorted(ready) == [("111111", 1, str(source)), ("222222", 2, str(source))]
+    assert pipeline.status(str(source)) == "ready"
+
+    with Image.open(thumbnail_path(source)) as image:
+        assert image.format == "WEBP"
+        assert max(image.size) == 64
+
+
+def test_unreadable_image_falls_back_to_the_original(tmp_path):
+    source = tmp_path / "broken.png"
+    source.write_bytes(b"not really a png")
+
+    pipeline = ThumbnailPipeline(workers=1, max_size=64, image_format="jpeg")
+
+    async def on_ready(session_code, drop_id, path):
+        raise AssertionError("no thumbnail expected")
+
+    async def run():
+        pipeline.start(on_ready)
+        pipeline.request(str(source), "111111", 1)
+        await _wait_for(lambda: pipeline.status(str(source)) is None)
+
+    try:
+        asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert not thumbnail_path(source).exists()
+    assert pipeline.request(str(source), "111111", 1) is None
+
+
+def test_pipeline_recovers_from_a_dead_worker(tmp_path):
+    first, second = tmp_path / "first.png", tmp_path / "second.png"
+    first.write_bytes(_png())
+    second.write_bytes(_png((900, 900)))
+
+    pipeline = ThumbnailPipeline(workers=1, max_size=64, image_format="webp")
+
+    async def on_ready(session_code, drop_id, path):
+        pass
+
+    async def run():
+        pipeline.start(on_ready)
+        pipeline.request(str(first), "111111", 1)
+        await _wait_for(lambda: pipeline.status(str(first)) == "ready")
+
+        for process in list(pipeline._executor._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+
+        # Never raises: None or pending while the pool is broken, then a
+        # fresh pool renders the image
+        await _wait_for(lambda: pipeline.request(str(second), "222222", 2) == "ready")
+
+    try:
+        asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert not pipeline._waiting
+
+
+def test_image_drops_carry_thumbnail_state():
+    code = client.post("/sessions").json()["code"]
+
+    image = client.post(
+        f"/sessions/{code}/drops/file",
+        files={"file": ("photo.png", _png(), "image/png")},
+    ).json()
+    client.post(
+        f"/sessions/{code}/drops/file",
+        files={"file": ("notes.txt", b"plain text", "text/plain")},
+    )
+
+    drops = {drop["id"]: drop for drop in client.get(f"/sessions/{code}/drops").json()}
+    thumbnail = drops[image["id"]]["thumbnail"]
+
+    if thumbnails.enabled:
+        assert thumbnail["status"] in ("pending", "ready")
+        assert (thumbnail["url"] is None) == (thumbnail["status"] == "pending")
+    else:
+        assert thumbnail is None
+
+    assert all(drop["thumbnail"] is None for id, drop in drops.items() if id != image["id"])
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+from app.main import app
+from app.websocket.manager import ConnectionManager
+from app.websocket.lifecycle import run_connection
+
+client = TestClient(app)
+
+
+def test_unknown_session_is_rejected():
+    with client.websocket_connect("/ws/000000") as websocket:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+
+    assert closed.value.code == 4404
+
+
+def test_client_ping_gets_pong():
+    code = client.post("/sessions").json()["code"]
+
+    with client.websocket_connect(f"/ws/{code}") as websocket:
+        websocket.send_json({"event": "PING"})
+        assert websocket.receive_json() == {"event": "PONG"}
+
+
+def test_binary_frames_are_ignored():
+    code = client.post("/sessions").json()["code"]
+
+    with client.websocket_connect(f"/ws/{code}") as websocket:
+        websocket.send_bytes(b"\x00\x01")
+        websocket.send_json({"event": "PING"})
+        assert websocket.receive_json() == {"event": "PONG"}
+
+
+def test_expiring_session_closes_its_sockets():
+    code = client.post("/sessions").json()["code"]
+
+    with client.websocket_connect(f"/ws/{code}") as websocket:
+        client.delete(f"/sessions/{code}/expire")
+
+        assert websocket.receive_json() == {"event": "SESSION_EXPIRED"}
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+
+    assert closed.value.code == 4410
+
+
+def test_session_connection_cap(monkeypatch):
+    from app.main import manager
+
+    monkeypatch.setattr(manager, "max_per_session", 1)
+    code = client.post("/sessions").json()["code"]
+
+    with client.websocket_connect(f"/ws/{code}"):
+        with client.websocket_connect(f"/ws/{code}") as second:
+            with pytest.raises(WebSocketDisconnect) as closed:
+                second.receive_json()
+
+    assert closed.value.code == 1013
+
+
+class ScriptedSocket:
+    """Sends `frames`, then nothing; records what the server sends and how it closes."""
+
+    def __init__(self, frames=()):
+        self.frames = list(frames)
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        if self.frames:
+            return self.frames.pop(0)
+        await asyncio.Event().wait()
+
+    async def send_text(self, payload):
+        self.sent.append(json.loads(payload))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+@pytest.mark.asyncio
+async def test_silent_socket_is_pinged_then_closed():
+    manager = ConnectionManager()
+    socket = ScriptedSocket()
+
+    await manager.connect("444444", socket)
+    await run_connection(
+        manager,
+        "444444",
+        socket,
+        datetime.utcnow() + timedelta(hours=1),
+        ping_interval=0.02,
+        idle_timeout=0.07,
+    )
+
+    assert {"event": "PING"} in socket.sent
+    assert socket.closed_with == 4408
+    assert "444444" not in manager.active_connections
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_ends_the_connection():
+    manager = ConnectionManager()
+    socket = ScriptedSocket([
+        {"type": "websocket.receive", "bytes": b"\x00"},
+        {"type": "websocket.disconnect", "code": 1001},
+    ])
+
+    await manager.connect("555555", socket)
+    try:
+        await asyncio.wait_for(
+            run_connection(manager, "555555", socket, datetime.utcnow() + timedelta(hours=1)),
+            timeout=5,
+        )
+    finally:
+        manager.disconnect("555555", socket)
+
+    assert socket.closed_with is None
+    assert "555555" not in manager.active_connections
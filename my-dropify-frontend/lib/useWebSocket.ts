@@ -1,5 +1,8 @@
 import { useEffect, useRef } from 'react'
 
+// Server close codes after which reconnecting is pointless
+const SESSION_GONE_CLOSE_CODES = [4404, 4410]
+
 export function useWebSocket(
   code: string | undefined,
   onMessage: (msg: any) => void,
@@ -41,6 +44,14 @@ export function useWebSocket(
       socket.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data)
+
+          // Heartbeats are answered here, not passed to the app
+          if (data?.event === 'PING') {
+            socket.send(JSON.stringify({ event: 'PONG' }))
+            return
+          }
+          if (data?.event === 'PONG') return
+
           messageHandlerRef.current(data)
         } catch (err) {
           console.error('WebSocket parse error:', err)
@@ -51,10 +62,10 @@ export function useWebSocket(
         console.log('WebSocket error')
       }
 
-      socket.onclose = () => {
+      socket.onclose = (event) => {
         console.log('WebSocket closed')
 
-        if (!isUnmounted) {
+        if (!isUnmounted && !SESSION_GONE_CLOSE_CODES.includes(event?.code)) {
           reconnectTimeoutRef.current = setTimeout(connect, 2000)
         }
       }
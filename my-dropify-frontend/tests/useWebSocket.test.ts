@@ -25,3 +25,33 @@ test('creates websocket connection', () => {
 
   expect(global.WebSocket).toBeDefined()
 })
+
+test('answers server heartbeats without forwarding them', () => {
+  const sendMock = vi.fn()
+  const onMessage = vi.fn()
+  let socket: any
+
+  class MockWebSocket {
+    url: string
+    onmessage: ((event: any) => void) | null = null
+
+    constructor(url: string) {
+      this.url = url
+      socket = this
+    }
+
+    send = sendMock
+    close = vi.fn()
+  }
+
+  // @ts-ignore
+  global.WebSocket = MockWebSocket
+  process.env.NEXT_PUBLIC_BACKEND_URL = 'http://localhost:8000'
+
+  renderHook(() => useWebSocket('abc123', onMessage))
+
+  socket.onmessage({ data: JSON.stringify({ event: 'PING' }) })
+
+  expect(sendMock).toHaveBeenCalledWith(JSON.stringify({ event: 'PONG' }))
+  expect(onMessage).not.toHaveBeenCalled()
+})